@@ -0,0 +1,196 @@
+# background_jobs.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import tkinter as tk
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class BackgroundJob:
+    """
+    Фоновая задача. Из рабочего потока сообщает о ходе выполнения
+    через очередь и проверяет флаг отмены - к виджетам Tk не обращается.
+    """
+
+    def __init__(self, events, max_workers):
+        """
+        Инициализация задачи.
+
+        Args:
+            events: очередь событий, которую разбирает поток интерфейса
+            max_workers: количество потоков для map()
+        """
+        self._events = events
+        self._cancel_event = threading.Event()
+        self.max_workers = max_workers
+        self.done = False
+
+    @property
+    def cancelled(self):
+        """Запрошена ли отмена задачи"""
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Запросить отмену задачи (можно вызывать из любого потока)"""
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """Прервать выполнение, если задача отменена"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done, total=None, message=""):
+        """
+        Сообщить о ходе выполнения.
+
+        Args:
+            done: количество выполненных шагов
+            total: общее количество шагов
+            message: текст для строки состояния
+        """
+        self._events.put((self, 'progress', (done, total, message)))
+
+    def post(self, callback, *args):
+        """Выполнить callback в потоке интерфейса (например, для частичных результатов)"""
+        self._events.put((self, 'call', (callback, args)))
+
+    def map(self, func, items):
+        """
+        Параллельное выполнение func для каждого элемента.
+        Результаты отдаются по мере готовности, при отмене оставшиеся элементы не запускаются.
+
+        Args:
+            func: функция одного аргумента
+            items: элементы для обработки
+
+        Yields:
+            tuple: (элемент, результат, исключение или None)
+        """
+        items = list(items)
+        if not items:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)))
+        try:
+            futures = {executor.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                self.check_cancelled()
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BackgroundJobRunner:
+    """
+    Запуск фоновых задач для окна Tk. События задач передаются
+    через потокобезопасную очередь, которую поток интерфейса разбирает через after().
+    """
+
+    def __init__(self, widget, poll_interval=50, max_workers=8):
+        """
+        Инициализация исполнителя.
+
+        Args:
+            widget: окно, в потоке которого вызываются обработчики
+            poll_interval: период опроса очереди в миллисекундах
+            max_workers: количество потоков для параллельных загрузок внутри задачи
+        """
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self._events = queue.Queue()
+        self._handlers = {}
+        self._polling = False
+
+    def submit(self, work, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        """
+        Запуск задачи в отдельном потоке.
+
+        Args:
+            work: функция work(job), выполняемая в рабочем потоке
+            on_progress: обработчик хода выполнения (done, total, message)
+            on_done: обработчик результата work
+            on_error: обработчик исключения
+            on_cancel: обработчик отмены
+
+        Returns:
+            BackgroundJob: задача (для отмены)
+        """
+        job = BackgroundJob(self._events, self.max_workers)
+        self._handlers[job] = {
+            'progress': on_progress, 'done': on_done,
+            'error': on_error, 'cancelled': on_cancel
+        }
+
+        def run():
+            try:
+                result = work(job)
+                if job.cancelled:
+                    self._events.put((job, 'cancelled', ()))
+                else:
+                    self._events.put((job, 'done', (result,)))
+            except JobCancelled:
+                self._events.put((job, 'cancelled', ()))
+            except Exception as e:
+                self._events.put((job, 'error', (e,)))
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_interval, self._drain)
+        return job
+
+    def cancel_all(self):
+        """Отменить все выполняющиеся задачи"""
+        for job in list(self._handlers):
+            job.cancel()
+
+    def _drain(self):
+        """Разбор очереди событий в потоке интерфейса"""
+        try:
+            if not self.widget.winfo_exists():
+                raise tk.TclError("window destroyed")
+        except tk.TclError:
+            # Окно закрыто - результаты показывать некуда
+            self.cancel_all()
+            self._handlers.clear()
+            self._polling = False
+            return
+
+        while True:
+            try:
+                job, kind, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            handlers = self._handlers.get(job)
+            if handlers is None:
+                continue
+
+            try:
+                if kind == 'call':
+                    callback, callback_args = args
+                    callback(*callback_args)
+                elif handlers[kind] is not None:
+                    handlers[kind](*args)
+                elif kind == 'error':
+                    print(f"Ошибка фоновой задачи: {args[0]}")
+            except Exception as e:
+                print(f"Ошибка обработки события фоновой задачи: {e}")
+
+            if kind in ('done', 'error', 'cancelled'):
+                job.done = True
+                del self._handlers[job]
+
+        if self._handlers:
+            self.widget.after(self.poll_interval, self._drain)
+        else:
+            self._polling = False
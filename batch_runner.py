@@ -0,0 +1,243 @@
+# batch_runner.py
+"""
+Пакетная переоценка портфелей без графического интерфейса.
+
+Для каждого каталога портфеля (portfolio_data.json, etf_portfolio.json,
+transaction_history.json, commission_settings.json) загружает позиции,
+обновляет котировки одним пакетным проходом, считает коэффициент Шарпа
+и показатели риска и записывает отчеты. Каталоги обрабатываются
+параллельно в отдельных процессах; кэш истории цен можно сделать общим.
+
+Пример (cron):
+    python batch_runner.py clients/* --jobs 4 --cache-dir /var/cache/moex_history --output reports
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+
+def revalue_stocks(portfolio, timeout):
+    """
+    Переоценка акций по котировкам TQBR.
+
+    Returns:
+        dict: количество позиций и обновленных цен
+    """
+    if not portfolio.portfolio_data:
+        return {'positions': 0, 'updated': 0}
+    updated = portfolio.apply_quotes(portfolio.fetch_quotes(timeout))
+    return {'positions': len(portfolio.portfolio_data), 'updated': updated}
+
+
+def revalue_etfs(timeout):
+    """
+    Переоценка ETF по котировкам TQTF.
+
+    Returns:
+        tuple: (менеджер ETF или None, если файла портфеля нет; сводка)
+    """
+    if not os.path.exists('etf_portfolio.json'):
+        return None, {'positions': 0, 'updated': 0}
+
+    from etf_portfolio.etf_manager import ETFPortfolioManager
+
+    manager = ETFPortfolioManager()
+    quotes = {}
+    manager.fetch_all_quotes(quotes.update, timeout=timeout)
+    updated = sum(1 for etf in manager.portfolio_data if manager.apply_quote(etf, quotes.get(etf['ticker'])))
+    if updated:
+        manager.save_portfolio_data()
+    return manager, {
+        'positions': len(manager.portfolio_data),
+        'updated': updated,
+        'total_cost': sum(etf.get('total_cost', 0) for etf in manager.portfolio_data),
+        'total_current_value': sum(etf.get('current_value', 0) for etf in manager.portfolio_data)
+    }
+
+
+def risk_report(portfolio_data, days, risk_free_rate, mc_paths, seed):
+    """
+    Коэффициент Шарпа, показатели активов и (при mc_paths > 0) VaR/CVaR методом Монте-Карло.
+
+    Returns:
+        tuple: (сводка по портфелю, строки показателей активов)
+    """
+    from core.analytics import load_historical_data, portfolio_daily_returns, sharpe_metrics, asset_metrics
+
+    historical_data = load_historical_data([stock['ticker'] for stock in portfolio_data], days)
+    returns = portfolio_daily_returns(historical_data, portfolio_data)
+    if not returns:
+        return {'error': "Нет общих исторических данных по активам"}, []
+
+    annual_return, annual_volatility, sharpe = sharpe_metrics(returns, risk_free_rate)
+    summary = {
+        'days': len(returns),
+        'annual_return': float(annual_return),
+        'annual_volatility': float(annual_volatility),
+        'sharpe': float(sharpe)
+    }
+    assets = asset_metrics(historical_data, portfolio_data, returns, risk_free_rate)
+
+    if mc_paths > 0:
+        from core.monte_carlo import MonteCarloSimulator, build_returns_matrix, portfolio_weights
+
+        tickers, _, matrix = build_returns_matrix(historical_data)
+        if len(matrix) >= 2:
+            # Параллельность - на уровне процессов портфелей, внутри процесса пул не нужен
+            results = MonteCarloSimulator(matrix, portfolio_weights(portfolio_data, tickers),
+                                          n_paths=mc_paths, workers=1, seed=seed).run(
+                sum(stock.get('current_value', 0) for stock in portfolio_data))
+            summary['monte_carlo'] = {
+                'n_paths': results['n_paths'],
+                'horizon': results['horizon'],
+                'expected_return': results['expected_return'],
+                'var': {f"{level:.0%}": value for level, value in results['var'].items()},
+                'cvar': {f"{level:.0%}": value for level, value in results['cvar'].items()},
+                'var_value': {f"{level:.0%}": value for level, value in results['var_value'].items()}
+            }
+    return summary, assets
+
+
+def write_positions(path, rows_source):
+    """Запись позиций в CSV (разделитель ';', как при экспорте из окон приложения)"""
+    headers, make_rows = rows_source
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(headers)
+        writer.writerows(make_rows())
+
+
+def run_portfolio(task):
+    """
+    Обработка одного каталога портфеля. Выполняется в отдельном процессе:
+    хранилища портфеля читают файлы из текущего каталога.
+
+    Args:
+        task: параметры запуска (см. main)
+
+    Returns:
+        dict: сводка обработки
+    """
+    started = time.perf_counter()
+    name = os.path.basename(os.path.normpath(task['path']))
+    output_dir = os.path.join(task['output'], name)
+    result = {'portfolio': name, 'path': task['path'], 'status': 'ok'}
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        os.chdir(task['path'])
+
+        from core import Portfolio
+        from core.history_cache import get_history_cache
+
+        get_history_cache(task['cache_dir'])
+        portfolio = Portfolio(price_timeout=task['timeout'])
+
+        result['stocks'] = revalue_stocks(portfolio, task['timeout'])
+        etf_manager, result['etf'] = revalue_etfs(task['timeout'])
+        result['statistics'] = portfolio.get_portfolio_statistics()
+
+        stamp = task['stamp']
+        if portfolio.portfolio_data:
+            write_positions(os.path.join(output_dir, f"portfolio_{stamp}.csv"), portfolio.export_source())
+            if not task['skip_risk']:
+                result['risk'], assets = risk_report(portfolio.portfolio_data, task['days'],
+                                                     task['risk_free_rate'], task['mc_paths'], task['seed'])
+                for asset in assets:
+                    for key, value in asset.items():
+                        if key != 'ticker':
+                            asset[key] = float(value)
+                result['assets'] = assets
+        if etf_manager is not None and etf_manager.portfolio_data:
+            write_positions(os.path.join(output_dir, f"etf_portfolio_{stamp}.csv"), etf_manager.export_source())
+
+        result['tax'] = portfolio.lot_ledger.tax_report()
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+
+    result['elapsed'] = round(time.perf_counter() - started, 3)
+    try:
+        with open(os.path.join(output_dir, f"report_{task['stamp']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+    except OSError as e:
+        result['status'] = 'error'
+        result['error'] = f"Ошибка записи отчета: {e}"
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная переоценка портфелей и отчеты по риску")
+    parser.add_argument('portfolios', nargs='+', help="каталоги портфелей")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="количество параллельных процессов")
+    parser.add_argument('--cache-dir', default='history_cache', help="общий каталог кэша истории цен")
+    parser.add_argument('-o', '--output', default='reports', help="каталог отчетов")
+    parser.add_argument('--days', type=int, default=365, help="период истории для расчета риска, дней")
+    parser.add_argument('--risk-free', type=float, default=7.5, help="безрисковая ставка, %% годовых")
+    parser.add_argument('--mc-paths', type=int, default=0,
+                        help="траекторий Монте-Карло для VaR/CVaR (0 - не считать)")
+    parser.add_argument('--seed', type=int, help="seed моделирования Монте-Карло")
+    parser.add_argument('--timeout', type=float, default=20, help="срок ожидания котировок, с")
+    parser.add_argument('--skip-risk', action='store_true', help="только переоценка, без расчета риска")
+    parser.add_argument('--iss-url', help="адрес ISS (по умолчанию - MOEX_ISS_URL или iss.moex.com)")
+    args = parser.parse_args()
+
+    if args.iss_url:
+        # Переменная окружения наследуется процессами-обработчиками
+        os.environ['MOEX_ISS_URL'] = args.iss_url
+
+    portfolios = [path for path in dict.fromkeys(args.portfolios) if os.path.isdir(path)]
+    missing = [path for path in dict.fromkeys(args.portfolios) if path not in portfolios]
+    for path in missing:
+        print(f"Ошибка: каталог портфеля не найден: {path}")
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base = {
+        'output': os.path.abspath(args.output),
+        'cache_dir': os.path.abspath(args.cache_dir),
+        'stamp': stamp,
+        'days': args.days,
+        'risk_free_rate': args.risk_free,
+        'mc_paths': args.mc_paths,
+        'seed': args.seed,
+        'timeout': args.timeout,
+        'skip_risk': args.skip_risk
+    }
+    tasks = [dict(base, path=os.path.abspath(path)) for path in portfolios]
+
+    started = time.perf_counter()
+    results = []
+    # Новый процесс на каждый портфель: общие для процесса объекты (комиссии,
+    # кэш истории) читают настройки своего каталога
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(tasks) or 1)),
+                             max_tasks_per_child=1) as executor:
+        futures = [executor.submit(run_portfolio, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                statistics = result['statistics']
+                sharpe = result.get('risk', {}).get('sharpe')
+                print(f"{result['portfolio']}: {statistics['total_current_value']:,.2f} руб, "
+                      f"прибыль {statistics['total_profit_percent']:+.2f}%"
+                      + (f", Шарп {sharpe:.2f}" if sharpe is not None else "")
+                      + f" ({result['elapsed']:.1f} с)")
+            else:
+                print(f"Ошибка обработки {result['portfolio']}: {result['error']}")
+
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    print(f"Обработано портфелей: {len(results)}, с ошибками: {failed}, "
+          f"время: {time.perf_counter() - started:.1f} с, отчеты: {base['output']}")
+    return 1 if failed or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
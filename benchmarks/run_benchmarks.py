@@ -0,0 +1,438 @@
+# benchmarks/run_benchmarks.py
+"""
+Набор бенчмарков на фиксированных синтетических данных.
+
+Каждый бенчмарк замеряется несколько раз, результаты (минимум, медиана,
+среднее, разброс) сохраняются в JSON вместе с коммитом и окружением,
+чтобы сравнивать скорость между версиями.
+
+Примеры:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --filter sharpe --repeat 10
+    python benchmarks/run_benchmarks.py --quick -o before.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+SEED = 20240101
+
+# Реестр бенчмарков: (имя, функция подготовки, наборы параметров, полный набор / быстрый набор)
+BENCHMARKS = []
+
+
+def benchmark(name, params, quick_params=None, needs_tk=False):
+    """
+    Регистрация бенчмарка.
+
+    Функция подготовки получает параметры и окружение и возвращает функцию без
+    аргументов, время выполнения которой замеряется (подготовка данных не замеряется).
+
+    Args:
+        name: имя бенчмарка
+        params: список словарей параметров
+        quick_params: сокращенный список для --quick
+        needs_tk: требуется ли Tk (без дисплея бенчмарк пропускается)
+    """
+    def register(setup):
+        BENCHMARKS.append({
+            'name': name,
+            'setup': setup,
+            'params': params,
+            'quick_params': quick_params or params[:1],
+            'needs_tk': needs_tk
+        })
+        return setup
+    return register
+
+
+class Environment:
+    """Общее окружение запуска: рабочий каталог, скрытое окно Tk, симулятор ISS"""
+
+    def __init__(self):
+        self.work_dir = tempfile.mkdtemp(prefix='moex_bench_')
+        self._root = None
+        self._tk_error = None
+        self._simulator = None
+
+    @property
+    def root(self):
+        """Скрытое корневое окно Tk (None, если дисплей недоступен)"""
+        if self._root is None and self._tk_error is None:
+            import tkinter as tk
+            try:
+                self._root = tk.Tk()
+                self._root.withdraw()
+            except tk.TclError as e:
+                self._tk_error = str(e)
+        return self._root
+
+    def simulator(self, latency):
+        """Запущенный симулятор ISS с заданной задержкой в миллисекундах"""
+        from core import moex_client
+        from iss_simulator import ISSSimulator
+
+        if self._simulator is None:
+            self._simulator = ISSSimulator(seed=SEED)
+            moex_client.set_base_url(self._simulator.start())
+        self._simulator.latency = latency
+        return self._simulator
+
+    def close(self):
+        if self._simulator is not None:
+            self._simulator.stop()
+        if self._root is not None:
+            self._root.destroy()
+
+
+def synthetic_prices(rng, days, start=None):
+    """Дневные цены закрытия по рабочим дням (случайное блуждание)"""
+    price = start or rng.uniform(50, 5000)
+    dates = []
+    prices = []
+    day = datetime(2020, 1, 1)
+    while len(dates) < days:
+        if day.weekday() < 5:
+            price *= 1 + rng.gauss(0.0003, 0.02)
+            dates.append(day.strftime('%Y-%m-%d'))
+            prices.append(round(price, 2))
+        day += timedelta(days=1)
+    return dates, prices
+
+
+def intraday_points(rng, count):
+    """Внутридневные точки (время, цена) с шагом в одну секунду"""
+    start = datetime(2024, 3, 1, 10, 0)
+    price = 300.0
+    points = []
+    for i in range(count):
+        price *= 1 + rng.gauss(0, 0.0005)
+        points.append((start + timedelta(seconds=i), round(price, 2)))
+    return points
+
+
+def synthetic_portfolio(rng, size):
+    """Позиции портфеля в формате PortfolioManager"""
+    portfolio = []
+    for i in range(size):
+        quantity = rng.randint(1, 500)
+        buy_price = round(rng.uniform(50, 5000), 2)
+        commission = round(quantity * buy_price * 0.0006, 2)
+        portfolio.append({
+            'ticker': f"T{i:04d}",
+            'name': f"Бумага {i}",
+            'quantity': quantity,
+            'buy_price': buy_price,
+            'commission': commission,
+            'total_cost': quantity * buy_price + commission,
+            'current_price': round(buy_price * rng.uniform(0.7, 1.5), 2),
+            'added_date': datetime(2023, 1, 1).isoformat()
+        })
+    return portfolio
+
+
+@benchmark('sharpe.calculate_portfolio_returns',
+           [{'tickers': t, 'years': y} for t in (10, 50, 200) for y in (1, 5)],
+           [{'tickers': 10, 'years': 1}, {'tickers': 50, 'years': 1}])
+def bench_sharpe_returns(env, tickers, years):
+    from core.analytics import history_entry
+    from sharpe_calculator import SharpeCalculator
+
+    rng = random.Random(SEED)
+    calculator = SharpeCalculator.__new__(SharpeCalculator)
+    calculator.portfolio_data = []
+    calculator.historical_data = {}
+    for i in range(tickers):
+        ticker = f"T{i:04d}"
+        dates, prices = synthetic_prices(rng, 252 * years)
+        calculator.portfolio_data.append({'ticker': ticker, 'current_value': rng.uniform(1e4, 1e6)})
+        calculator.historical_data[ticker] = history_entry(dates, prices)
+    return calculator.calculate_portfolio_returns
+
+
+@benchmark('chart.update_charts',
+           [{'points': n} for n in (1_000, 10_000, 100_000)],
+           [{'points': 1_000}], needs_tk=True)
+def bench_chart_update(env, points):
+    from tkinter import ttk
+    from chart_manager import ChartManager
+
+    chart_manager = ChartManager()
+    frame = ttk.Frame(env.root)
+    chart_manager.create_intraday_chart(ttk.Frame(frame))
+    chart_manager.create_daily_chart(ttk.Frame(frame))
+    chart_manager.daily_data = intraday_points(random.Random(SEED), points)
+    chart_manager.intraday_dates = [d for d, p in chart_manager.daily_data]
+    chart_manager.intraday_prices = [p for d, p in chart_manager.daily_data]
+
+    def run():
+        chart_manager.update_intraday_chart()
+        chart_manager.update_daily_chart()
+        # draw_idle только планирует отрисовку - замеряем и саму отрисовку
+        chart_manager.intraday_canvas.draw()
+        chart_manager.daily_canvas.draw()
+    return run
+
+
+def _monitor(points):
+    """StockMonitor без окна - только данные графика и сохранение"""
+    from chart_manager import ChartManager
+    from core.data_handler import DataHandler
+    from stock_monitor import StockMonitor
+
+    monitor = StockMonitor.__new__(StockMonitor)
+    monitor.current_ticker = 'BENCH'
+    monitor.data_handler = DataHandler('BENCH')
+    monitor.chart_manager = ChartManager()
+    today = monitor.data_handler.get_moscow_time().replace(tzinfo=None)
+    monitor.chart_manager.daily_data = [
+        (today.replace(hour=0, minute=0, second=0, microsecond=0) + (d - datetime(2024, 3, 1)), p)
+        for d, p in intraday_points(random.Random(SEED), points)
+    ]
+    return monitor
+
+
+@benchmark('monitor.save_daily_data',
+           [{'points': n} for n in (1_000, 10_000, 100_000)],
+           [{'points': 1_000}])
+def bench_save_daily_data(env, points):
+    return _monitor(points).save_daily_data
+
+
+@benchmark('monitor.load_daily_data',
+           [{'points': n} for n in (1_000, 10_000, 100_000)],
+           [{'points': 1_000}])
+def bench_load_daily_data(env, points):
+    monitor = _monitor(points)
+    monitor.save_daily_data()
+    return monitor.load_daily_data
+
+
+@benchmark('portfolio_ui.refresh_table', [{'rows': 500}], needs_tk=True)
+def bench_refresh_table(env, rows):
+    from tkinter import ttk
+    from stock_portfolio.portfolio_stock_manager import PortfolioManager
+    from stock_portfolio.ui_components import UIComponents
+
+    manager = PortfolioManager()
+    manager.portfolio_data = synthetic_portfolio(random.Random(SEED), rows)
+    window = ttk.Frame(env.root)
+    ui = UIComponents(window, manager, None)
+    ui.create_table(window)
+    return ui.refresh_table
+
+
+@benchmark('transactions.record_transaction', [{'history': 100_000}], [{'history': 10_000}])
+def bench_record_transaction(env, history):
+    from stock_portfolio.transaction_manager import TransactionManager
+
+    rng = random.Random(SEED)
+    manager = TransactionManager(None)
+    start = datetime(2015, 1, 1)
+    manager.transaction_history = [{
+        'date': (start + timedelta(minutes=i)).isoformat(),
+        'ticker': f"T{rng.randint(0, 99):04d}",
+        'operation': 'buy' if rng.random() < 0.6 else 'sell',
+        'quantity': rng.randint(1, 100),
+        'price': round(rng.uniform(50, 5000), 2),
+        'total': 0.0,
+        'commission': 0.0
+    } for i in range(history)]
+    return lambda: manager.record_transaction('SBER', 'buy', 10, 300.0, 1.8)
+
+
+@benchmark('portfolio.refresh_prices',
+           [{'tickers': t, 'latency_ms': 20} for t in (10, 50, 200)],
+           [{'tickers': 10, 'latency_ms': 20}])
+def bench_refresh_prices(env, tickers, latency_ms):
+    from stock_portfolio.portfolio_stock_manager import PortfolioManager
+
+    env.simulator(latency_ms)
+    manager = PortfolioManager()
+    manager.portfolio_data = synthetic_portfolio(random.Random(SEED), tickers)
+    return lambda: manager.apply_quotes(manager.fetch_quotes())
+
+
+@benchmark('moex_client.concurrent_identical',
+           [{'callers': c, 'latency_ms': 50} for c in (2, 8, 32)],
+           [{'callers': 8, 'latency_ms': 50}])
+def bench_concurrent_identical(env, callers, latency_ms):
+    from concurrent.futures import ThreadPoolExecutor
+    from core.moex_client import fetch_marketdata
+
+    env.simulator(latency_ms)
+    executor = ThreadPoolExecutor(max_workers=callers)
+
+    def run():
+        # Одновременные одинаковые запросы: монитор, портфель и окно сравнения
+        futures = [executor.submit(fetch_marketdata, ['SBER']) for _ in range(callers)]
+        for future in futures:
+            future.result()
+    return run
+
+
+def measure(func, repeat, min_time=0.0):
+    """
+    Замер времени выполнения.
+
+    Args:
+        func: замеряемая функция
+        repeat: количество замеров
+        min_time: минимальное суммарное время замеров в секундах (добавляет повторы для быстрых функций)
+
+    Returns:
+        list: длительности в секундах
+    """
+    # Диагностический вывод менеджеров не попадает в отчет и не влияет на замер
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()  # прогрев: импорты, кэши, первая отрисовка
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < repeat or time.perf_counter() - started < min_time:
+            begin = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - begin)
+    return timings
+
+
+def git_commit():
+    """Текущий коммит репозитория (если доступен)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(name_filter=None, quick=False, repeat=5, min_time=0.2):
+    """
+    Выполнение бенчмарков.
+
+    Returns:
+        dict: результаты с описанием окружения
+    """
+    env = Environment()
+    previous_dir = os.getcwd()
+    # Менеджеры пишут файлы в текущий каталог - работаем во временном
+    os.chdir(env.work_dir)
+    results = []
+    try:
+        for bench in BENCHMARKS:
+            if name_filter and name_filter not in bench['name']:
+                continue
+            for params in (bench['quick_params'] if quick else bench['params']):
+                label = ', '.join(f"{key}={value}" for key, value in params.items())
+                record = {'name': bench['name'], 'params': params}
+                if bench['needs_tk'] and env.root is None:
+                    record['skipped'] = f"Tk недоступен: {env._tk_error}"
+                    print(f"{bench['name']} [{label}]: пропущен ({record['skipped']})")
+                    results.append(record)
+                    continue
+                try:
+                    timings = measure(bench['setup'](env, **params), repeat, min_time)
+                except Exception as e:
+                    record['error'] = f"{type(e).__name__}: {e}"
+                    print(f"{bench['name']} [{label}]: ошибка {record['error']}")
+                    results.append(record)
+                    continue
+                record.update({
+                    'runs': len(timings),
+                    'min': min(timings),
+                    'median': statistics.median(timings),
+                    'mean': statistics.fmean(timings),
+                    'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0
+                })
+                print(f"{bench['name']} [{label}]: медиана {record['median'] * 1000:.2f} мс, "
+                      f"мин {record['min'] * 1000:.2f} мс ({record['runs']} замеров)")
+                results.append(record)
+    finally:
+        os.chdir(previous_dir)
+        env.close()
+
+    return {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'quick': quick,
+        'results': results
+    }
+
+
+def result_key(record):
+    """Ключ для сопоставления результатов разных запусков"""
+    return record['name'], json.dumps(record['params'], sort_keys=True)
+
+
+def compare(base_path, new_path, threshold=0.1):
+    """
+    Сравнение двух файлов результатов по медиане.
+
+    Args:
+        base_path: результаты до изменения
+        new_path: результаты после изменения
+        threshold: относительное изменение, начиная с которого результат отмечается
+    """
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = {result_key(r): r for r in json.load(f)['results'] if 'median' in r}
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    print(f"{'Бенчмарк':<60} {'было, мс':>10} {'стало, мс':>10} {'x':>7}")
+    for record in new:
+        old = base.get(result_key(record))
+        if old is None or 'median' not in record:
+            continue
+        ratio = record['median'] / old['median'] if old['median'] else float('inf')
+        mark = ''
+        if ratio < 1 - threshold:
+            mark = 'быстрее'
+        elif ratio > 1 + threshold:
+            mark = 'МЕДЛЕННЕЕ'
+        label = f"{record['name']} [{', '.join(f'{k}={v}' for k, v in record['params'].items())}]"
+        print(f"{label:<60} {old['median'] * 1000:>10.2f} {record['median'] * 1000:>10.2f} "
+              f"{ratio:>7.2f} {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки приложения")
+    parser.add_argument('--filter', help="запускать только бенчмарки, в имени которых есть подстрока")
+    parser.add_argument('--quick', action='store_true', help="сокращенные наборы параметров")
+    parser.add_argument('--repeat', type=int, default=5, help="минимальное количество замеров")
+    parser.add_argument('--min-time', type=float, default=0.2, help="минимальное время замеров, с")
+    parser.add_argument('-o', '--output', help="файл результатов (по умолчанию benchmarks/results/<коммит>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="сравнить два файла результатов")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.filter, args.quick, args.repeat, args.min_time)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{report['commit'] or 'local'}_"
+                                           f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены: {output}")
+
+
+if __name__ == "__main__":
+    main()
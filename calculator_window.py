@@ -1,8 +1,7 @@
 # calculator_window.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-import csv
-from datetime import datetime
+from export_manager import export_rows
 
 class CalculatorWindow:
     """
@@ -322,31 +321,16 @@ class CalculatorWindow:
         )
     
     def export_to_csv(self):
-        """Экспорт данных таблицы в CSV файл"""
-        try:
-            if not self.tree.get_children():
-                messagebox.showwarning("Экспорт", "Нет данных для экспорта")
-                return
-                
-            filename = f"income_calculator_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file, delimiter=';')
-                
-                # Заголовки
-                headers = ["Кол-во", "Цена покупки", "Стоимость покупки", "Налог %", 
-                          "Мин купон %", "Макс купон %", "Доход в месяц мин", "Доход в месяц макс"]
-                writer.writerow(headers)
-                
-                # Данные
-                for item in self.tree.get_children():
-                    values = self.tree.item(item, "values")
-                    writer.writerow(values)
-            
-            messagebox.showinfo("Экспорт", f"Данные экспортированы в файл:\n{filename}")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {e}")
+        """Экспорт данных таблицы в CSV/Parquet в фоновом потоке"""
+        if not self.tree.get_children():
+            messagebox.showwarning("Экспорт", "Нет данных для экспорта")
+            return
+        
+        headers = ["Кол-во", "Цена покупки", "Стоимость покупки", "Налог %", 
+                  "Мин купон %", "Макс купон %", "Доход в месяц мин", "Доход в месяц макс"]
+        # Значения таблицы читаются в потоке интерфейса, запись - в фоне
+        rows = [list(self.tree.item(item, "values")) for item in self.tree.get_children()]
+        export_rows(self.window, "income_calculator", headers, lambda: iter(rows))
     
     def focus(self):
         """Активация окна"""
@@ -1,10 +1,32 @@
 # chart_manager.py
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk
+from core.instrumentation import timed
+
+# matplotlib и бэкенд TkAgg загружаются при создании первого графика (load_matplotlib),
+# чтобы не задерживать появление главного окна
+plt = None
+mdates = None
+FigureCanvasTkAgg = None
+
+
+def load_matplotlib(style=None):
+    """
+    Отложенная загрузка matplotlib.
+    
+    Args:
+        style: стиль графиков, применяемый при первой загрузке
+    """
+    global plt, mdates, FigureCanvasTkAgg
+    if plt is None:
+        import matplotlib.pyplot as pyplot
+        import matplotlib.dates as dates
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        if style:
+            pyplot.style.use(style)
+        plt, mdates, FigureCanvasTkAgg = pyplot, dates, canvas_class
+
 
 class ChartManager:
     """
@@ -28,11 +50,16 @@ class ChartManager:
         self.daily_canvas = None
         
         # Настройки графиков
-        self.chart_style = 'seaborn-v0_8-whitegrid'  # Стиль графиков
-        plt.style.use(self.chart_style)
+        self.chart_style = 'seaborn-v0_8-whitegrid'  # Стиль графиков (применяется при загрузке matplotlib)
+    
+    @property
+    def charts_ready(self):
+        """Созданы ли графики"""
+        return self.intraday_canvas is not None and self.daily_canvas is not None
         
     def create_intraday_chart(self, parent_frame):
         """Создание внутридневного графика"""
+        load_matplotlib(self.chart_style)
         # Создаем фигуру и оси
         self.intraday_fig, self.intraday_ax = plt.subplots(figsize=(10, 4), dpi=100)
         
@@ -57,6 +84,7 @@ class ChartManager:
         
     def create_daily_chart(self, parent_frame):
         """Создание графика за весь день"""
+        load_matplotlib(self.chart_style)
         # Создаем фигуру и оси
         self.daily_fig, self.daily_ax = plt.subplots(figsize=(10, 4), dpi=100)
         
@@ -75,9 +103,11 @@ class ChartManager:
         self.daily_canvas = FigureCanvasTkAgg(self.daily_fig, parent_frame)
         self.daily_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
+    @timed('chart.update_intraday')
     def update_intraday_chart(self):
         """Обновление внутридневного графика"""
-        if not self.intraday_dates or not self.intraday_prices:
+        # До создания графиков данные только накапливаются
+        if not self.intraday_dates or not self.intraday_prices or self.intraday_canvas is None:
             return
             
         self.intraday_ax.clear()
@@ -112,9 +142,10 @@ class ChartManager:
         # Обновление холста
         self.intraday_canvas.draw_idle()
         
+    @timed('chart.update_daily')
     def update_daily_chart(self):
         """Обновление графика за весь день"""
-        if not self.daily_data:
+        if not self.daily_data or self.daily_canvas is None:
             return
             
         dates = [d for d, p in self.daily_data]
@@ -175,7 +206,7 @@ class ChartManager:
             ax = self.daily_ax
             dates = [d for d, p in self.daily_data]
         
-        if not dates:
+        if not dates or ax is None:
             return
             
         current_time = datetime.now()
@@ -0,0 +1,172 @@
+# commission_window.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from core.commissions import get_commission_manager
+
+
+def show_commission_settings(parent):
+    """
+    Показать окно настроек комиссий.
+
+    Args:
+        parent: родительское окно
+    """
+    manager = get_commission_manager()
+    settings_window = tk.Toplevel(parent)
+    settings_window.title("Настройки комиссий и налогов")
+    settings_window.geometry("500x600")
+    settings_window.minsize(400, 350)
+
+    main_frame = ttk.Frame(settings_window, padding="15")
+    main_frame.pack(fill=tk.BOTH, expand=True)
+
+    ttk.Label(main_frame, text="Настройки комиссий и налогов", 
+             font=("Arial", 14, "bold")).pack(pady=(0, 15))
+
+    # Поля для ввода комиссий
+    entries = {}
+
+    # Профиль типа инструмента: ETF и облигации хранят только отличия от акций
+    profile_frame = ttk.Frame(main_frame)
+    profile_frame.pack(fill=tk.X, pady=(0, 10))
+    ttk.Label(profile_frame, text="Тип инструмента:", width=20).pack(side=tk.LEFT)
+    profile_names = {name: profile for profile, name in manager.PROFILES.items()}
+    profile_var = tk.StringVar(value=manager.PROFILES['stock'])
+    profile_combo = ttk.Combobox(profile_frame, textvariable=profile_var, state="readonly",
+                                 values=list(profile_names), width=15)
+    profile_combo.pack(side=tk.LEFT)
+
+    commission_frame = ttk.LabelFrame(main_frame, text="Торговые комиссии", padding="10")
+    commission_frame.pack(fill=tk.X, pady=(0, 10))
+
+    # Комиссия брокера
+    row_frame = ttk.Frame(commission_frame)
+    row_frame.pack(fill=tk.X, pady=5)
+    ttk.Label(row_frame, text="Комиссия брокера (%):", width=20).pack(side=tk.LEFT)
+    broker_var = tk.StringVar(value=str(manager.commission_data['broker_commission']))
+    broker_entry = ttk.Entry(row_frame, textvariable=broker_var, width=10)
+    broker_entry.pack(side=tk.LEFT)
+    ttk.Label(row_frame, text="%").pack(side=tk.LEFT, padx=(5, 0))
+    entries['broker_commission'] = broker_var
+
+    # Комиссия биржи
+    row_frame = ttk.Frame(commission_frame)
+    row_frame.pack(fill=tk.X, pady=5)
+    ttk.Label(row_frame, text="Комиссия биржи (%):", width=20).pack(side=tk.LEFT)
+    exchange_var = tk.StringVar(value=str(manager.commission_data['exchange_commission']))
+    exchange_entry = ttk.Entry(row_frame, textvariable=exchange_var, width=10)
+    exchange_entry.pack(side=tk.LEFT)
+    ttk.Label(row_frame, text="%").pack(side=tk.LEFT, padx=(5, 0))
+    entries['exchange_commission'] = exchange_var
+
+    # Минимальная комиссия
+    row_frame = ttk.Frame(commission_frame)
+    row_frame.pack(fill=tk.X, pady=5)
+    ttk.Label(row_frame, text="Мин. комиссия (руб):", width=20).pack(side=tk.LEFT)
+    min_commission_var = tk.StringVar(value=str(manager.commission_data['min_commission']))
+    min_commission_entry = ttk.Entry(row_frame, textvariable=min_commission_var, width=10)
+    min_commission_entry.pack(side=tk.LEFT)
+    ttk.Label(row_frame, text="руб").pack(side=tk.LEFT, padx=(5, 0))
+    entries['min_commission'] = min_commission_var
+
+    # Прочие расходы
+    row_frame = ttk.Frame(commission_frame)
+    row_frame.pack(fill=tk.X, pady=5)
+    ttk.Label(row_frame, text="Прочие расходы (руб):", width=20).pack(side=tk.LEFT)
+    other_costs_var = tk.StringVar(value=str(manager.commission_data['other_costs']))
+    other_costs_entry = ttk.Entry(row_frame, textvariable=other_costs_var, width=10)
+    other_costs_entry.pack(side=tk.LEFT)
+    ttk.Label(row_frame, text="руб за сделку").pack(side=tk.LEFT, padx=(5, 0))
+    entries['other_costs'] = other_costs_var
+
+    # Налоговые настройки
+    tax_frame = ttk.LabelFrame(main_frame, text="Налоговые настройки", padding="10")
+    tax_frame.pack(fill=tk.X, pady=(0, 10))
+
+    row_frame = ttk.Frame(tax_frame)
+    row_frame.pack(fill=tk.X, pady=5)
+    ttk.Label(row_frame, text="Налог на доход (%):", width=20).pack(side=tk.LEFT)
+    tax_var = tk.StringVar(value=str(manager.commission_data['tax_rate']))
+    tax_entry = ttk.Entry(row_frame, textvariable=tax_var, width=10)
+    tax_entry.pack(side=tk.LEFT)
+    ttk.Label(row_frame, text="%").pack(side=tk.LEFT, padx=(5, 0))
+    entries['tax_rate'] = tax_var
+
+    # Ступени и индивидуальные настройки тикеров задаются в файле настроек
+    ttk.Label(main_frame, text=(f"Ступеней по обороту: {len(manager.commission_data.get('tiers', []))}, "
+                                f"тикеров с особыми условиями: {len(manager.commission_data.get('overrides', {}))} "
+                                f"(задаются в commission_settings.json)"),
+             foreground="gray").pack(anchor=tk.W, pady=(0, 10))
+
+    # Пример расчета
+    example_frame = ttk.LabelFrame(main_frame, text="Пример расчета", padding="10")
+    example_frame.pack(fill=tk.X, pady=(0, 15))
+
+    example_text = ("Пример для сделки на 10,000 руб:\n"
+                   "Комиссия брокера: 5 руб\n"
+                   "Комиссия биржи: 1 руб\n"
+                   "Прочие расходы: 0 руб\n"
+                   "Итого комиссий: 6 руб")
+
+    example_label = ttk.Label(example_frame, text=example_text, justify=tk.LEFT)
+    example_label.pack()
+
+    def update_example():
+        try:
+            amount = 10000
+            broker_comm = float(entries['broker_commission'].get()) / 100 * amount
+            exchange_comm = float(entries['exchange_commission'].get()) / 100 * amount
+            min_comm = float(entries['min_commission'].get())
+            other_costs = float(entries['other_costs'].get())
+
+            broker_comm = max(broker_comm, min_comm)
+            total_comm = broker_comm + exchange_comm + other_costs
+
+            example_text = (f"Пример для сделки на {amount:,.0f} руб:\n"
+                          f"Комиссия брокера: {broker_comm:.2f} руб\n"
+                          f"Комиссия биржи: {exchange_comm:.2f} руб\n"
+                          f"Прочие расходы: {other_costs:.2f} руб\n"
+                          f"Итого комиссий: {total_comm:.2f} руб")
+
+            example_label.config(text=example_text)
+        except:
+            pass
+
+    # Кнопки управления
+    button_frame = ttk.Frame(main_frame)
+    button_frame.pack(fill=tk.X)
+
+    def save_settings():
+        try:
+            values = {key: float(var.get()) for key, var in entries.items()}
+            manager.update_profile(profile_names[profile_var.get()], values)
+            update_example()
+            messagebox.showinfo("Успех", "Настройки комиссий сохранены!")
+            
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Некорректное значение: {e}")
+    
+    def reset_to_default():
+        manager.reset_to_default()
+        load_profile()
+    
+    def load_profile(event=None):
+        settings = manager.resolve_settings(profile_names[profile_var.get()])
+        for key, var in entries.items():
+            var.set(str(settings[key]))
+        update_example()
+
+    profile_combo.bind("<<ComboboxSelected>>", load_profile)
+
+    ttk.Button(button_frame, text="Сохранить", 
+              command=save_settings).pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_frame, text="Сбросить по умолчанию", 
+              command=reset_to_default).pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_frame, text="Закрыть", 
+              command=settings_window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    # Обновляем пример при изменении значений
+    for var in entries.values():
+        var.trace('w', lambda *args: update_example())
+
+    update_example()
@@ -0,0 +1,16 @@
+# core/__init__.py
+"""
+Ядро приложения без интерфейса: доступ к данным MOEX ISS, портфель,
+журнал лотов, комиссии, рабочая область счетов и аналитика. Пакет не импортирует tkinter,
+поэтому его можно использовать в фоновых расчетах на сервере.
+
+Тяжелые зависимости (numpy, pandas) загружаются только модулями
+аналитики и кэша истории - импорт пакета остается быстрым.
+"""
+from .commissions import CommissionManager, CommissionSchedule, get_commission_manager
+from .dividends import DividendStore
+from .errors import PortfolioError
+from .lot_ledger import LotLedger
+from .portfolio import Portfolio
+from .transactions import TransactionStore
+from .workspace import QuoteCache, Workspace, get_workspace
@@ -0,0 +1,159 @@
+# core/analytics.py
+from datetime import datetime, timedelta
+import numpy as np
+from .history_cache import get_history_cache
+
+TRADING_DAYS = 252
+
+
+def price_history(ticker, days=365):
+    """
+    Исторические цены закрытия из локального кэша истории MOEX
+    (догружаются только недостающие дни).
+
+    Args:
+        ticker: тикер акции
+        days: глубина истории в календарных днях
+
+    Returns:
+        tuple: (список дат, список цен); при ошибке - пустые списки
+    """
+    try:
+        history = get_history_cache().get_history(ticker, datetime.now() - timedelta(days=days))
+        return [date.to_pydatetime() for date in history.index], history.tolist()
+    except Exception as e:
+        print(f"Ошибка получения исторических данных для {ticker}: {e}")
+    return [], []
+
+
+def daily_returns(prices):
+    """Дневная доходность в процентах на основе цен"""
+    if len(prices) < 2:
+        return []
+    return [(prices[i] - prices[i - 1]) / prices[i - 1] * 100 for i in range(1, len(prices))]
+
+
+def history_entry(dates, prices):
+    """
+    Запись исторических данных актива для расчетов портфеля.
+
+    Returns:
+        dict: {'dates', 'prices', 'returns'}
+    """
+    return {'dates': dates, 'prices': prices, 'returns': daily_returns(prices)}
+
+
+def load_historical_data(tickers, days=365):
+    """
+    Исторические данные по списку тикеров (последовательно, для фоновых расчетов).
+
+    Args:
+        tickers: тикеры активов
+        days: глубина истории в календарных днях
+
+    Returns:
+        dict: {тикер: history_entry} для тикеров с данными
+    """
+    historical_data = {}
+    for ticker in dict.fromkeys(tickers):
+        dates, prices = price_history(ticker, days)
+        if dates and prices:
+            historical_data[ticker] = history_entry(dates, prices)
+    return historical_data
+
+
+def value_weights(portfolio_data):
+    """Веса активов по текущей стоимости позиций"""
+    total_value = sum(stock.get('current_value', 0) for stock in portfolio_data)
+    return {stock['ticker']: (stock.get('current_value', 0) / total_value if total_value > 0 else 0)
+            for stock in portfolio_data}
+
+
+def portfolio_daily_returns(historical_data, portfolio_data):
+    """
+    Дневная доходность портфеля (в процентах) по общим для всех активов датам.
+
+    Args:
+        historical_data: {тикер: history_entry}
+        portfolio_data: позиции портфеля (веса - по текущей стоимости)
+
+    Returns:
+        list: доходность портфеля по дням
+    """
+    # Находим общие даты для всех активов
+    common_dates = None
+    for data in historical_data.values():
+        if common_dates is None:
+            common_dates = set(data['dates'])
+        else:
+            common_dates &= set(data['dates'])
+
+    if not common_dates:
+        return []
+
+    common_dates = sorted(common_dates)
+    weights = value_weights(portfolio_data)
+    # Позиция даты в данных актива - поиск по словарю, а не list.index
+    date_positions = {ticker: {date: i for i, date in enumerate(data['dates'])}
+                      for ticker, data in historical_data.items()}
+
+    portfolio_returns = []
+    for i in range(1, len(common_dates)):
+        daily_return = 0
+        for ticker, data in historical_data.items():
+            date_idx = date_positions[ticker][common_dates[i]]
+            prev_date_idx = date_positions[ticker][common_dates[i - 1]]
+            if date_idx < len(data['returns']) and prev_date_idx < len(data['returns']):
+                daily_return += weights.get(ticker, 0) * data['returns'][date_idx]
+        portfolio_returns.append(daily_return)
+
+    return portfolio_returns
+
+
+def sharpe_metrics(returns, risk_free_rate):
+    """
+    Годовые доходность, волатильность и коэффициент Шарпа.
+
+    Args:
+        returns: дневная доходность в процентах
+        risk_free_rate: безрисковая ставка, % годовых
+
+    Returns:
+        tuple: (доходность % годовых, волатильность % годовых, коэффициент Шарпа)
+    """
+    annual_return = np.mean(returns) * TRADING_DAYS
+    annual_volatility = np.std(returns) * np.sqrt(TRADING_DAYS)
+    sharpe = (annual_return - risk_free_rate) / annual_volatility if annual_volatility != 0 else 0
+    return annual_return, annual_volatility, sharpe
+
+
+def asset_metrics(historical_data, portfolio_data, portfolio_returns, risk_free_rate):
+    """
+    Показатели активов портфеля: вес, доходность, волатильность, Шарп, корреляция с портфелем.
+
+    Returns:
+        list: словари {'ticker', 'weight', 'return', 'volatility', 'sharpe', 'correlation'}
+    """
+    weights = value_weights(portfolio_data)
+    rows = []
+    for stock in portfolio_data:
+        ticker = stock['ticker']
+        asset_returns = historical_data.get(ticker, {}).get('returns')
+        if not asset_returns:
+            continue
+
+        annual_return, annual_volatility, sharpe = sharpe_metrics(asset_returns, risk_free_rate)
+        if len(asset_returns) == len(portfolio_returns):
+            correlation = np.corrcoef(asset_returns, portfolio_returns)[0, 1]
+        else:
+            correlation = 0
+
+        rows.append({
+            'ticker': ticker,
+            'weight': weights.get(ticker, 0) * 100,
+            'return': annual_return,
+            'volatility': annual_volatility,
+            'sharpe': sharpe,
+            'correlation': correlation
+        })
+    return rows
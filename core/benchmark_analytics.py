@@ -0,0 +1,99 @@
+# core/benchmark_analytics.py
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def returns_matrix(price_history):
+    """
+    Матрица дневных доходностей активов по общим датам.
+
+    Args:
+        price_history: {тикер: pd.Series цен закрытия}
+
+    Returns:
+        pd.DataFrame: доходности в долях (дни x тикеры)
+    """
+    prices = pd.DataFrame({ticker: series for ticker, series in price_history.items() if len(series)})
+    return prices.dropna().pct_change().iloc[1:]
+
+
+def portfolio_returns(asset_returns, weights):
+    """
+    Дневная доходность портфеля с фиксированными весами.
+
+    Args:
+        asset_returns: матрица доходностей (дни x тикеры)
+        weights: {тикер: вес}
+
+    Returns:
+        pd.Series: доходность портфеля
+    """
+    weight_vector = np.array([weights.get(ticker, 0) for ticker in asset_returns.columns], dtype=float)
+    if weight_vector.sum() > 0:
+        weight_vector /= weight_vector.sum()
+    return pd.Series(asset_returns.to_numpy() @ weight_vector, index=asset_returns.index, name='portfolio')
+
+
+def relative_metrics(portfolio, benchmark, window=63, risk_free_rate=0.0):
+    """
+    Скользящие бета, альфа, ошибка слежения и информационный коэффициент.
+    Все скользящие моменты считаются одним проходом rolling().mean()
+    по матрице из доходностей и их произведений.
+
+    Args:
+        portfolio: дневная доходность портфеля (pd.Series)
+        benchmark: дневная доходность индекса (pd.Series)
+        window: окно в торговых днях
+        risk_free_rate: безрисковая ставка (% годовых)
+
+    Returns:
+        tuple: (pd.DataFrame скользящих метрик, dict метрик за весь период)
+    """
+    aligned = pd.concat([portfolio, benchmark], axis=1, join='inner').dropna()
+    daily_rf = risk_free_rate / 100 / TRADING_DAYS
+    p = aligned.iloc[:, 0] - daily_rf
+    b = aligned.iloc[:, 1] - daily_rf
+    active = p - b
+
+    moments = pd.DataFrame({
+        'p': p, 'b': b, 'pb': p * b, 'bb': b * b,
+        'a': active, 'aa': active * active
+    })
+
+    def compute(means, n):
+        # Несмещенные оценки дисперсии и ковариации из средних значений
+        correction = n / (n - 1)
+        covariance = (means['pb'] - means['p'] * means['b']) * correction
+        variance = (means['bb'] - means['b'] ** 2) * correction
+        active_variance = ((means['aa'] - means['a'] ** 2) * correction).clip(lower=0)
+
+        beta = covariance / variance.replace(0, np.nan)
+        alpha = (means['p'] - beta * means['b']) * TRADING_DAYS
+        tracking_error = np.sqrt(active_variance * TRADING_DAYS)
+        information_ratio = means['a'] * TRADING_DAYS / tracking_error.replace(0, np.nan)
+        return beta, alpha, tracking_error, information_ratio
+
+    rolling_means = moments.rolling(window).mean()
+    beta, alpha, tracking_error, information_ratio = compute(rolling_means, window)
+    rolling = pd.DataFrame({
+        'beta': beta,
+        'alpha': alpha,
+        'tracking_error': tracking_error,
+        'information_ratio': information_ratio
+    }).dropna(how='all')
+
+    summary = {'days': len(aligned)}
+    if len(aligned) > 1:
+        # Весь период - то же окно, растянутое на все дни
+        beta, alpha, tracking_error, information_ratio = compute(moments.mean().to_frame().T, len(aligned))
+        summary.update({
+            'beta': float(beta.iloc[0]),
+            'alpha': float(alpha.iloc[0]),
+            'tracking_error': float(tracking_error.iloc[0]),
+            'information_ratio': float(information_ratio.iloc[0]),
+            'portfolio_return': float(np.prod(1 + aligned.iloc[:, 0]) - 1),
+            'benchmark_return': float(np.prod(1 + aligned.iloc[:, 1]) - 1)
+        })
+    return rolling, summary
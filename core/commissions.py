@@ -0,0 +1,282 @@
+# core/commissions.py
+import json
+import os
+from bisect import bisect_right
+from .instrumentation import timed
+
+
+class CommissionSchedule:
+    """
+    Скомпилированное расписание комиссий. Проценты переводятся в доли
+    один раз при изменении настроек, а не при каждом расчете.
+    Ставка брокера может зависеть от скользящего оборота счета (тарифные ступени).
+    """
+    
+    def __init__(self, commission_data):
+        """
+        Компиляция расписания.
+        
+        Args:
+            commission_data: настройки комиссий (проценты и суммы в руб);
+                             необязательный ключ 'tiers' - список ступеней
+                             {'turnover': оборот от, руб, 'broker_commission': %}
+        """
+        self.broker_rate = commission_data['broker_commission'] / 100
+        self.exchange_rate = commission_data['exchange_commission'] / 100
+        self.min_commission = commission_data['min_commission']
+        self.other_costs = commission_data['other_costs']
+        self.tax_rate = commission_data['tax_rate'] / 100
+        # Издержки сделки на нулевую сумму - минимальная комиссия и прочие расходы
+        self.fixed_costs = self.min_commission + self.other_costs
+        
+        # Ступени: пороги оборота и ставки брокера; ниже первого порога - базовая ставка
+        tiers = sorted(commission_data.get('tiers') or [], key=lambda tier: tier['turnover'])
+        self.tier_thresholds = [tier['turnover'] for tier in tiers]
+        self.tier_rates = [self.broker_rate] + [tier['broker_commission'] / 100 for tier in tiers]
+    
+    def rate_for(self, turnover):
+        """Ставка брокера (в долях) для оборота"""
+        if not self.tier_thresholds:
+            return self.broker_rate
+        return self.tier_rates[bisect_right(self.tier_thresholds, turnover)]
+    
+    def total(self, amount, turnover=None):
+        """
+        Сумма всех комиссий по сделке.
+        
+        Args:
+            amount: сумма сделки
+            turnover: скользящий оборот счета с учетом сделки для выбора ступени
+                      (по умолчанию - сумма сделки)
+        """
+        broker_rate = self.rate_for(amount if turnover is None else turnover)
+        return (max(amount * broker_rate, self.min_commission)
+                + amount * self.exchange_rate + self.other_costs)
+    
+    def breakdown(self, amount, turnover=None):
+        """Комиссии по сделке с разбивкой по видам"""
+        broker_rate = self.rate_for(amount if turnover is None else turnover)
+        broker_commission = max(amount * broker_rate, self.min_commission)
+        exchange_commission = amount * self.exchange_rate
+        total_commission = broker_commission + exchange_commission + self.other_costs
+        
+        return {
+            'broker_commission': broker_commission,
+            'exchange_commission': exchange_commission,
+            'other_costs': self.other_costs,
+            'total_commission': total_commission,
+            'total_with_commission': amount + total_commission
+        }
+    
+    def batch_costs(self, amounts, turnovers=None):
+        """
+        Комиссии для массива сделок одним векторным вычислением.
+        
+        Args:
+            amounts: суммы сделок (массив или список)
+            turnovers: скользящие обороты счета для выбора ступеней (по умолчанию - суммы сделок)
+            
+        Returns:
+            np.ndarray: сумма комиссий по каждой сделке
+        """
+        # numpy загружается при первом пакетном расчете, а не при запуске приложения
+        import numpy as np
+        
+        amounts = np.asarray(amounts, dtype=float)
+        if self.tier_thresholds:
+            turnovers = amounts if turnovers is None else np.asarray(turnovers, dtype=float)
+            tier_index = np.searchsorted(np.asarray(self.tier_thresholds, dtype=float), turnovers, side='right')
+            broker_rate = np.asarray(self.tier_rates, dtype=float)[tier_index]
+        else:
+            broker_rate = self.broker_rate
+        return (np.maximum(amounts * broker_rate, self.min_commission)
+                + amounts * self.exchange_rate + self.other_costs)
+
+
+class CommissionManager:
+    """
+    Менеджер комиссий для учета торговых издержек
+    """
+    
+    # Типы инструментов с отдельными профилями комиссий
+    PROFILES = {'stock': 'Акции', 'etf': 'ETF', 'bond': 'Облигации'}
+    BASE_KEYS = ('broker_commission', 'exchange_commission', 'min_commission', 'tax_rate', 'other_costs')
+    DEFAULT_SETTINGS = {
+        'broker_commission': 0.05,  # Комиссия брокера в %
+        'exchange_commission': 0.01,  # Комиссия биржи в %
+        'min_commission': 0.0,  # Минимальная комиссия в руб
+        'tax_rate': 13.0,  # Налог на доход в %
+        'other_costs': 0.0  # Прочие расходы в руб за сделку
+    }
+    
+    def __init__(self):
+        self.commission_data = {
+            **self.DEFAULT_SETTINGS,
+            'tiers': [],  # Ступени акций по обороту: [{'turnover': руб, 'broker_commission': %}]
+            'turnover_days': 30,  # Окно скользящего оборота счета для ступеней, дней
+            'profiles': {profile: {} for profile in self.PROFILES},  # Отличия профилей от базовых настроек
+            'overrides': {}  # Настройки для отдельных тикеров: {тикер: {'profile': ..., ключ: значение}}
+        }
+        
+        self.load_commission_data()
+        self.compile_schedule()
+    
+    def resolve_settings(self, instrument_type='stock', ticker=None):
+        """
+        Итоговые настройки: базовые -> профиль типа инструмента -> настройки тикера.
+        Базовые ступени по обороту относятся к акциям; у других профилей
+        ступени свои (ключ 'tiers' профиля), по умолчанию их нет.
+        
+        Args:
+            instrument_type: 'stock', 'etf' или 'bond'
+            ticker: тикер с индивидуальными настройками
+            
+        Returns:
+            dict: настройки для компиляции расписания
+        """
+        override = self.commission_data.get('overrides', {}).get(ticker, {}) if ticker else {}
+        profile = override.get('profile', instrument_type)
+        
+        settings = {key: self.commission_data[key] for key in self.BASE_KEYS}
+        settings['tiers'] = self.commission_data.get('tiers', []) if profile == 'stock' else []
+        settings.update(self.commission_data.get('profiles', {}).get(profile, {}))
+        settings.update({key: value for key, value in override.items() if key != 'profile'})
+        return settings
+    
+    def compile_schedule(self):
+        """Пересборка таблицы расписаний комиссий после изменения настроек"""
+        self.profile_schedules = {profile: CommissionSchedule(self.resolve_settings(profile))
+                                  for profile in self.PROFILES}
+        self.ticker_schedules = {ticker.upper(): CommissionSchedule(self.resolve_settings(ticker=ticker))
+                                 for ticker in self.commission_data.get('overrides', {})}
+        # Расписание по умолчанию (акции) - для кода, не различающего инструменты
+        self.schedule = self.profile_schedules['stock']
+    
+    def get_schedule(self, ticker=None, instrument_type='stock'):
+        """
+        Расписание комиссий для сделки - поиск по заранее собранной таблице.
+        
+        Args:
+            ticker: тикер инструмента
+            instrument_type: 'stock', 'etf' или 'bond'
+            
+        Returns:
+            CommissionSchedule: скомпилированное расписание
+        """
+        if ticker:
+            schedule = self.ticker_schedules.get(ticker.upper())
+            if schedule is not None:
+                return schedule
+        return self.profile_schedules.get(instrument_type, self.schedule)
+    
+    @timed('json.load commission')
+    def load_commission_data(self):
+        """Загрузка настроек комиссий из файла"""
+        try:
+            if os.path.exists('commission_settings.json'):
+                with open('commission_settings.json', 'r', encoding='utf-8') as f:
+                    saved_data = json.load(f)
+                    self.commission_data.update(saved_data)
+        except Exception as e:
+            print(f"Ошибка загрузки настроек комиссий: {e}")
+    
+    @timed('json.save commission')
+    def save_commission_data(self):
+        """Сохранение настроек комиссий в файл"""
+        self.compile_schedule()
+        try:
+            with open('commission_settings.json', 'w', encoding='utf-8') as f:
+                json.dump(self.commission_data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Ошибка сохранения настроек комиссий: {e}")
+    
+    def account_turnover(self, schedule, transaction_store, amount=0.0):
+        """
+        Скользящий оборот счета для выбора ступени с учетом новой сделки.
+        Для расписания без ступеней оборот не нужен и не считается.
+        
+        Args:
+            schedule: расписание комиссий сделки (CommissionSchedule)
+            transaction_store: история операций счета (TransactionStore)
+            amount: сумма новой сделки
+            
+        Returns:
+            float: оборот в руб или None, если у расписания нет ступеней
+        """
+        if not schedule.tier_thresholds:
+            return None
+        days = self.commission_data.get('turnover_days', 30)
+        return transaction_store.turnover(days) + amount
+    
+    def calculate_buy_commission(self, amount, ticker=None, instrument_type='stock', turnover=None):
+        """Расчет комиссий при покупке"""
+        return self.get_schedule(ticker, instrument_type).breakdown(amount, turnover)
+    
+    def calculate_sell_commission(self, amount, ticker=None, instrument_type='stock', turnover=None):
+        """Расчет комиссий при продаже"""
+        commission_calc = self.calculate_buy_commission(amount, ticker, instrument_type, turnover)
+        
+        # Добавляем расчет налога
+        # Налог рассчитывается отдельно при фактической продаже
+        return commission_calc
+    
+    def calculate_tax(self, buy_amount, sell_amount, quantity=1):
+        """Расчет налога на доход"""
+        profit = sell_amount - buy_amount
+        if profit > 0:
+            tax = profit * self.schedule.tax_rate
+        else:
+            tax = 0
+        
+        return tax
+    
+    def update_profile(self, profile, values):
+        """
+        Изменение настроек профиля с проверкой и сохранением в файл.
+        Налог и настройки акций - базовые для всех профилей; ETF и облигации
+        хранят только отличия от базовых значений.
+        
+        Args:
+            profile: 'stock', 'etf' или 'bond'
+            values: {ключ из BASE_KEYS: значение}
+            
+        Raises:
+            ValueError: значение вне допустимого диапазона
+        """
+        for key, value in values.items():
+            value = float(value)
+            if key in ['broker_commission', 'exchange_commission', 'tax_rate']:
+                if value < 0 or value > 100:
+                    raise ValueError(f"{key} должен быть между 0 и 100")
+            elif value < 0:
+                raise ValueError(f"{key} не может быть отрицательным")
+        
+        profiles = self.commission_data.setdefault('profiles', {})
+        for key, value in values.items():
+            value = float(value)
+            if key == 'tax_rate' or profile == 'stock':
+                self.commission_data[key] = value
+                profiles.get(profile, {}).pop(key, None)
+            elif value != self.commission_data[key]:
+                profiles.setdefault(profile, {})[key] = value
+            else:
+                profiles.get(profile, {}).pop(key, None)
+        
+        self.save_commission_data()
+    
+    def reset_to_default(self):
+        """Сброс базовых значений и профилей; ступени и настройки тикеров сохраняются"""
+        self.commission_data.update(self.DEFAULT_SETTINGS)
+        self.commission_data['profiles'] = {profile: {} for profile in self.PROFILES}
+        self.compile_schedule()
+
+
+_shared_manager = None
+
+
+def get_commission_manager():
+    """Общий для процесса менеджер комиссий: настройки читаются из файла один раз"""
+    global _shared_manager
+    if _shared_manager is None:
+        _shared_manager = CommissionManager()
+    return _shared_manager
@@ -0,0 +1,179 @@
+# core/data_handler.py
+from datetime import datetime, timedelta
+import pytz
+import random
+from .market_schedule import get_market_calendar
+from .moex_client import fetch_marketdata, fetch_history, iss_url
+from .instrumentation import timed
+
+class DataHandler:
+    """
+    Класс для обработки данных об акциях.
+    Получает реальные данные с Московской биржи.
+    """
+    
+    def __init__(self, ticker="SBER"):
+        self.ticker = ticker.upper()
+        # URL для получения данных об акциях
+        self.stock_url = iss_url(f"engines/stock/markets/shares/boards/TQBR/securities/{self.ticker}.json")
+        self.moscow_tz = pytz.timezone('Europe/Moscow')
+        
+        # Переменные для хранения предыдущих данных
+        self.previous_price = None
+        self.previous_time = None
+        
+        # Кэш для исторических данных
+        self.historical_data = []
+        
+    def set_ticker(self, ticker):
+        """Изменение тикера акции"""
+        self.ticker = ticker.upper()
+        self.stock_url = iss_url(f"engines/stock/markets/shares/boards/TQBR/securities/{self.ticker}.json")
+        # Сбрасываем предыдущие данные при смене тикера
+        self.previous_price = None
+        self.previous_time = None
+        self.historical_data = []
+        
+    def get_moscow_time(self):
+        """Получение текущего московского времени"""
+        return datetime.now(self.moscow_tz)
+    
+    def check_market_hours(self, current_time=None):
+        """Проверка, открыты ли сейчас торги на Московской бирже"""
+        if current_time is None:
+            current_time = self.get_moscow_time()
+        
+        # Торги на Московской бирже: пн-пт с 7:00 до 19:00, кроме праздников
+        return get_market_calendar().is_open(current_time)
+    
+    @timed('data_handler.get_real_time_data')
+    def get_real_time_data(self):
+        """Получение реальных данных с MOEX в реальном времени"""
+        try:
+            quote = fetch_marketdata([self.ticker]).get(self.ticker)
+            if quote:
+                return self.parse_quote(quote)
+            
+            return self.get_fallback_data()
+            
+        except Exception as e:
+            print(f"Ошибка получения реальных данных для {self.ticker}: {e}")
+            return self.get_fallback_data()
+    
+    def parse_quote(self, quote):
+        """
+        Разбор котировки ISS (securities + marketdata по названиям колонок).
+        Используется как для прямого запроса, так и для котировок из шины.
+        
+        Args:
+            quote: строка котировки по названиям колонок
+            
+        Returns:
+            dict: данные в формате get_stock_data
+        """
+        current_price = quote.get('LAST')
+        
+        # Если нет последней цены, используем текущую оценку
+        if current_price is None:
+            current_price = quote.get('LCURRENTPRICE')
+        
+        # Получаем другие показатели
+        open_price = quote.get('OPEN')
+        high_price = quote.get('HIGH')
+        low_price = quote.get('LOW')
+        volume = quote.get('VOLTODAY') or 0
+        
+        # Время обновления
+        update_time = quote.get('SYSTIME')
+        
+        if update_time:
+            try:
+                trade_time = datetime.strptime(update_time, '%Y-%m-%d %H:%M:%S')
+                trade_time = self.moscow_tz.localize(trade_time)
+            except:
+                trade_time = self.get_moscow_time()
+        else:
+            trade_time = self.get_moscow_time()
+        
+        # Если текущей цены нет, но есть цена открытия, используем ее
+        if current_price is None and open_price is not None:
+            current_price = open_price
+        
+        # Если все еще нет данных, возвращаем ошибку
+        if current_price is None:
+            return self.get_fallback_data()
+        
+        # Рассчитываем изменения
+        change_absolute = 0
+        change_percent = 0
+        
+        if open_price is not None and open_price != 0:
+            change_absolute = current_price - open_price
+            change_percent = (change_absolute / open_price) * 100
+        
+        # Сохраняем для истории
+        if self.previous_price is not None:
+            self.historical_data.append({
+                'time': trade_time,
+                'price': current_price,
+                'volume': volume
+            })
+        
+        self.previous_price = current_price
+        self.previous_time = trade_time
+        
+        return {
+            'success': True,
+            'ticker': self.ticker,
+            'price': current_price,
+            'time': trade_time,
+            'volume': volume,
+            'change_absolute': change_absolute,
+            'change_percent': change_percent,
+            'high': high_price if high_price else current_price,
+            'low': low_price if low_price else current_price,
+            'open': open_price if open_price else current_price,
+            'is_historical': False,
+            'is_fallback': False,
+            'data_source': 'MOEX Real-time'
+        }
+    
+    def get_historical_data(self, days=30):
+        """Получение исторических данных за указанное количество дней"""
+        try:
+            history = fetch_history(self.ticker, datetime.now() - timedelta(days=days))
+            return [(self.moscow_tz.localize(trade_date), close_price) for trade_date, close_price in history]
+            
+        except Exception as e:
+            print(f"Ошибка получения исторических данных для {self.ticker}: {e}")
+            return []
+    
+    def get_stock_data(self):
+        """Основной метод получения данных - использует реальные данные"""
+        return self.get_real_time_data()
+    
+    def get_fallback_data(self):
+        """Резервные данные только в случае полной недоступности MOEX"""
+        current_time = self.get_moscow_time()
+        
+        # Используем предыдущую цену если есть, иначе базовую
+        if self.previous_price is None:
+            base_price = 280.0
+        else:
+            base_price = self.previous_price
+        
+        return {
+            'success': False,
+            'ticker': self.ticker,
+            'price': base_price,
+            'time': current_time,
+            'volume': 0,
+            'change_absolute': 0,
+            'change_percent': 0,
+            'high': base_price,
+            'low': base_price,
+            'open': base_price,
+            'is_historical': False,
+            'is_fallback': True,
+            'data_source': 'Fallback'
+        }
\ No newline at end of file
@@ -0,0 +1,161 @@
+# core/dividends.py
+import json
+import os
+from datetime import datetime
+from .errors import PortfolioError
+from .instrumentation import timed
+
+
+def calculate_dividend(quantity, amount_per_share, tax_rate):
+    """
+    Расчет дивидендной выплаты.
+    
+    Args:
+        quantity: количество акций
+        amount_per_share: дивиденд на акцию, руб
+        tax_rate: ставка налога, %
+        
+    Returns:
+        tuple: (сумма дивидендов, сумма налога, чистая выплата)
+    """
+    total_dividends = quantity * amount_per_share
+    tax_amount = total_dividends * (tax_rate / 100)
+    return total_dividends, tax_amount, total_dividends - tax_amount
+
+
+class DividendStore:
+    """
+    История дивидендных выплат и их учет в доходе позиций портфеля.
+    """
+    
+    FILENAME = 'dividends_history.json'
+    
+    def __init__(self, portfolio_manager, data_dir=None):
+        """
+        Инициализация хранилища дивидендов.
+        
+        Args:
+            portfolio_manager: портфель, к позициям которого относятся выплаты
+            data_dir: каталог файлов портфеля (по умолчанию - текущий)
+        """
+        self.portfolio_manager = portfolio_manager
+        self.path = os.path.join(data_dir, self.FILENAME) if data_dir else self.FILENAME
+        self.dividend_history = []
+        self.load_dividend_history()
+    
+    @timed('json.load dividends')
+    def load_dividend_history(self):
+        """Загрузка истории дивидендов из JSON файла"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.dividend_history = json.load(f)
+        except Exception as e:
+            print(f"Ошибка загрузки истории дивидендов: {e}")
+            self.dividend_history = []
+    
+    @timed('json.save dividends')
+    def save_dividend_history(self):
+        """Сохранение истории дивидендов в JSON файл"""
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.dividend_history, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Ошибка сохранения истории дивидендов: {e}")
+    
+    def record_dividend(self, ticker, quantity, amount_per_share, tax_rate=13.0, payment_date=None):
+        """
+        Регистрация дивидендной выплаты: проверка, запись в историю и учет в позиции.
+        
+        Args:
+            ticker: тикер акции
+            quantity: количество акций с дивидендами
+            amount_per_share: дивиденд на акцию, руб
+            tax_rate: ставка налога, %
+            payment_date: дата выплаты (строка ГГГГ-ММ-ДД, по умолчанию - сегодня)
+            
+        Returns:
+            dict: запись о выплате
+            
+        Raises:
+            PortfolioError: некорректные данные или недостаточно акций
+        """
+        if not ticker or quantity <= 0 or amount_per_share <= 0:
+            raise PortfolioError("Заполните все поля корректно")
+        
+        # Проверяем доступное количество акций
+        stock = self.portfolio_manager.find_stock(ticker)
+        if not stock:
+            raise PortfolioError(f"Акция {ticker} не найдена в портфеле")
+        
+        if quantity > stock['quantity']:
+            raise PortfolioError(f"Недостаточно акций. Запрошено: {quantity}, доступно: {stock['quantity']}")
+        
+        total_dividends, tax_amount, net_dividends = calculate_dividend(quantity, amount_per_share, tax_rate)
+        
+        # Создаем запись о дивидендах
+        dividend_data = {
+            'ticker': ticker,
+            'date': payment_date or datetime.now().strftime("%Y-%m-%d"),
+            'quantity': quantity,
+            'amount_per_share': amount_per_share,
+            'total_amount': total_dividends,
+            'tax_rate': tax_rate,
+            'tax_amount': tax_amount,
+            'net_amount': net_dividends,
+            'total_shares_in_portfolio': stock['quantity']
+        }
+        
+        # Сохраняем в историю дивидендов и обновляем статистику портфеля
+        self.save_dividend_payment(dividend_data)
+        self.update_portfolio_with_dividend(ticker, net_dividends, quantity)
+        return dividend_data
+    
+    def save_dividend_payment(self, dividend_data):
+        """
+        Сохранение дивидендной выплаты в историю.
+        
+        Args:
+            dividend_data: данные о дивидендной выплате
+        """
+        try:
+            self.dividend_history.append(dividend_data)
+            self.save_dividend_history()
+                
+        except Exception as e:
+            print(f"Ошибка сохранения дивидендов: {e}")
+
+    def update_portfolio_with_dividend(self, ticker, dividend_amount, dividend_quantity):
+        """
+        Обновление портфеля с учетом полученных дивидендов.
+        
+        Args:
+            ticker: тикер акции
+            dividend_amount: сумма дивидендов
+            dividend_quantity: количество акций с дивидендами
+        """
+        # Добавляем поле для учета дивидендов в данные акции
+        for stock in self.portfolio_manager.portfolio_data:
+            if stock['ticker'] == ticker:
+                if 'dividend_income' not in stock:
+                    stock['dividend_income'] = 0
+                if 'dividend_transactions' not in stock:
+                    stock['dividend_transactions'] = []
+                
+                # Добавляем общую сумму дивидендов
+                stock['dividend_income'] += dividend_amount
+                
+                # Сохраняем информацию о транзакции
+                dividend_transaction = {
+                    'date': datetime.now().isoformat(),
+                    'quantity': dividend_quantity,
+                    'amount': dividend_amount,
+                    'type': 'dividend'
+                }
+                stock['dividend_transactions'].append(dividend_transaction)
+                
+                # Пересчитываем общую доходность
+                self.portfolio_manager.calculate_stock_values(stock)
+                break
+        
+        self.portfolio_manager.save_portfolio_data()
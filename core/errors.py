@@ -0,0 +1,8 @@
+# core/errors.py
+
+
+class PortfolioError(ValueError):
+    """
+    Ошибка операции с портфелем: некорректные данные, бумаги нет в портфеле,
+    недостаточное количество. Текст сообщения пригоден для показа пользователю.
+    """
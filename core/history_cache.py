@@ -0,0 +1,124 @@
+# core/history_cache.py
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+from .moex_client import fetch_history
+from .instrumentation import timed
+
+
+class HistoryCache:
+    """
+    Локальный кэш дневной истории цен закрытия с MOEX.
+    При повторном запросе догружаются только недостающие дни.
+    """
+
+    def __init__(self, cache_dir='history_cache'):
+        """
+        Инициализация кэша.
+
+        Args:
+            cache_dir: каталог для файлов кэша
+        """
+        self.cache_dir = cache_dir
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _get_lock(self, key):
+        """Блокировка для одного инструмента, чтобы не грузить его дважды параллельно"""
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _cache_path(self, ticker, board):
+        """Путь к файлу кэша инструмента"""
+        return os.path.join(self.cache_dir, f"{board.lower()}_{ticker.lower()}.json")
+
+    @timed('json.load history_cache')
+    def _load(self, path):
+        """Загрузка файла кэша"""
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Ошибка загрузки кэша истории {path}: {e}")
+        return None
+
+    @timed('json.save history_cache')
+    def _save(self, path, cached):
+        """Сохранение файла кэша (через временный файл - каталог могут читать другие процессы)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cached, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Ошибка сохранения кэша истории {path}: {e}")
+
+    def get_history(self, ticker, from_date, market='shares', board='TQBR'):
+        """
+        Получение истории цен закрытия с догрузкой недостающих дней.
+
+        Args:
+            ticker: тикер инструмента
+            from_date: начальная дата
+            market: рынок ('shares', 'index', ...)
+            board: режим торгов ('TQBR', 'TQTF', 'SNDX', ...)
+
+        Returns:
+            pd.Series: цены закрытия с индексом по датам
+        """
+        ticker = ticker.upper()
+        from_day = from_date.strftime('%Y-%m-%d')
+        today = datetime.now().strftime('%Y-%m-%d')
+        path = self._cache_path(ticker, board)
+
+        with self._get_lock(path):
+            cached = self._load(path) or {'ticker': ticker, 'market': market, 'board': board,
+                                          'covered_from': None, 'updated': None, 'prices': {}}
+            prices = cached['prices']
+            changed = False
+
+            # Догружаем более ранний период, если запрошено раньше, чем есть в кэше
+            if cached['covered_from'] is None or from_day < cached['covered_from']:
+                till_date = None
+                if cached['covered_from'] is not None:
+                    till_date = datetime.strptime(cached['covered_from'], '%Y-%m-%d') - timedelta(days=1)
+                for date, close in fetch_history(ticker, from_date, till_date, market, board):
+                    prices[date.strftime('%Y-%m-%d')] = close
+                cached['covered_from'] = from_day
+                if till_date is None:
+                    cached['updated'] = today
+                changed = True
+
+            # Догружаем новые дни с момента последнего обновления
+            if cached['updated'] != today:
+                last_day = max(prices) if prices else cached['covered_from']
+                for date, close in fetch_history(ticker, datetime.strptime(last_day, '%Y-%m-%d'), None, market, board):
+                    prices[date.strftime('%Y-%m-%d')] = close
+                cached['updated'] = today
+                changed = True
+
+            if changed:
+                self._save(path, cached)
+
+        days = sorted(day for day in prices if day >= from_day)
+        return pd.Series([prices[day] for day in days], index=pd.DatetimeIndex(days), dtype=float, name=ticker)
+
+
+_shared_cache = None
+
+
+def get_history_cache(cache_dir=None):
+    """
+    Общий для процесса кэш истории.
+
+    Args:
+        cache_dir: каталог кэша (задается при первом обращении)
+    """
+    global _shared_cache
+    if _shared_cache is None or (cache_dir is not None and cache_dir != _shared_cache.cache_dir):
+        _shared_cache = HistoryCache(cache_dir or 'history_cache')
+    return _shared_cache
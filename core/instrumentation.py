@@ -0,0 +1,286 @@
+# core/instrumentation.py
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class Histogram:
+    """
+    Распределение длительностей: точные счетчик, сумма и максимум
+    плюс последние samples значений для перцентилей (память ограничена).
+    """
+
+    def __init__(self, samples=2048):
+        """
+        Инициализация гистограммы.
+
+        Args:
+            samples: количество последних значений для расчета перцентилей
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=samples)
+
+    def add(self, value):
+        """Добавить значение"""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def percentiles(self, *points):
+        """
+        Перцентили по последним значениям.
+
+        Args:
+            points: перцентили в процентах (50, 95, 99)
+
+        Returns:
+            list: значения перцентилей
+        """
+        values = sorted(self._recent)
+        if not values:
+            return [0.0 for _ in points]
+        return [values[min(int(len(values) * point / 100), len(values) - 1)] for point in points]
+
+
+class Metrics:
+    """
+    Реестр метрик процесса: счетчики и гистограммы длительностей в миллисекундах.
+    Запись потокобезопасна и дешева - метрики можно оставлять включенными всегда.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._histograms = {}
+
+    def increment(self, name, value=1):
+        """Увеличить счетчик"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name, value):
+        """
+        Записать длительность.
+
+        Args:
+            name: имя метрики
+            value: длительность в миллисекундах
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(value)
+
+    def timer(self, name):
+        """Контекстный менеджер, записывающий длительность блока"""
+        return _Timer(self, name)
+
+    def snapshot(self):
+        """
+        Текущие значения метрик.
+
+        Returns:
+            dict: 'timers' - {имя: count, mean, p50, p95, p99, max}, 'counters' - {имя: значение}
+        """
+        with self._lock:
+            timers = {}
+            for name, histogram in self._histograms.items():
+                p50, p95, p99 = histogram.percentiles(50, 95, 99)
+                timers[name] = {
+                    'count': histogram.count,
+                    'mean': histogram.total / histogram.count,
+                    'p50': p50,
+                    'p95': p95,
+                    'p99': p99,
+                    'max': histogram.max
+                }
+            return {'timers': timers, 'counters': dict(self._counters)}
+
+    def reset(self):
+        """Сбросить все метрики"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class _Timer:
+    """Замер длительности блока; при исключении дополнительно считается ошибка"""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, (time.perf_counter() - self.started) * 1000)
+        if exc_type is not None:
+            self.metrics.increment(f"{self.name} errors")
+        return False
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Общий для процесса реестр метрик"""
+    return _metrics
+
+
+def timed(name):
+    """
+    Декоратор: записывает длительность каждого вызова функции в метрику name.
+
+    Args:
+        name: имя метрики
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик: фоновый поток периодически снимает стеки
+    всех потоков через sys._current_frames(). Накладные расходы не зависят
+    от количества вызовов функций, поэтому его можно включать в рабочем режиме.
+    Результат - свернутые стеки (формат flamegraph.pl / speedscope).
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        Инициализация профилировщика.
+
+        Args:
+            interval: период снятия стеков в секундах
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Начать сбор стеков"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self, path):
+        """
+        Остановить сбор и записать свернутые стеки в файл.
+
+        Args:
+            path: путь к файлу
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileCapture:
+    """
+    Запись профиля по запросу: cProfile (детерминированный, только поток,
+    из которого запущен - обычно поток интерфейса) или сэмплирующий профилировщик.
+    """
+
+    MODES = ('cprofile', 'sampling')
+
+    def __init__(self):
+        self.mode = None
+        self._profiler = None
+
+    @property
+    def active(self):
+        """Идет ли запись профиля"""
+        return self._profiler is not None
+
+    def start(self, mode='cprofile'):
+        """
+        Начать запись профиля.
+
+        Args:
+            mode: 'cprofile' или 'sampling'
+        """
+        if self.active:
+            return
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        if mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        self.mode = mode
+
+    def stop(self, path=None):
+        """
+        Остановить запись и сохранить профиль.
+
+        Args:
+            path: путь к файлу (по умолчанию - profile_<время>.prof / .folded в текущем каталоге)
+
+        Returns:
+            str: путь к сохраненному профилю или None, если запись не шла
+        """
+        if not self.active:
+            return None
+        if path is None:
+            extension = 'prof' if self.mode == 'cprofile' else 'folded'
+            path = f"profile_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.stop(path)
+        self._profiler = None
+        self.mode = None
+        return path
+
+
+_profile_capture = ProfileCapture()
+
+
+def get_profile_capture():
+    """
+    Общий объект записи профиля. Если задана переменная окружения
+    MOEX_PROFILE=cprofile|sampling, запись начинается при первом обращении.
+    """
+    mode = os.environ.pop('MOEX_PROFILE', None)
+    if mode:
+        _profile_capture.start(mode)
+    return _profile_capture
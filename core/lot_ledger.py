@@ -0,0 +1,233 @@
+# Журнал лотов - учет покупок по партиям и расчет налога методом FIFO
+from collections import deque
+from datetime import datetime
+
+
+class LotLedger:
+    """
+    Учет лотов по каждому тикеру. Каждая покупка - отдельный лот
+    [дата, количество, цена, комиссия] в очереди; продажа списывает
+    лоты с начала очереди (FIFO), как это делает брокер при расчете НДФЛ.
+    Операция 'close' истории снимает все лоты тикера без продажи.
+    """
+
+    EXEMPTION_YEARS = 3  # Минимальный срок владения для льготы (ЛДВ), лет
+    EXEMPTION_PER_YEAR = 3_000_000  # Необлагаемый доход за каждый полный год владения, руб
+
+    def __init__(self, tax_rate=0.13):
+        """
+        Инициализация журнала.
+
+        Args:
+            tax_rate: ставка налога на доход (в долях)
+        """
+        self.tax_rate = tax_rate
+        self.lots = {}
+        self.realized = []
+
+    @classmethod
+    def from_transactions(cls, transactions, tax_rate=0.13):
+        """
+        Восстановление журнала по истории операций.
+
+        Args:
+            transactions: операции в формате TransactionManager
+            tax_rate: ставка налога на доход (в долях)
+
+        Returns:
+            LotLedger: журнал с открытыми лотами и реализованными продажами
+        """
+        ledger = cls(tax_rate)
+        for transaction in sorted(transactions, key=lambda t: t['date']):
+            date = datetime.fromisoformat(transaction['date'])
+            commission = transaction.get('commission', 0) or 0
+            if transaction['operation'] == 'buy':
+                ledger.add_lot(transaction['ticker'], date, transaction['quantity'],
+                               transaction['price'], commission)
+            elif transaction['operation'] == 'close':
+                ledger.close(transaction['ticker'])
+            else:
+                ledger.sell(transaction['ticker'], date, transaction['quantity'],
+                            transaction['price'], commission)
+        return ledger
+
+    def add_lot(self, ticker, date, quantity, price, commission=0.0):
+        """
+        Регистрация покупки.
+
+        Args:
+            ticker: тикер
+            date: дата покупки
+            quantity: количество
+            price: цена покупки
+            commission: комиссия за покупку
+        """
+        self.lots.setdefault(ticker, deque()).append([date, quantity, price, commission])
+
+    def close(self, ticker):
+        """
+        Списание всех открытых лотов тикера без продажи - позиция удалена
+        из портфеля или заменена новой (тогда следом добавляется ее лот).
+
+        Args:
+            ticker: тикер
+        """
+        self.lots.pop(ticker, None)
+
+    def open_quantity(self, ticker):
+        """Количество бумаг в открытых лотах"""
+        return sum(lot[1] for lot in self.lots.get(ticker, ()))
+
+    def _match(self, ticker, date, quantity, price, commission, fallback_price, consume):
+        """
+        Сопоставление продажи с лотами FIFO.
+        При consume=True списанные лоты удаляются из очереди: полностью
+        проданный лот - popleft(), частично проданный уменьшается на месте.
+        """
+        lots = self.lots.get(ticker, deque())
+        fragments = []
+        remaining = quantity
+        index = 0
+
+        while remaining > 0 and index < len(lots):
+            lot = lots[index] if not consume else lots[0]
+            lot_date, lot_quantity, lot_price, lot_commission = lot
+            matched = min(remaining, lot_quantity)
+            buy_commission = lot_commission * matched / lot_quantity
+            fragments.append(self._fragment(ticker, lot_date, date, matched, lot_price, price,
+                                            buy_commission, commission * matched / quantity))
+            remaining -= matched
+
+            if consume:
+                if matched == lot_quantity:
+                    lots.popleft()
+                else:
+                    lot[1] -= matched
+                    lot[3] -= buy_commission
+            else:
+                index += 1
+
+        # Бумаги без истории покупок (например, добавленные до ведения журнала) -
+        # по переданной средней цене без льготы по сроку владения; без нее - без прибыли
+        if remaining > 0:
+            buy_price = price if fallback_price is None else fallback_price
+            fragments.append(self._fragment(ticker, None, date, remaining, buy_price, price,
+                                            0.0, commission * remaining / quantity))
+        return fragments
+
+    def _fragment(self, ticker, buy_date, sell_date, quantity, buy_price, sell_price,
+                  buy_commission, sell_commission):
+        """Реализованная часть продажи, сопоставленная с одним лотом"""
+        cost = quantity * buy_price + buy_commission
+        proceeds = quantity * sell_price - sell_commission
+        holding_years = self._full_years(buy_date, sell_date) if buy_date else 0
+        return {
+            'ticker': ticker,
+            'buy_date': buy_date,
+            'sell_date': sell_date,
+            'quantity': quantity,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'cost': cost,
+            'proceeds': proceeds,
+            'gain': proceeds - cost,
+            'holding_years': holding_years,
+            'exempt_eligible': holding_years >= self.EXEMPTION_YEARS
+        }
+
+    @staticmethod
+    def _full_years(start, end):
+        """Количество полных лет владения"""
+        years = end.year - start.year
+        if (end.month, end.day) < (start.month, start.day):
+            years -= 1
+        return max(years, 0)
+
+    def preview_sale(self, ticker, date, quantity, price, commission=0.0, fallback_price=None):
+        """
+        Расчет продажи без изменения журнала (для подтверждения сделки).
+
+        Returns:
+            dict: реализованные части, прибыль и налог с учетом продаж того же года
+        """
+        fragments = self._match(ticker, date, quantity, price, commission, fallback_price, consume=False)
+        year_before = self.year_summary(date.year)
+        year_after = self.year_summary(date.year, self.realized + fragments)
+        return {
+            'fragments': fragments,
+            'gain': sum(fragment['gain'] for fragment in fragments),
+            'tax': year_after['tax'] - year_before['tax']
+        }
+
+    def sell(self, ticker, date, quantity, price, commission=0.0, fallback_price=None):
+        """
+        Регистрация продажи со списанием лотов FIFO.
+
+        Args:
+            ticker: тикер
+            date: дата продажи
+            quantity: количество
+            price: цена продажи
+            commission: комиссия за продажу
+            fallback_price: цена покупки для бумаг без истории покупок
+
+        Returns:
+            list: реализованные части продажи
+        """
+        fragments = self._match(ticker, date, quantity, price, commission, fallback_price, consume=True)
+        self.realized.extend(fragments)
+        if ticker in self.lots and not self.lots[ticker]:
+            del self.lots[ticker]
+        return fragments
+
+    def year_summary(self, year, realized=None):
+        """
+        Налоговые итоги одного года.
+        Льгота за долгосрочное владение: необлагаемый доход не больше
+        3 млн руб x Кц, где Кц - среднее число полных лет владения,
+        взвешенное по выручке от продажи бумаг, которыми владели 3 года и больше.
+
+        Args:
+            year: налоговый год
+            realized: реализованные части (по умолчанию - все продажи журнала)
+
+        Returns:
+            dict: выручка, расходы, прибыль, льгота, налоговая база и налог
+        """
+        fragments = [f for f in (self.realized if realized is None else realized)
+                     if f['sell_date'].year == year]
+
+        proceeds = sum(f['proceeds'] for f in fragments)
+        cost = sum(f['cost'] for f in fragments)
+        gain = proceeds - cost
+
+        eligible = [f for f in fragments if f['exempt_eligible']]
+        eligible_gain = max(sum(f['gain'] for f in eligible), 0.0)
+        eligible_proceeds = sum(f['proceeds'] for f in eligible)
+        exemption = 0.0
+        if eligible_gain > 0 and eligible_proceeds > 0:
+            weighted_years = sum(f['proceeds'] * f['holding_years'] for f in eligible) / eligible_proceeds
+            exemption = min(eligible_gain, self.EXEMPTION_PER_YEAR * weighted_years)
+
+        taxable = max(gain - exemption, 0.0)
+        return {
+            'year': year,
+            'proceeds': proceeds,
+            'cost': cost,
+            'gain': gain,
+            'exemption': exemption,
+            'taxable': taxable,
+            'tax': taxable * self.tax_rate
+        }
+
+    def tax_report(self):
+        """
+        Налоговый отчет по годам.
+
+        Returns:
+            list: итоги year_summary по каждому году с продажами
+        """
+        by_year = {}
+        for fragment in self.realized:
+            by_year.setdefault(fragment['sell_date'].year, []).append(fragment)
+        return [self.year_summary(year, fragments) for year, fragments in sorted(by_year.items())]
@@ -0,0 +1,249 @@
+# core/market_schedule.py
+import json
+import math
+import os
+import random
+import statistics
+import threading
+import time as clock
+from collections import deque
+from datetime import date, datetime, time, timedelta
+import pytz
+
+MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+
+# Государственные праздники РФ (месяц, день) - не календарь Мосбиржи: биржа
+# торгует в часть этих дней. Список включается явно (use_default_holidays)
+# как грубое приближение; точные дни без торгов задаются в market_holidays.json
+# и должны сверяться с ежегодными объявлениями Мосбиржи
+DEFAULT_HOLIDAYS = [(1, 1), (1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (1, 7), (1, 8),
+                    (2, 23), (3, 8), (5, 1), (5, 9), (6, 12), (11, 4)]
+
+
+class MarketCalendar:
+    """
+    Расписание торгов Мосбиржи: будни с 7:00 до 19:00 по Москве
+    без дней, в которые биржа не торгует. Эти дни и торговые выходные
+    задаются в market_holidays.json по объявлениям Мосбиржи - файл нужно
+    обновлять при публикации календаря на новый год:
+        {"holidays": ["2025-05-02", ...], "workdays": ["2025-11-01", ...],
+         "use_default_holidays": false}
+    Без файла праздники не учитываются: лишний опрос в нерабочий день
+    дешевле пропущенной торговой сессии.
+    """
+
+    FILENAME = 'market_holidays.json'
+
+    def __init__(self, path=None, open_time=time(7, 0), close_time=time(19, 0), use_default_holidays=False):
+        """
+        Инициализация расписания.
+
+        Args:
+            path: файл праздников (по умолчанию - market_holidays.json в текущем каталоге)
+            open_time: начало торгов
+            close_time: окончание торгов
+            use_default_holidays: считать нерабочими государственные праздники
+                                  DEFAULT_HOLIDAYS (можно включить и в файле)
+        """
+        self.path = path or self.FILENAME
+        self.open_time = open_time
+        self.close_time = close_time
+        self.use_default_holidays = use_default_holidays
+        self.holidays = set()
+        self.workdays = set()
+        self.load()
+
+    def load(self):
+        """Загрузка праздников и переносов из файла"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.holidays = {date.fromisoformat(day) for day in data.get('holidays', [])}
+            self.workdays = {date.fromisoformat(day) for day in data.get('workdays', [])}
+            self.use_default_holidays = data.get('use_default_holidays', self.use_default_holidays)
+        except Exception as e:
+            print(f"Ошибка загрузки календаря торгов: {e}")
+
+    def now(self):
+        """Текущее московское время"""
+        return datetime.now(MOSCOW_TZ)
+
+    def is_trading_day(self, day):
+        """
+        Есть ли торги в этот день.
+
+        Args:
+            day: дата (date)
+        """
+        if day in self.workdays:
+            return True
+        if day in self.holidays:
+            return False
+        if self.use_default_holidays and (day.month, day.day) in DEFAULT_HOLIDAYS:
+            return False
+        return day.weekday() < 5
+
+    def is_open(self, current_time=None):
+        """
+        Идут ли торги в указанный момент.
+
+        Args:
+            current_time: московское время (по умолчанию - текущее)
+        """
+        if current_time is None:
+            current_time = self.now()
+        return (self.is_trading_day(current_time.date())
+                and self.open_time <= current_time.time() <= self.close_time)
+
+    def seconds_until_open(self, current_time=None):
+        """
+        Секунды до начала ближайшей торговой сессии (0, если торги идут).
+
+        Args:
+            current_time: московское время (по умолчанию - текущее)
+        """
+        if current_time is None:
+            current_time = self.now()
+        if self.is_open(current_time):
+            return 0
+
+        day = current_time.date()
+        if current_time.time() > self.close_time:
+            day += timedelta(days=1)
+        # Длинные праздники - не больше пары недель
+        for _ in range(30):
+            if self.is_trading_day(day):
+                break
+            day += timedelta(days=1)
+
+        opening = datetime.combine(day, self.open_time)
+        if current_time.tzinfo is not None:
+            current_time = current_time.replace(tzinfo=None)
+        return max(0.0, (opening - current_time).total_seconds())
+
+
+_shared_calendar = None
+
+
+def get_market_calendar():
+    """Общее для процесса расписание торгов"""
+    global _shared_calendar
+    if _shared_calendar is None:
+        _shared_calendar = MarketCalendar()
+    return _shared_calendar
+
+
+class AdaptiveScheduler:
+    """
+    Период опроса биржи в зависимости от обстановки:
+    - вне торговой сессии - редкий опрос (и пробуждение к открытию торгов);
+    - при росте волатильности цен период сокращается до min_interval;
+    - после ошибок - экспоненциальная задержка со случайным разбросом,
+      ответ 429 с Retry-After соблюдается.
+    """
+
+    def __init__(self, interval=5, min_interval=1, closed_interval=300, max_backoff=300,
+                 volatility_threshold=0.15, window=20, calendar=None):
+        """
+        Инициализация планировщика.
+
+        Args:
+            interval: обычный период опроса в секундах
+            min_interval: минимальный период при высокой волатильности
+            closed_interval: период опроса вне торговой сессии
+            max_backoff: предельная задержка после ошибок
+            volatility_threshold: волатильность (% за минуту), с которой опрос учащается
+            window: количество последних цен тикера для оценки волатильности
+            calendar: расписание торгов (по умолчанию - общее)
+        """
+        self.interval = interval
+        self.min_interval = min_interval
+        self.closed_interval = closed_interval
+        self.max_backoff = max_backoff
+        self.volatility_threshold = volatility_threshold
+        self.window = window
+        self.calendar = calendar or get_market_calendar()
+        self.failures = 0
+        self.retry_after = 0
+        self._prices = {}  # тикер -> deque[(time.monotonic, цена)]
+        self._lock = threading.Lock()
+
+    def set_interval(self, interval):
+        """Изменение обычного периода опроса"""
+        self.interval = interval
+
+    def record_quotes(self, quotes):
+        """
+        Учет полученных котировок для оценки волатильности.
+
+        Args:
+            quotes: {тикер: котировка ISS}
+        """
+        now = clock.monotonic()
+        with self._lock:
+            for ticker, quote in quotes.items():
+                price = quote.get('LAST') or quote.get('LCURRENTPRICE')
+                if not price:
+                    continue
+                prices = self._prices.get(ticker)
+                if prices is None:
+                    prices = self._prices[ticker] = deque(maxlen=self.window)
+                prices.append((now, float(price)))
+
+    def record_success(self):
+        """Успешный опрос - сброс задержки после ошибок"""
+        self.failures = 0
+        self.retry_after = 0
+
+    def record_error(self, retry_after=None):
+        """
+        Неудачный опрос.
+
+        Args:
+            retry_after: пауза, запрошенная сервером (Retry-After), в секундах
+        """
+        self.failures += 1
+        self.retry_after = retry_after or 0
+
+    def volatility(self):
+        """
+        Наибольшая по тикерам волатильность последних цен, % за минуту
+        (изменения нормированы на время между опросами).
+        """
+        result = 0.0
+        with self._lock:
+            series = [list(prices) for prices in self._prices.values()]
+        for prices in series:
+            changes = []
+            for (t0, p0), (t1, p1) in zip(prices, prices[1:]):
+                if t1 > t0 and p0:
+                    changes.append((p1 - p0) / p0 * 100 / math.sqrt((t1 - t0) / 60))
+            if len(changes) >= 2:
+                result = max(result, statistics.pstdev(changes))
+        return result
+
+    def next_delay(self, current_time=None):
+        """
+        Пауза до следующего опроса.
+
+        Args:
+            current_time: московское время (по умолчанию - текущее)
+
+        Returns:
+            float: пауза в секундах
+        """
+        if self.failures:
+            backoff = min(self.max_backoff, self.interval * 2 ** self.failures)
+            # Половина задержки фиксирована, половина случайна - клиенты не приходят разом
+            return max(self.retry_after, backoff / 2 + random.uniform(0, backoff / 2))
+
+        until_open = self.calendar.seconds_until_open(current_time)
+        if until_open > 0:
+            return max(self.interval, min(self.closed_interval, until_open))
+
+        volatility = self.volatility()
+        if volatility > self.volatility_threshold:
+            return max(self.min_interval, self.interval * self.volatility_threshold / volatility)
+        return self.interval
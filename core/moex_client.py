@@ -0,0 +1,266 @@
+# core/moex_client.py
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime
+from .instrumentation import get_metrics
+
+# Базовый адрес информационно-статистического сервера Мосбиржи.
+# Переменная окружения MOEX_ISS_URL позволяет работать с локальным симулятором (iss_simulator.py)
+ISS_BASE_URL = os.environ.get('MOEX_ISS_URL', "https://iss.moex.com/iss").rstrip('/')
+
+
+def set_base_url(url):
+    """
+    Смена адреса ISS во время работы (например, для тестов и бенчмарков).
+
+    Args:
+        url: базовый адрес вида 'http://host:port/iss'
+    """
+    global ISS_BASE_URL
+    ISS_BASE_URL = url.rstrip('/')
+
+
+def iss_url(path):
+    """
+    Полный адрес запроса к ISS.
+
+    Args:
+        path: путь относительно базового адреса ('engines/stock/...')
+
+    Returns:
+        str: адрес запроса
+    """
+    return f"{ISS_BASE_URL}/{path.lstrip('/')}"
+
+
+class RateLimitError(Exception):
+    """ISS ограничил частоту запросов (HTTP 429)"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("Превышена частота запросов к ISS")
+        # Пауза, запрошенная сервером в заголовке Retry-After, в секундах
+        self.retry_after = retry_after
+
+
+class _Flight:
+    """Выполняющийся запрос, результат которого получат все ожидающие его потоки"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Выполняющиеся запросы: (адрес, параметры) -> _Flight
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_json(url, params=None, timeout=10):
+    """
+    GET-запрос к ISS с разбором JSON.
+
+    Одновременные одинаковые запросы (тот же адрес и параметры) из разных
+    потоков объединяются: на биржу уходит один запрос, остальные потоки ждут
+    его и получают тот же ответ (ответ общий - изменять его нельзя).
+
+    Args:
+        url: полный адрес запроса
+        params: параметры запроса
+        timeout: таймаут запроса в секундах
+
+    Returns:
+        dict: ответ сервера
+    """
+    key = (url, tuple(sorted((params or {}).items())))
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    metrics = get_metrics()
+    if not leader:
+        metrics.increment('http.coalesced')
+        with metrics.timer(f"http {endpoint_name(url)} (coalesced)"):
+            if not flight.done.wait(timeout):
+                raise TimeoutError(f"Истек срок ожидания запроса {endpoint_name(url)}")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        # requests загружается при первом запросе - импорт ядра остается быстрым
+        import requests
+
+        metrics.increment('http.requests')
+        with metrics.timer(f"http {endpoint_name(url)}"):
+            response = requests.get(url, params=params, timeout=timeout)
+            if response.status_code == 429:
+                retry_after = response.headers.get('Retry-After', '')
+                raise RateLimitError(float(retry_after) if retry_after.isdigit() else None)
+            response.raise_for_status()
+            flight.result = response.json()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def endpoint_name(url):
+    """
+    Имя эндпоинта ISS для метрик: путь без базового адреса, тикер заменен на {ticker}.
+
+    Args:
+        url: полный адрес запроса
+
+    Returns:
+        str: например 'history/engines/stock/markets/shares/boards/TQBR/securities/{ticker}.json'
+    """
+    path = url[len(ISS_BASE_URL):] if url.startswith(ISS_BASE_URL) else url
+    return re.sub(r'/securities/[^/]+\.json$', '/securities/{ticker}.json', path.strip('/'))
+
+
+def table_rows(data, block):
+    """
+    Преобразование блока ответа ISS в список словарей по названиям колонок.
+
+    Args:
+        data: ответ ISS
+        block: название блока ('marketdata', 'securities', 'history', ...)
+
+    Returns:
+        list: строки блока в виде словарей
+    """
+    table = data.get(block) or {}
+    columns = table.get('columns', [])
+    return [dict(zip(columns, row)) for row in table.get('data', [])]
+
+
+def fetch_history(ticker, from_date, till_date=None, market='shares', board='TQBR', timeout=10):
+    """
+    Получение дневной истории цен закрытия с постраничной загрузкой.
+    ISS отдает историю страницами по 100 строк, поэтому идем по курсору до конца.
+
+    Args:
+        ticker: тикер инструмента
+        from_date: начальная дата (datetime или date)
+        till_date: конечная дата (по умолчанию - сегодня)
+        market: рынок ('shares', 'index', ...)
+        board: режим торгов ('TQBR', 'TQTF', 'SNDX', ...)
+        timeout: таймаут одного запроса в секундах
+
+    Returns:
+        list: пары (дата, цена закрытия) в хронологическом порядке
+    """
+    url = iss_url(f"history/engines/stock/markets/{market}/boards/{board}/securities/{ticker}.json")
+    params = {'from': from_date.strftime('%Y-%m-%d'), 'start': 0, 'iss.meta': 'off'}
+    if till_date is not None:
+        params['till'] = till_date.strftime('%Y-%m-%d')
+
+    history = []
+    while True:
+        data = get_json(url, params=params, timeout=timeout)
+        rows = table_rows(data, 'history')
+
+        for row in rows:
+            date_str = row.get('TRADEDATE')
+            close_price = row.get('CLOSE')
+            if date_str and close_price:
+                history.append((datetime.strptime(date_str, '%Y-%m-%d'), float(close_price)))
+
+        cursor = table_rows(data, 'history.cursor')
+        if cursor:
+            next_start = cursor[0]['INDEX'] + cursor[0]['PAGESIZE']
+            if next_start >= cursor[0]['TOTAL']:
+                break
+        elif not rows:
+            break
+        else:
+            next_start = params['start'] + len(rows)
+        params['start'] = next_start
+
+    history.sort(key=lambda point: point[0])
+    return history
+
+
+def fetch_marketdata(tickers, market='shares', board='TQBR', timeout=10):
+    """
+    Получение текущих котировок сразу по нескольким инструментам одним запросом.
+
+    Args:
+        tickers: список тикеров
+        market: рынок ('shares', 'index', ...)
+        board: режим торгов ('TQBR', 'TQTF', 'SNDX', ...)
+        timeout: таймаут запроса в секундах
+
+    Returns:
+        dict: {тикер: строка securities, дополненная строкой marketdata}
+    """
+    url = iss_url(f"engines/stock/markets/{market}/boards/{board}/securities.json")
+    params = {
+        'securities': ','.join(tickers),
+        'iss.only': 'securities,marketdata',
+        'iss.meta': 'off'
+    }
+    data = get_json(url, params=params, timeout=timeout)
+
+    quotes = {}
+    for block in ('securities', 'marketdata'):
+        for row in table_rows(data, block):
+            ticker = row.get('SECID')
+            if ticker:
+                quotes.setdefault(ticker, {}).update(row)
+    return quotes
+
+
+def fetch_marketdata_batches(tickers, on_batch, market='shares', board='TQBR',
+                             batch_size=50, max_workers=4, timeout=10, on_error=None):
+    """
+    Параллельная загрузка котировок пачками с общим сроком ожидания.
+    Каждая полученная пачка сразу передается в on_batch, не дожидаясь остальных.
+
+    Args:
+        tickers: список тикеров
+        on_batch: функция, принимающая dict {тикер: котировка} очередной пачки
+        market: рынок
+        board: режим торгов
+        batch_size: количество тикеров в одном запросе
+        max_workers: количество одновременных запросов
+        timeout: срок ожидания всех пачек в секундах
+        on_error: функция, принимающая исключение неудавшейся пачки
+
+    Returns:
+        set: тикеры, котировки которых получить не удалось
+    """
+    tickers = list(dict.fromkeys(tickers))
+    missing = set(tickers)
+    if not tickers:
+        return missing
+
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(batches)))
+    futures = [executor.submit(fetch_marketdata, batch, market, board, timeout) for batch in batches]
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                quotes = future.result()
+            except Exception as e:
+                print(f"Ошибка получения котировок: {e}")
+                if on_error is not None:
+                    on_error(e)
+                continue
+            missing.difference_update(quotes)
+            on_batch(quotes)
+    except FuturesTimeoutError:
+        print(f"Истек срок ожидания котировок, не получено: {len(missing)}")
+    finally:
+        # Не ждем зависшие запросы - их результат уже не нужен
+        executor.shutdown(wait=False, cancel_futures=True)
+    return missing
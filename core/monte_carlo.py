@@ -0,0 +1,207 @@
+# core/monte_carlo.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+def build_returns_matrix(historical_data):
+    """
+    Построение матрицы дневных доходностей по общим датам всех активов.
+
+    Args:
+        historical_data: словарь {тикер: {'dates': [...], 'prices': [...]}}
+
+    Returns:
+        tuple: (список тикеров, список дат, матрица доходностей [дни x активы] в долях)
+    """
+    tickers = [ticker for ticker, data in historical_data.items() if data.get('dates')]
+    if not tickers:
+        return [], [], np.empty((0, 0))
+
+    # Находим общие даты для всех активов
+    common_dates = set(historical_data[tickers[0]]['dates'])
+    for ticker in tickers[1:]:
+        common_dates &= set(historical_data[ticker]['dates'])
+    common_dates = sorted(common_dates)
+
+    if len(common_dates) < 2:
+        return tickers, common_dates, np.empty((0, len(tickers)))
+
+    # Цены по общим датам: [дни x активы]
+    prices = np.empty((len(common_dates), len(tickers)))
+    for col, ticker in enumerate(tickers):
+        price_by_date = dict(zip(historical_data[ticker]['dates'], historical_data[ticker]['prices']))
+        prices[:, col] = [price_by_date[d] for d in common_dates]
+
+    returns = prices[1:] / prices[:-1] - 1
+    return tickers, common_dates[1:], returns
+
+
+def portfolio_weights(portfolio_data, tickers):
+    """
+    Расчет весов активов по текущей стоимости позиций.
+
+    Args:
+        portfolio_data: список позиций портфеля
+        tickers: порядок тикеров в матрице доходностей
+
+    Returns:
+        np.ndarray: веса активов (сумма = 1)
+    """
+    values = {}
+    for stock in portfolio_data:
+        values[stock['ticker']] = values.get(stock['ticker'], 0) + stock.get('current_value', 0)
+
+    weights = np.array([values.get(ticker, 0) for ticker in tickers], dtype=float)
+    total = weights.sum()
+    if total > 0:
+        return weights / total
+    # Без текущих стоимостей считаем портфель равновзвешенным
+    return np.full(len(tickers), 1 / len(tickers)) if tickers else weights
+
+
+def _simulate_chunk(task):
+    """
+    Моделирование одной пачки траекторий (выполняется в процессе-воркере).
+
+    Args:
+        task: кортеж (метод, параметры модели, число траекторий, горизонт, seed, перцентили)
+
+    Returns:
+        tuple: (перцентили накопленной доходности по дням, итоговые доходности траекторий)
+    """
+    method, params, n_paths, horizon, seed, percentiles = task
+    rng = np.random.default_rng(seed)
+
+    if method == 'bootstrap':
+        history = params['history']
+        daily = history[rng.integers(0, len(history), size=(n_paths, horizon))]
+    else:
+        daily = rng.normal(params['mean'], params['std'], size=(n_paths, horizon))
+
+    # Переходим к лог-доходностям, чтобы накопление было суммой, а не произведением
+    np.clip(daily, -0.999, None, out=daily)
+    np.log1p(daily, out=daily)
+    np.cumsum(daily, axis=1, out=daily)
+
+    # Перцентили инвариантны к монотонному преобразованию expm1
+    bands = np.expm1(np.percentile(daily, percentiles, axis=0))
+    terminal = np.expm1(daily[:, -1])
+    return bands, terminal
+
+
+class MonteCarloSimulator:
+    """
+    Моделирование будущей стоимости портфеля методом Монте-Карло.
+    Траектории строятся бутстрепом исторических доходностей или
+    из многомерного нормального распределения с оценённой ковариацией.
+    """
+
+    PERCENTILES = (5, 25, 50, 75, 95)
+    CONFIDENCE_LEVELS = (0.95, 0.99)
+
+    def __init__(self, returns_matrix, weights, method='bootstrap', horizon=252,
+                 n_paths=100000, chunk_size=10000, workers=None, seed=None):
+        """
+        Инициализация симулятора.
+
+        Args:
+            returns_matrix: матрица дневных доходностей [дни x активы] в долях
+            weights: веса активов в портфеле
+            method: 'bootstrap' или 'normal'
+            horizon: горизонт моделирования в торговых днях
+            n_paths: количество траекторий
+            chunk_size: размер пачки траекторий (ограничивает потребление памяти)
+            workers: количество процессов (None - по числу ядер, 1 - без пула)
+            seed: начальное значение генератора для воспроизводимости
+        """
+        if method not in ('bootstrap', 'normal'):
+            raise ValueError(f"Неизвестный метод моделирования: {method}")
+
+        self.returns_matrix = np.asarray(returns_matrix, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.method = method
+        self.horizon = int(horizon)
+        self.n_paths = int(n_paths)
+        self.chunk_size = max(1, int(chunk_size))
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.seed = seed
+
+        if self.returns_matrix.ndim != 2 or len(self.returns_matrix) < 2:
+            raise ValueError("Недостаточно исторических данных для моделирования")
+
+    def get_model_params(self):
+        """Параметры модели доходности портфеля"""
+        # При ежедневной ребалансировке к фиксированным весам доходность портфеля -
+        # линейная комбинация доходностей активов. Поэтому многомерное нормальное
+        # распределение сворачивается в одномерное со средним w·mu и дисперсией w'Σw,
+        # а бутстреп строк матрицы - в бутстреп ряда доходности портфеля.
+        portfolio_history = self.returns_matrix @ self.weights
+
+        if self.method == 'bootstrap':
+            return {'history': portfolio_history}
+
+        mean = self.returns_matrix.mean(axis=0) @ self.weights
+        covariance = np.atleast_2d(np.cov(self.returns_matrix, rowvar=False))
+        std = float(np.sqrt(max(self.weights @ covariance @ self.weights, 0.0)))
+        return {'mean': float(mean), 'std': std}
+
+    def build_tasks(self):
+        """Разбиение моделирования на пачки с независимыми генераторами"""
+        params = self.get_model_params()
+        chunk_sizes = [self.chunk_size] * (self.n_paths // self.chunk_size)
+        if self.n_paths % self.chunk_size:
+            chunk_sizes.append(self.n_paths % self.chunk_size)
+
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunk_sizes))
+        return [(self.method, params, size, self.horizon, seed, self.PERCENTILES)
+                for size, seed in zip(chunk_sizes, seeds)]
+
+    def run(self, initial_value=1.0):
+        """
+        Запуск моделирования.
+
+        Args:
+            initial_value: текущая стоимость портфеля (руб)
+
+        Returns:
+            dict: VaR/CVaR, перцентильные полосы и итоговое распределение доходности
+        """
+        start = time.perf_counter()
+        tasks = self.build_tasks()
+
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                chunks = list(executor.map(_simulate_chunk, tasks))
+        else:
+            chunks = [_simulate_chunk(task) for task in tasks]
+
+        terminal = np.concatenate([chunk_terminal for _, chunk_terminal in chunks])
+
+        # Полосы по дням - среднее перцентилей пачек, взвешенное по их размеру.
+        # Хранить все траектории целиком (100k x 252) ради точных перцентилей не нужно.
+        sizes = np.array([len(chunk_terminal) for _, chunk_terminal in chunks], dtype=float)
+        bands = np.tensordot(sizes / sizes.sum(), np.stack([chunk_bands for chunk_bands, _ in chunks]), axes=1)
+
+        var = {}
+        cvar = {}
+        for level in self.CONFIDENCE_LEVELS:
+            threshold = np.percentile(terminal, (1 - level) * 100)
+            var[level] = float(-threshold)
+            cvar[level] = float(-terminal[terminal <= threshold].mean())
+
+        return {
+            'method': self.method,
+            'n_paths': self.n_paths,
+            'horizon': self.horizon,
+            'initial_value': initial_value,
+            'expected_return': float(terminal.mean()),
+            'var': var,
+            'cvar': cvar,
+            'var_value': {level: value * initial_value for level, value in var.items()},
+            'cvar_value': {level: value * initial_value for level, value in cvar.items()},
+            'percentile_bands': dict(zip(self.PERCENTILES, bands)),
+            'terminal_returns': terminal,
+            'elapsed': time.perf_counter() - start
+        }
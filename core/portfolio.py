@@ -0,0 +1,552 @@
+# core/portfolio.py
+import json
+import os
+from datetime import datetime
+from .commissions import get_commission_manager
+from .dividends import DividendStore
+from .errors import PortfolioError
+from .instrumentation import timed
+from .lot_ledger import LotLedger
+from .moex_client import fetch_marketdata, fetch_marketdata_batches
+from .transactions import TransactionStore
+
+
+class Portfolio:
+    """
+    Портфель акций без интерфейса: позиции, покупки и продажи с комиссиями
+    и налогом по лотам FIFO, переоценка по котировкам MOEX, статистика.
+    Ошибки входных данных сообщаются исключением PortfolioError.
+    """
+
+    FILENAME = 'portfolio_data.json'
+
+    def __init__(self, transaction_manager=None, price_timeout=10, data_dir=None):
+        """
+        Инициализация портфеля.
+
+        Args:
+            transaction_manager: история операций (по умолчанию - TransactionStore в data_dir)
+            price_timeout: общий срок ожидания котировок в секундах
+            data_dir: каталог файлов портфеля (по умолчанию - текущий)
+        """
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, self.FILENAME) if data_dir else self.FILENAME
+        self.commission_manager = get_commission_manager()
+        self.transaction_manager = transaction_manager or TransactionStore(data_dir)
+        self.dividend_manager = self.create_dividend_manager()
+
+        # Данные
+        self.portfolio_data = []
+        self.imoex_data = []
+        self.price_timeout = price_timeout
+        self.quote_cache = None  # общий кэш котировок рабочей области (QuoteCache)
+
+        # Загрузка данных при инициализации
+        self.load_portfolio_data()
+        self.rebuild_lot_ledger()
+
+    def create_dividend_manager(self):
+        """Учет дивидендов портфеля (окна переопределяют, чтобы добавить диалоги)"""
+        return DividendStore(self, self.data_dir)
+
+    def rebuild_lot_ledger(self):
+        """Восстановление журнала лотов по истории операций"""
+        self.lot_ledger = LotLedger.from_transactions(
+            self.transaction_manager.transaction_history,
+            self.commission_manager.schedule.tax_rate
+        )
+
+    @timed('json.load portfolio')
+    def load_portfolio_data(self):
+        """Загрузка данных портфеля из JSON файла"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    loaded_data = json.load(f)
+                    # Обеспечиваем обратную совместимость
+                    for stock in loaded_data:
+                        if 'total_cost' not in stock:
+                            stock['total_cost'] = stock['quantity'] * stock['buy_price'] + stock.get('commission', 0)
+                        if 'commission' not in stock:
+                            stock['commission'] = 0
+                    self.portfolio_data = loaded_data
+        except Exception as e:
+            print(f"Ошибка загрузки портфеля: {e}")
+            self.portfolio_data = []
+
+    @timed('json.save portfolio')
+    def save_portfolio_data(self):
+        """Сохранение данных портфеля в JSON файл"""
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.portfolio_data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Ошибка сохранения портфеля: {e}")
+
+    def find_stock(self, ticker):
+        """
+        Поиск позиции по тикеру.
+
+        Returns:
+            dict: данные акции или None
+        """
+        for stock in self.portfolio_data:
+            if stock['ticker'] == ticker:
+                return stock
+        return None
+
+    @staticmethod
+    def parse_order(ticker, quantity_str, price_str, empty_message="Заполните все поля"):
+        """
+        Проверка введенных данных сделки.
+
+        Args:
+            ticker: тикер акции
+            quantity_str: количество в виде строки
+            price_str: цена в виде строки
+            empty_message: текст ошибки для незаполненных полей
+
+        Returns:
+            tuple: (тикер в верхнем регистре, количество, цена)
+
+        Raises:
+            PortfolioError: поля не заполнены или значения некорректны
+        """
+        ticker = ticker.strip().upper()
+        if not ticker or not quantity_str or not price_str:
+            raise PortfolioError(empty_message)
+
+        try:
+            quantity = int(quantity_str)
+            price = float(price_str)
+        except ValueError:
+            raise PortfolioError("Введите корректные числовые значения")
+
+        if quantity <= 0 or price <= 0:
+            raise PortfolioError("Количество и цена должны быть положительными")
+        return ticker, quantity, price
+
+    def buy(self, ticker, quantity, buy_price, merge=True):
+        """
+        Покупка акции. Изменения позиций сохраняет вызывающий код
+        (save_portfolio_data), операция записывается в историю сразу.
+
+        Args:
+            ticker: тикер акции
+            quantity: количество акций
+            buy_price: цена покупки
+            merge: для бумаги, уже бывшей в портфеле: True - добавить к позиции
+                   с пересчетом средней цены, False - заменить количество и цену
+
+        Returns:
+            dict: данные позиции
+        """
+        # Расчет комиссий
+        commission = self.calculate_commission_costs(quantity, buy_price, ticker)
+        total_cost = quantity * buy_price + commission
+
+        stock_data = self.find_stock(ticker)
+        if stock_data is None:
+            stock_data = {
+                'ticker': ticker,
+                'quantity': quantity,
+                'buy_price': buy_price,
+                'commission': commission,
+                'total_cost': total_cost,
+                'added_date': datetime.now().isoformat()
+            }
+            self.portfolio_data.append(stock_data)
+        elif merge:
+            total_quantity = stock_data['quantity'] + quantity
+            total_investment = stock_data['total_cost'] + total_cost
+            average_price = (total_investment - self.commission_manager.get_schedule(ticker).fixed_costs) / total_quantity
+
+            stock_data['quantity'] = total_quantity
+            stock_data['buy_price'] = average_price
+            stock_data['commission'] = stock_data.get('commission', 0) + commission
+            stock_data['total_cost'] = total_investment
+        else:
+            # Замена позиции: прежние лоты снимаются, ниже добавляется лот новой покупки
+            self.transaction_manager.record_closures([ticker])
+            self.lot_ledger.close(ticker)
+            stock_data['quantity'] = quantity
+            stock_data['buy_price'] = buy_price
+            stock_data['commission'] = commission
+            stock_data['total_cost'] = total_cost
+
+        # Регистрируем операцию покупки
+        self.transaction_manager.record_transaction(ticker, 'buy', quantity, buy_price, commission)
+        self.lot_ledger.add_lot(ticker, datetime.now(), quantity, buy_price, commission)
+
+        # Получаем текущую цену и название
+        self.update_stock_price(stock_data)
+        return stock_data
+
+    def preview_sale(self, ticker, quantity_to_sell, sell_price):
+        """
+        Расчет продажи без изменения портфеля: комиссии, налог по лотам FIFO, чистая выручка.
+
+        Args:
+            ticker: тикер акции
+            quantity_to_sell: количество для продажи
+            sell_price: цена продажи
+
+        Returns:
+            dict: параметры продажи для sell()
+
+        Raises:
+            PortfolioError: бумаги нет в портфеле или недостаточно акций
+        """
+        stock = self.find_stock(ticker)
+        if not stock:
+            raise PortfolioError(f"Акция {ticker} не найдена в портфеле")
+
+        if quantity_to_sell > stock['quantity']:
+            raise PortfolioError(f"Недостаточно акций для продажи. Доступно: {stock['quantity']}")
+
+        # Расчет комиссий при продаже
+        sell_amount = quantity_to_sell * sell_price
+        turnover = self.commission_manager.account_turnover(
+            self.commission_manager.get_schedule(ticker), self.transaction_manager, sell_amount)
+        commission_calc = self.commission_manager.calculate_sell_commission(sell_amount, ticker, turnover=turnover)
+        total_commission = commission_calc['total_commission']
+
+        # Расчет налога по лотам FIFO; бумаги без истории покупок - по средней цене
+        sale_date = datetime.now()
+        buy_price_per_share = stock['total_cost'] / stock['quantity']
+        sale = self.lot_ledger.preview_sale(ticker, sale_date, quantity_to_sell, sell_price,
+                                            total_commission, buy_price_per_share)
+        tax = sale['tax']
+
+        return {
+            'ticker': ticker,
+            'quantity': quantity_to_sell,
+            'price': sell_price,
+            'date': sale_date,
+            'sell_amount': sell_amount,
+            'commission': total_commission,
+            'tax': tax,
+            'net_proceeds': sell_amount - total_commission - tax,
+            'buy_price_per_share': buy_price_per_share
+        }
+
+    def sell(self, sale):
+        """
+        Проведение продажи, рассчитанной preview_sale, с сохранением портфеля.
+
+        Args:
+            sale: результат preview_sale
+
+        Returns:
+            int: оставшееся количество акций (0 - позиция закрыта и удалена)
+        """
+        ticker = sale['ticker']
+        stock_to_sell = self.find_stock(ticker)
+
+        # Регистрируем операцию продажи
+        self.transaction_manager.record_transaction(ticker, 'sell', sale['quantity'], sale['price'],
+                                                    sale['commission'])
+        self.lot_ledger.sell(ticker, sale['date'], sale['quantity'], sale['price'],
+                             sale['commission'], sale['buy_price_per_share'])
+
+        # Обновляем количество акций
+        remaining = stock_to_sell['quantity'] - sale['quantity']
+        if remaining == 0:
+            # Продали все акции - удаляем из портфеля
+            self.portfolio_data.remove(stock_to_sell)
+        else:
+            # Продали часть акций - обновляем количество и пересчитываем значения
+            stock_to_sell['quantity'] = remaining
+            self.calculate_stock_values(stock_to_sell)
+
+        # Сохраняем изменения
+        self.save_portfolio_data()
+        return remaining
+
+    def calculate_commission_costs(self, quantity, price, ticker=None):
+        """
+        Расчет комиссий при покупке.
+
+        Args:
+            quantity: количество акций
+            price: цена акции
+            ticker: тикер (для индивидуальных условий)
+
+        Returns:
+            float: сумма комиссий (ступень - по скользящему обороту счета)
+        """
+        amount = quantity * price
+        schedule = self.commission_manager.get_schedule(ticker)
+        turnover = self.commission_manager.account_turnover(schedule, self.transaction_manager, amount)
+        return schedule.total(amount, turnover)
+
+    def update_stock_price(self, stock_data):
+        """
+        Обновление текущей цены акции с MOEX.
+        Общий DataHandler монитора не используется, чтобы не сбрасывать его состояние.
+
+        Args:
+            stock_data: данные акции
+
+        Returns:
+            bool: успешно ли обновлена цена
+        """
+        try:
+            quote = fetch_marketdata([stock_data['ticker']], timeout=self.price_timeout).get(stock_data['ticker'])
+        except Exception as e:
+            print(f"Ошибка получения цены для {stock_data['ticker']}: {e}")
+            quote = None
+        return self.apply_quote(stock_data, quote)
+
+    def apply_quote(self, stock_data, quote):
+        """
+        Применение котировки ISS к акции.
+
+        Args:
+            stock_data: данные акции
+            quote: строка котировки по названиям колонок (None - котировка не получена)
+
+        Returns:
+            bool: успешно ли обновлена цена
+        """
+        current_price = None
+        if quote:
+            current_price = quote.get('LAST') or quote.get('LCURRENTPRICE')
+
+        if current_price is not None:
+            stock_data['current_price'] = float(current_price)
+            stock_data['name'] = quote.get('SHORTNAME') or stock_data['ticker']
+            self.calculate_stock_values(stock_data)
+            return True
+
+        # Если не удалось получить данные, используем цену покупки
+        stock_data['current_price'] = stock_data['buy_price']
+        stock_data['name'] = stock_data['ticker']
+        self.calculate_stock_values(stock_data)
+        return False
+
+    @timed('portfolio.fetch_quotes')
+    def fetch_quotes(self, timeout=None):
+        """
+        Загрузка котировок всех акций портфеля параллельными пачками с общим сроком ожидания.
+        Портфель не изменяется, поэтому метод можно вызывать из фонового потока.
+
+        Args:
+            timeout: общий срок ожидания в секундах (по умолчанию - price_timeout)
+
+        Returns:
+            dict: {тикер: котировка} для полученных тикеров
+        """
+        tickers = [stock['ticker'] for stock in list(self.portfolio_data)]
+        if self.quote_cache is not None:
+            # Портфель рабочей области - котировки через общий кэш счетов
+            return self.quote_cache.get_quotes(tickers, timeout=timeout or self.price_timeout)
+        quotes = {}
+        fetch_marketdata_batches(tickers, quotes.update, timeout=timeout or self.price_timeout)
+        return quotes
+
+    @timed('portfolio.apply_quotes')
+    def apply_quotes(self, quotes):
+        """
+        Применение полученных котировок ко всему портфелю за один проход с одним сохранением.
+
+        Args:
+            quotes: {тикер: котировка}
+
+        Returns:
+            int: количество акций с обновленной ценой
+        """
+        updated_count = 0
+        for stock in self.portfolio_data:
+            if self.apply_quote(stock, quotes.get(stock['ticker'])):
+                updated_count += 1
+
+        if updated_count > 0:
+            self.save_portfolio_data()
+        return updated_count
+
+    def calculate_stock_values(self, stock_data):
+        """
+        Расчет стоимости и прибыли для акции.
+
+        Args:
+            stock_data: данные акции для расчета
+        """
+        try:
+            quantity = stock_data['quantity']
+            current_price = stock_data.get('current_price', stock_data['buy_price'])
+
+            # Правильный расчет общей стоимости покупки (включая комиссии)
+            if 'total_cost' not in stock_data:
+                purchase_cost = quantity * stock_data['buy_price']
+                commission = stock_data.get('commission', 0)
+                stock_data['total_cost'] = purchase_cost + commission
+
+            # Текущая стоимость
+            stock_data['current_value'] = quantity * current_price
+
+            # КАПИТАЛЬНАЯ ПРИБЫЛЬ = (Текущая стоимость - Стоимость покупки)
+            capital_gain = stock_data['current_value'] - (quantity * stock_data['buy_price'])
+
+            # ДИВИДЕНДНЫЙ ДОХОД (уже полученные деньги)
+            dividend_income = stock_data.get('dividend_income', 0)
+
+            # ОБЩАЯ ПРИБЫЛЬ = Капитальная прибыль + Дивидендный доход - Комиссии
+            total_profit = capital_gain + dividend_income - stock_data.get('commission', 0)
+
+            # Расчет в процентах
+            if stock_data['total_cost'] > 0:
+                capital_gain_percent = (capital_gain / stock_data['total_cost']) * 100
+                dividend_yield = (dividend_income / stock_data['total_cost']) * 100
+                total_profit_percent = (total_profit / stock_data['total_cost']) * 100
+            else:
+                capital_gain_percent = 0
+                dividend_yield = 0
+                total_profit_percent = 0
+
+            # Сохраняем все показатели
+            stock_data['capital_gain'] = capital_gain
+            stock_data['dividend_income'] = dividend_income
+            stock_data['total_profit'] = total_profit
+            stock_data['capital_gain_percent'] = capital_gain_percent
+            stock_data['dividend_yield'] = dividend_yield
+            stock_data['total_profit_percent'] = total_profit_percent
+
+        except KeyError as e:
+            print(f"Ошибка расчета значений для акции {stock_data.get('ticker', 'unknown')}: {e}")
+            stock_data['current_value'] = 0
+            stock_data['capital_gain'] = 0
+            stock_data['dividend_income'] = 0
+            stock_data['total_profit'] = 0
+            stock_data['capital_gain_percent'] = 0
+            stock_data['dividend_yield'] = 0
+            stock_data['total_profit_percent'] = 0
+
+    def load_imoex_data(self):
+        """Загрузка данных индекса Мосбиржи"""
+        try:
+            quote = fetch_marketdata(['IMOEX'], market='index', board='SNDX',
+                                     timeout=self.price_timeout).get('IMOEX', {})
+            current_value = quote.get('CURRENTVALUE') or quote.get('LASTVALUE')
+
+            if current_value is not None:
+                self.imoex_data.append({
+                    'time': datetime.now(),
+                    'value': current_value
+                })
+        except Exception as e:
+            print(f"Ошибка загрузки данных IMOEX: {e}")
+
+    def remove_stocks(self, tickers):
+        """
+        Удаление позиций из портфеля с сохранением.
+
+        Args:
+            tickers: тикеры удаляемых акций
+        """
+        tickers = set(tickers)
+        removed = [s['ticker'] for s in self.portfolio_data if s['ticker'] in tickers]
+        self.portfolio_data = [s for s in self.portfolio_data if s['ticker'] not in tickers]
+        self.close_lots(removed)
+        self.save_portfolio_data()
+
+    def clear(self):
+        """Очистка всего портфеля с сохранением"""
+        removed = [s['ticker'] for s in self.portfolio_data]
+        self.portfolio_data.clear()
+        self.close_lots(removed)
+        self.save_portfolio_data()
+
+    def close_lots(self, tickers):
+        """
+        Снятие лотов удаленных позиций - в журнале и в истории операций,
+        чтобы они не вернулись при восстановлении журнала.
+
+        Args:
+            tickers: тикеры удаленных позиций
+        """
+        if not tickers:
+            return
+        self.transaction_manager.record_closures(tickers)
+        for ticker in tickers:
+            self.lot_ledger.close(ticker)
+
+    def export_source(self):
+        """
+        Данные для экспорта портфеля.
+
+        Returns:
+            tuple: (заголовки, функция-генератор строк по снимку позиций)
+        """
+        headers = ["Тикер", "Название", "Количество", "Цена покупки", "Комиссия",
+                   "Общая стоимость", "Текущая цена", "Текущая стоимость",
+                   "Прибыль", "Прибыль %"]
+        # Снимок позиций - котировки могут обновиться во время записи
+        portfolio = [dict(stock) for stock in self.portfolio_data]
+
+        def make_rows():
+            for stock in portfolio:
+                yield [
+                    stock['ticker'],
+                    stock.get('name', ''),
+                    stock['quantity'],
+                    round(stock['buy_price'], 2),
+                    round(stock.get('commission', 0), 2),
+                    round(stock.get('total_cost', 0), 2),
+                    round(stock.get('current_price', 0), 2),
+                    round(stock.get('current_value', 0), 2),
+                    round(stock.get('profit', 0), 2),
+                    round(stock.get('profit_percent', 0), 2)
+                ]
+
+        return headers, make_rows
+
+    def get_portfolio_statistics(self, portfolio_data=None):
+        """
+        Получение статистики портфеля.
+
+        Args:
+            portfolio_data: позиции для расчета (по умолчанию - позиции портфеля)
+
+        Returns:
+            dict: словарь со статистикой
+        """
+        if portfolio_data is None:
+            portfolio_data = self.portfolio_data
+
+        total_cost = sum(stock.get('total_cost', 0) for stock in portfolio_data)
+        total_current_value = sum(stock.get('current_value', 0) for stock in portfolio_data)
+
+        # ПРАВИЛЬНЫЙ расчет капитальной прибыли (только изменение цены)
+        total_invested = sum(stock['quantity'] * stock['buy_price'] for stock in portfolio_data)
+        total_capital_gain = total_current_value - total_invested
+
+        total_dividends = sum(stock.get('dividend_income', 0) for stock in portfolio_data)
+        total_commissions = sum(stock.get('commission', 0) for stock in portfolio_data)
+
+        # ОБЩАЯ ПРИБЫЛЬ = Капитальная прибыль + Дивиденды - Комиссии
+        total_profit = total_capital_gain + total_dividends - total_commissions
+
+        if total_cost > 0:
+            total_profit_percent = (total_profit / total_cost) * 100
+            capital_gain_percent = (total_capital_gain / total_cost) * 100
+            dividend_yield = (total_dividends / total_cost) * 100
+            commission_percent = (total_commissions / total_cost) * 100
+        else:
+            total_profit_percent = 0
+            capital_gain_percent = 0
+            dividend_yield = 0
+            commission_percent = 0
+
+        return {
+            'total_cost': total_cost,
+            'total_current_value': total_current_value,
+            'total_capital_gain': total_capital_gain,
+            'total_dividends': total_dividends,
+            'total_commissions': total_commissions,
+            'total_profit': total_profit,
+            'total_profit_percent': total_profit_percent,
+            'capital_gain_percent': capital_gain_percent,
+            'dividend_yield': dividend_yield,
+            'commission_percent': commission_percent
+        }
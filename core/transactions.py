@@ -0,0 +1,193 @@
+# core/transactions.py
+import json
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from .instrumentation import timed
+
+
+class TransactionStore:
+    """
+    История операций покупки/продажи: загрузка, запись и сохранение в JSON.
+    """
+    
+    FILENAME = 'transaction_history.json'
+    
+    def __init__(self, data_dir=None):
+        """
+        Инициализация истории операций.
+        
+        Args:
+            data_dir: каталог файлов портфеля (по умолчанию - текущий)
+        """
+        self.path = os.path.join(data_dir, self.FILENAME) if data_dir else self.FILENAME
+        self.transaction_history = []
+        self.mtime = None  # время изменения файла при последней загрузке или записи
+        # Скользящее окно оборота: deque[(дата, сумма)] по возрастанию даты и его сумма.
+        # Строится по истории один раз, дальше пополняется при записи операций
+        self._window = None
+        self._window_days = None
+        self._window_total = 0.0
+        self._window_count = 0  # сколько записей истории учтено окном
+        self.load_transaction_history()
+    
+    @timed('json.load transactions')
+    def load_transaction_history(self):
+        """Загрузка истории транзакций из JSON файла"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.transaction_history = json.load(f)
+                self.mtime = os.path.getmtime(self.path)
+        except Exception as e:
+            print(f"Ошибка загрузки истории транзакций: {e}")
+            self.transaction_history = []
+        self._window = None
+    
+    def reload_if_changed(self):
+        """Повторная загрузка истории, если файл изменил другой владелец (другое окно)"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self.mtime:
+            self.load_transaction_history()
+    
+    @timed('json.save transactions')
+    def save_transaction_history(self):
+        """Сохранение истории транзакций в JSON файл"""
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.transaction_history, f, ensure_ascii=False, indent=2)
+            self.mtime = os.path.getmtime(self.path)
+        except Exception as e:
+            print(f"Ошибка сохранения истории транзакций: {e}")
+    
+    def record_transaction(self, ticker, operation, quantity, price, commission=0.0):
+        """
+        Запись транзакции в историю.
+        
+        Args:
+            ticker: тикер акции
+            operation: тип операции ('buy', 'sell' или 'close')
+            quantity: количество акций
+            price: цена за акцию
+            commission: комиссии по сделке
+        """
+        try:
+            # Создаем запись о транзакции
+            transaction = {
+                'date': datetime.now().isoformat(),
+                'ticker': ticker,
+                'operation': operation,
+                'quantity': quantity,
+                'price': price,
+                'total': quantity * price,
+                'commission': commission
+            }
+            
+            # Добавляем в историю
+            self.transaction_history.append(transaction)
+            self._add_to_window(transaction)
+            
+            # Сохраняем историю
+            self.save_transaction_history()
+                
+        except Exception as e:
+            print(f"Ошибка сохранения истории транзакций: {e}")
+    
+    def record_closures(self, tickers):
+        """
+        Запись закрытия позиций без продажи (удаление или замена позиции):
+        журнал лотов, восстановленный по истории, снимает их лоты.
+        
+        Args:
+            tickers: тикеры закрываемых позиций
+        """
+        date = datetime.now().isoformat()
+        self.transaction_history.extend({
+            'date': date,
+            'ticker': ticker,
+            'operation': 'close',
+            'quantity': 0,
+            'price': 0.0,
+            'total': 0.0,
+            'commission': 0.0
+        } for ticker in tickers)
+        if self._window is not None:
+            # Закрытия не меняют оборот
+            self._window_count = len(self.transaction_history)
+        self.save_transaction_history()
+    
+    def clear(self):
+        """Очистка всей истории транзакций"""
+        self.transaction_history.clear()
+        self.save_transaction_history()
+    
+    def get_recent_transactions(self, limit=100):
+        """
+        Получение последних транзакций.
+        
+        Args:
+            limit: количество последних транзакций
+            
+        Returns:
+            list: список последних транзакций
+        """
+        return list(reversed(self.transaction_history[-limit:]))
+    
+    def turnover(self, days=30):
+        """
+        Скользящий оборот счета - сумма покупок и продаж за последние дни.
+        Окно строится по истории один раз; дальше вызов только отбрасывает
+        вышедшие из окна операции с начала очереди.
+        
+        Args:
+            days: длина окна в днях
+            
+        Returns:
+            float: оборот в руб
+        """
+        if (self._window is None or self._window_days != days
+                or self._window_count != len(self.transaction_history)):
+            self._build_window(days)
+        
+        since = datetime.now() - timedelta(days=days)
+        while self._window and self._window[0][0] < since:
+            self._window_total -= self._window.popleft()[1]
+        if not self._window:
+            self._window_total = 0.0  # без накопленной погрешности вычитаний
+        return self._window_total
+    
+    def _build_window(self, days):
+        """Построение окна оборота по всей истории (после загрузки, импорта или смены длины окна)"""
+        since = datetime.now() - timedelta(days=days)
+        entries = []
+        for transaction in self.transaction_history:
+            entry = self._window_entry(transaction)
+            if entry is not None and entry[0] >= since:
+                entries.append(entry)
+        entries.sort(key=lambda entry: entry[0])
+        self._window = deque(entries)
+        self._window_days = days
+        self._window_total = sum(amount for _, amount in entries)
+        self._window_count = len(self.transaction_history)
+    
+    def _add_to_window(self, transaction):
+        """Учет новой операции в уже построенном окне"""
+        if self._window is None:
+            return
+        entry = self._window_entry(transaction)
+        if entry is not None:
+            self._window.append(entry)
+            self._window_total += entry[1]
+        self._window_count += 1
+    
+    @staticmethod
+    def _window_entry(transaction):
+        """(дата, сумма) операции для окна оборота или None для некорректной записи"""
+        try:
+            return (datetime.fromisoformat(transaction['date']),
+                    transaction.get('total', transaction['quantity'] * transaction['price']))
+        except (KeyError, TypeError, ValueError):
+            return None
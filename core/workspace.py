@@ -0,0 +1,249 @@
+# core/workspace.py
+import os
+import re
+import shutil
+import threading
+import time
+from .errors import PortfolioError
+from .moex_client import fetch_marketdata_batches
+from .portfolio import Portfolio
+
+
+class QuoteCache:
+    """
+    Общий кэш котировок: повторный запрос тикера в пределах max_age секунд
+    отдается из памяти, недостающие тикеры догружаются одним пакетным запросом.
+    """
+
+    def __init__(self, max_age=15):
+        """
+        Инициализация кэша.
+
+        Args:
+            max_age: срок годности котировки в секундах
+        """
+        self.max_age = max_age
+        self._quotes = {}  # (режим торгов, тикер) -> (время получения, котировка)
+        self._lock = threading.Lock()
+
+    def get_quotes(self, tickers, board='TQBR', timeout=10, max_age=None):
+        """
+        Котировки тикеров: свежие - из кэша, остальные - одной пакетной загрузкой.
+
+        Args:
+            tickers: тикеры
+            board: режим торгов
+            timeout: общий срок ожидания загрузки в секундах
+            max_age: срок годности (по умолчанию - заданный при создании)
+
+        Returns:
+            dict: {тикер: котировка} для тикеров, котировки которых есть
+        """
+        max_age = self.max_age if max_age is None else max_age
+        now = time.monotonic()
+        quotes = {}
+        missing = []
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                cached = self._quotes.get((board, ticker))
+                if cached is not None and now - cached[0] <= max_age:
+                    quotes[ticker] = cached[1]
+                else:
+                    missing.append(ticker)
+
+        if missing:
+            fetched = {}
+            fetch_marketdata_batches(missing, fetched.update, board=board, timeout=timeout)
+            received_at = time.monotonic()
+            with self._lock:
+                for ticker, quote in fetched.items():
+                    self._quotes[(board, ticker)] = (received_at, quote)
+            quotes.update(fetched)
+        return quotes
+
+    def clear(self):
+        """Очистка кэша"""
+        with self._lock:
+            self._quotes.clear()
+
+
+class Workspace:
+    """
+    Рабочая область с именованными портфелями (счетами). Каждый портфель
+    хранит свои файлы в подкаталоге root/<имя>; котировки и история цен
+    у всех портфелей общие: открытые портфели получают кэш котировок
+    рабочей области, а переоценка всех счетов - один пакетный запрос
+    по объединению тикеров.
+    """
+
+    # Имя - каталог портфеля: буквы, цифры, пробел, точка, дефис;
+    # на конце не должно быть пробела или точки (Windows их отбрасывает)
+    NAME_PATTERN = re.compile(r'\w(?:[\w .-]*[\w-])?')
+
+    def __init__(self, root='portfolios', quote_max_age=15, price_timeout=10, portfolio_class=Portfolio):
+        """
+        Инициализация рабочей области.
+
+        Args:
+            root: каталог рабочей области
+            quote_max_age: срок годности котировок общего кэша в секундах
+            price_timeout: общий срок ожидания котировок в секундах
+            portfolio_class: класс портфеля (окна передают PortfolioManager)
+        """
+        self.root = root
+        self.price_timeout = price_timeout
+        self.portfolio_class = portfolio_class
+        self.quote_cache = QuoteCache(quote_max_age)
+        self._portfolios = {}
+
+    @property
+    def history_cache(self):
+        """Общий для процесса кэш истории цен (pandas загружается при первом обращении)"""
+        from .history_cache import get_history_cache
+        return get_history_cache()
+
+    def names(self):
+        """
+        Имена портфелей рабочей области.
+
+        Returns:
+            list: имена в алфавитном порядке
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def portfolio_dir(self, name):
+        """Каталог файлов портфеля"""
+        if not self.NAME_PATTERN.fullmatch(name):
+            raise PortfolioError(f"Недопустимое имя портфеля: {name}")
+        return os.path.join(self.root, name)
+
+    def create(self, name):
+        """
+        Создание пустого портфеля.
+
+        Raises:
+            PortfolioError: недопустимое имя или портфель уже существует
+        """
+        path = self.portfolio_dir(name)
+        if os.path.exists(path):
+            raise PortfolioError(f"Портфель {name} уже существует")
+        os.makedirs(path)
+        return self.open(name)
+
+    def open(self, name, **kwargs):
+        """
+        Портфель по имени (один объект на имя в пределах рабочей области).
+
+        Args:
+            name: имя портфеля
+            kwargs: дополнительные параметры конструктора portfolio_class
+
+        Raises:
+            PortfolioError: портфеля нет в рабочей области
+        """
+        portfolio = self._portfolios.get(name)
+        if portfolio is None:
+            path = self.portfolio_dir(name)
+            if not os.path.isdir(path):
+                raise PortfolioError(f"Портфель {name} не найден")
+            portfolio = self.portfolio_class(data_dir=path, **kwargs)
+            portfolio.price_timeout = self.price_timeout
+            portfolio.quote_cache = self.quote_cache
+            self._portfolios[name] = portfolio
+        return portfolio
+
+    def close(self, name):
+        """Забыть открытый объект портфеля (следующий open перечитает файлы)"""
+        self._portfolios.pop(name, None)
+
+    def delete(self, name):
+        """Удаление портфеля вместе с его файлами"""
+        path = self.portfolio_dir(name)
+        self.close(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    def portfolios(self):
+        """
+        Все портфели рабочей области.
+
+        Returns:
+            dict: {имя: портфель}
+        """
+        return {name: self.open(name) for name in self.names()}
+
+    def all_tickers(self):
+        """Объединение тикеров всех портфелей"""
+        return list(dict.fromkeys(stock['ticker']
+                                  for portfolio in self.portfolios().values()
+                                  for stock in portfolio.portfolio_data))
+
+    def fetch_quotes(self, timeout=None):
+        """
+        Котировки по объединению тикеров всех портфелей одним пакетным запросом.
+        Портфели не изменяются, поэтому метод можно вызывать из фонового потока.
+
+        Args:
+            timeout: общий срок ожидания котировок (по умолчанию - price_timeout)
+
+        Returns:
+            dict: {тикер: котировка}
+        """
+        return self.quote_cache.get_quotes(self.all_tickers(), timeout=timeout or self.price_timeout)
+
+    def apply_quotes(self, quotes):
+        """
+        Применение котировок ко всем портфелям.
+
+        Returns:
+            dict: {имя: количество акций с обновленной ценой}
+        """
+        return {name: portfolio.apply_quotes(quotes) for name, portfolio in self.portfolios().items()}
+
+    def revalue_all(self, timeout=None):
+        """
+        Переоценка всех портфелей: один пакетный запрос котировок
+        по объединению тикеров, затем применение к каждому портфелю.
+
+        Returns:
+            dict: {имя: количество акций с обновленной ценой}
+        """
+        return self.apply_quotes(self.fetch_quotes(timeout))
+
+    def statistics(self):
+        """
+        Статистика по каждому портфелю и итог по рабочей области.
+
+        Returns:
+            dict: {'portfolios': {имя: статистика}, 'total_cost', 'total_current_value', 'total_profit'}
+        """
+        per_portfolio = {name: portfolio.get_portfolio_statistics()
+                         for name, portfolio in self.portfolios().items()}
+        return {
+            'portfolios': per_portfolio,
+            'total_cost': sum(stats['total_cost'] for stats in per_portfolio.values()),
+            'total_current_value': sum(stats['total_current_value'] for stats in per_portfolio.values()),
+            'total_profit': sum(stats['total_profit'] for stats in per_portfolio.values())
+        }
+
+
+_shared_workspace = None
+
+
+def get_workspace(root=None, portfolio_class=None):
+    """
+    Общая для процесса рабочая область.
+
+    Args:
+        root: каталог рабочей области (задается при первом обращении)
+        portfolio_class: класс портфелей (окна передают PortfolioManager)
+    """
+    global _shared_workspace
+    if (_shared_workspace is None
+            or (root is not None and root != _shared_workspace.root)
+            or (portfolio_class is not None and portfolio_class is not _shared_workspace.portfolio_class)):
+        _shared_workspace = Workspace(root or 'portfolios', portfolio_class=portfolio_class or Portfolio)
+    return _shared_workspace
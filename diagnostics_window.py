@@ -0,0 +1,116 @@
+# diagnostics_window.py
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from core.instrumentation import get_metrics, get_profile_capture
+
+
+class DiagnosticsWindow:
+    """
+    Окно диагностики: перцентили длительностей (HTTP, отрисовка, сохранение JSON,
+    обновление портфеля), счетчики и запись профиля по запросу.
+    """
+
+    def __init__(self, parent, refresh_interval=1000):
+        """
+        Инициализация окна.
+
+        Args:
+            parent: родительское окно
+            refresh_interval: период обновления таблицы в миллисекундах
+        """
+        self.metrics = get_metrics()
+        self.profile_capture = get_profile_capture()
+        self.refresh_interval = refresh_interval
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Диагностика")
+        self.window.geometry("900x500")
+
+        self.create_widgets()
+        self.refresh()
+
+    def create_widgets(self):
+        """Создание элементов окна"""
+        main_frame = ttk.Frame(self.window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        timers_frame = ttk.LabelFrame(main_frame, text="Длительности, мс", padding="5")
+        timers_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("Метрика", "Кол-во", "Среднее", "p50", "p95", "p99", "Макс")
+        self.timers_tree = ttk.Treeview(timers_frame, columns=columns, show="headings", height=12)
+        for column in columns:
+            self.timers_tree.heading(column, text=column)
+            self.timers_tree.column(column, width=80, anchor=tk.E)
+        self.timers_tree.column("Метрика", width=380, anchor=tk.W)
+
+        scrollbar = ttk.Scrollbar(timers_frame, orient=tk.VERTICAL, command=self.timers_tree.yview)
+        self.timers_tree.configure(yscrollcommand=scrollbar.set)
+        self.timers_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.counters_label = ttk.Label(main_frame, text="", wraplength=860, justify=tk.LEFT)
+        self.counters_label.pack(fill=tk.X, pady=5)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Button(button_frame, text="Сбросить метрики",
+                   command=self.metrics.reset).pack(side=tk.LEFT, padx=5)
+        self.cprofile_button = ttk.Button(button_frame, text="Профиль cProfile",
+                                          command=lambda: self.start_profile('cprofile'))
+        self.cprofile_button.pack(side=tk.LEFT, padx=5)
+        self.sampling_button = ttk.Button(button_frame, text="Профиль (сэмплирование)",
+                                          command=lambda: self.start_profile('sampling'))
+        self.sampling_button.pack(side=tk.LEFT, padx=5)
+        self.stop_button = ttk.Button(button_frame, text="Остановить и сохранить профиль",
+                                      command=self.stop_profile)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Закрыть", command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def refresh(self):
+        """Обновление таблицы метрик"""
+        if not self.window.winfo_exists():
+            return
+
+        snapshot = self.metrics.snapshot()
+        self.timers_tree.delete(*self.timers_tree.get_children())
+        for name, timer in sorted(snapshot['timers'].items()):
+            self.timers_tree.insert("", tk.END, values=(
+                name, timer['count'],
+                f"{timer['mean']:.1f}", f"{timer['p50']:.1f}", f"{timer['p95']:.1f}",
+                f"{timer['p99']:.1f}", f"{timer['max']:.1f}"
+            ))
+
+        counters = ", ".join(f"{name}: {value}" for name, value in sorted(snapshot['counters'].items()))
+        self.counters_label.config(text=f"Счетчики: {counters or 'нет'}")
+
+        self.refresh_buttons()
+        self.window.after(self.refresh_interval, self.refresh)
+
+    def start_profile(self, mode):
+        """Начать запись профиля"""
+        self.profile_capture.start(mode)
+        self.refresh_buttons()
+
+    def stop_profile(self):
+        """Остановить запись профиля и сохранить в выбранный файл"""
+        cprofile = self.profile_capture.mode == 'cprofile'
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Сохранение профиля",
+            defaultextension='.prof' if cprofile else '.folded',
+            filetypes=[("cProfile", "*.prof")] if cprofile else [("Свернутые стеки", "*.folded")]
+        )
+        if not path:
+            return
+        self.profile_capture.stop(path)
+        self.refresh_buttons()
+        messagebox.showinfo("Профиль", f"Профиль сохранен в файл:\n{path}", parent=self.window)
+
+    def refresh_buttons(self):
+        """Состояние кнопок профилирования"""
+        profiling = self.profile_capture.active
+        self.cprofile_button.config(state=tk.DISABLED if profiling else tk.NORMAL)
+        self.sampling_button.config(state=tk.DISABLED if profiling else tk.NORMAL)
+        self.stop_button.config(state=tk.NORMAL if profiling else tk.DISABLED)
@@ -2,8 +2,10 @@
 import json
 import os
 from datetime import datetime
-import requests
-from commission_manager import CommissionManager
+from core.commissions import get_commission_manager
+from core.moex_client import fetch_marketdata, fetch_marketdata_batches
+from core.instrumentation import timed
+from core.transactions import TransactionStore
 
 
 class ETFPortfolioManager:
@@ -11,11 +13,17 @@ class ETFPortfolioManager:
     Менеджер для работы с данными портфеля ETF
     """
     
+    BOARD = 'TQTF'  # режим торгов биржевых фондов
+    
     def __init__(self):
         self.portfolio_data = []
-        self.commission_manager = CommissionManager(None)
+        self.commission_manager = get_commission_manager()
+        # Покупки ETF не ведут своей истории: ступень комиссии выбирается
+        # по обороту счета из общей истории операций
+        self.transaction_manager = TransactionStore()
         self.load_portfolio_data()
     
+    @timed('json.load etf_portfolio')
     def load_portfolio_data(self):
         """Загрузка данных портфеля ETF из файла"""
         try:
@@ -30,6 +38,7 @@ class ETFPortfolioManager:
             print(f"Ошибка загрузки портфеля ETF: {e}")
             self.portfolio_data = []
     
+    @timed('json.save etf_portfolio')
     def save_portfolio_data(self):
         """Сохранение данных портфеля ETF в файл"""
         try:
@@ -46,7 +55,7 @@ class ETFPortfolioManager:
         """Добавление ETF в портфель"""
         try:
             # Расчет комиссий
-            commission = self.calculate_commission_costs(quantity, buy_price)
+            commission = self.calculate_commission_costs(quantity, buy_price, ticker)
             total_cost = quantity * buy_price + commission
             
             # Проверяем, есть ли уже такой ETF
@@ -60,7 +69,7 @@ class ETFPortfolioManager:
                 # Обновляем существующий ETF
                 total_quantity = existing_etf['quantity'] + quantity
                 total_investment = existing_etf['total_cost'] + total_cost
-                average_price = (total_investment - self.calculate_commission_costs(total_quantity, 0)) / total_quantity
+                average_price = (total_investment - self.commission_manager.get_schedule(ticker, 'etf').fixed_costs) / total_quantity
                 
                 # Обновляем среднюю дивидендную доходность
                 current_dividend = existing_etf.get('dividend_yield', 0)
@@ -133,54 +142,63 @@ class ETFPortfolioManager:
     def update_etf_price(self, etf_data):
         """Обновление текущей цены ETF с MOEX"""
         try:
-            ticker = etf_data['ticker']
-            
-            # Альтернативный способ получения данных
-            url = f"https://iss.moex.com/iss/engines/stock/markets/shares/boards/TQTF/securities/{ticker}.json"
-            
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                market_data = data['marketdata']['data']
-                
-                if market_data:
-                    etf_info = market_data[0]
-                    current_price = etf_info[12]  # LAST цена
-                    
-                    if current_price is None:
-                        current_price = etf_info[3]  # LCURRENTPRICE
-                    
-                    if current_price is not None:
-                        etf_data['current_price'] = current_price
-                        
-                        # Получаем название ETF
-                        securities_data = data['securities']['data']
-                        if securities_data:
-                            etf_data['name'] = securities_data[0][2]  # SHORTNAME
-                        
-                        # Пересчитываем значения
-                        self.calculate_etf_values(etf_data)
-                        return True
-            
-            # Если не удалось получить данные, используем цену покупки
-            etf_data['current_price'] = etf_data['buy_price']
-            etf_data['name'] = ticker
-            self.calculate_etf_values(etf_data)
-            return False
-            
+            quote = fetch_marketdata([etf_data['ticker']], board=self.BOARD).get(etf_data['ticker'])
         except Exception as e:
             print(f"Ошибка получения цены для {etf_data['ticker']}: {e}")
-            etf_data['current_price'] = etf_data['buy_price']
-            etf_data['name'] = etf_data['ticker']
+            quote = None
+        return self.apply_quote(etf_data, quote)
+    
+    def apply_quote(self, etf_data, quote):
+        """
+        Применение котировки ISS к ETF.
+        
+        Args:
+            etf_data: данные ETF из портфеля
+            quote: строка котировки по названиям колонок (None - котировка не получена)
+            
+        Returns:
+            bool: удалось ли обновить цену
+        """
+        current_price = None
+        if quote:
+            current_price = quote.get('LAST') or quote.get('LCURRENTPRICE')
+        
+        if current_price is not None:
+            etf_data['current_price'] = float(current_price)
+            etf_data['name'] = quote.get('SHORTNAME') or etf_data.get('name') or etf_data['ticker']
             self.calculate_etf_values(etf_data)
-            return False
+            return True
+        
+        # Если не удалось получить данные, используем цену покупки
+        etf_data['current_price'] = etf_data['buy_price']
+        etf_data['name'] = etf_data['ticker']
+        self.calculate_etf_values(etf_data)
+        return False
+    
+    @timed('etf.fetch_all_quotes')
+    def fetch_all_quotes(self, on_batch, timeout=10):
+        """
+        Загрузка котировок всех ETF пачками по режиму TQTF без изменения портфеля.
+        Вызывается из фонового потока, применять котировки нужно через apply_quote.
+        
+        Args:
+            on_batch: функция, принимающая dict {тикер: котировка} очередной пачки
+            timeout: срок ожидания всех котировок в секундах
+            
+        Returns:
+            set: тикеры, котировки которых получить не удалось
+        """
+        return fetch_marketdata_batches(self.get_tickers(), on_batch, board=self.BOARD, timeout=timeout)
     
     def update_all_prices(self):
         """Обновление цен всех ETF в портфеле с подсчетом результатов"""
+        quotes = {}
+        self.fetch_all_quotes(quotes.update)
+        
         updated_count = 0
         total_count = len(self.portfolio_data)
         for etf in self.portfolio_data:
-            if self.update_etf_price(etf):
+            if self.apply_quote(etf, quotes.get(etf['ticker'])):
                 updated_count += 1
         
         return updated_count, total_count
@@ -195,11 +213,15 @@ class ETFPortfolioManager:
         self.portfolio_data = []
         self.save_portfolio_data()
     
-    def calculate_commission_costs(self, quantity, price):
-        """Расчет комиссий при покупке"""
-        total_amount = quantity * price
-        commission_calc = self.commission_manager.calculate_buy_commission(total_amount)
-        return commission_calc['total_commission']
+    def calculate_commission_costs(self, quantity, price, ticker=None):
+        """Расчет комиссий при покупке (профиль ETF или условия тикера, ступень - по обороту счета)"""
+        amount = quantity * price
+        schedule = self.commission_manager.get_schedule(ticker, 'etf')
+        if schedule.tier_thresholds:
+            # История могла измениться в окне портфеля акций
+            self.transaction_manager.reload_if_changed()
+        turnover = self.commission_manager.account_turnover(schedule, self.transaction_manager, amount)
+        return schedule.total(amount, turnover)
     
     def calculate_etf_values(self, etf_data):
         """Расчет стоимости, прибыли и дивидендного дохода для ETF"""
@@ -231,40 +253,35 @@ class ETFPortfolioManager:
             etf_data['profit_percent'] = 0
             etf_data['annual_dividend'] = 0
     
-    def export_to_csv(self):
-        """Экспорт портфеля ETF в CSV файл"""
-        try:
-            if not self.portfolio_data:
-                return False, "Портфель ETF пуст"
-            
-            filename = f"etf_portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                # Заголовок
-                f.write("Тикер;Название;Количество;Цена покупки;Комиссия;Общая стоимость;"
-                       "Текущая цена;Текущая стоимость;Див. yield (%);Годовой дивиденд;"
-                       "Прибыль;Прибыль %\n")
-                
-                # Данные
-                for etf in self.portfolio_data:
-                    f.write(f"{etf['ticker']};"
-                           f"{etf.get('name', '')};"
-                           f"{etf['quantity']};"
-                           f"{etf['buy_price']:.2f};"
-                           f"{etf.get('commission', 0):.2f};"
-                           f"{etf.get('total_cost', 0):.2f};"
-                           f"{etf.get('current_price', 0):.2f};"
-                           f"{etf.get('current_value', 0):.2f};"
-                           f"{etf.get('dividend_yield', 0):.2f};"
-                           f"{etf.get('annual_dividend', 0):.2f};"
-                           f"{etf.get('profit', 0):.2f};"
-                           f"{etf.get('profit_percent', 0):.2f}\n")
-            
-            return True, f"Портфель ETF экспортирован в файл:\n{filename}"
-            
-        except Exception as e:
-            return False, f"Не удалось экспортировать данные: {e}"
-    
-    def show_commission_settings(self, parent):
-        """Показать настройки комиссий"""
-        self.commission_manager.show_commission_settings()
\ No newline at end of file
+    def export_source(self):
+        """
+        Источник строк для экспорта портфеля ETF.
+        Строки формируются из снимка портфеля, поэтому генератор
+        можно разбирать в фоновом потоке.
+        
+        Returns:
+            tuple: (заголовки колонок, функция, возвращающая генератор строк)
+        """
+        headers = ["Тикер", "Название", "Количество", "Цена покупки", "Комиссия", "Общая стоимость",
+                   "Текущая цена", "Текущая стоимость", "Див. yield (%)", "Годовой дивиденд",
+                   "Прибыль", "Прибыль %"]
+        portfolio = [dict(etf) for etf in self.portfolio_data]
+        
+        def make_rows():
+            for etf in portfolio:
+                yield [
+                    etf['ticker'],
+                    etf.get('name', ''),
+                    etf['quantity'],
+                    round(etf['buy_price'], 2),
+                    round(etf.get('commission', 0), 2),
+                    round(etf.get('total_cost', 0), 2),
+                    round(etf.get('current_price', 0), 2),
+                    round(etf.get('current_value', 0), 2),
+                    round(etf.get('dividend_yield', 0), 2),
+                    round(etf.get('annual_dividend', 0), 2),
+                    round(etf.get('profit', 0), 2),
+                    round(etf.get('profit_percent', 0), 2)
+                ]
+        
+        return headers, make_rows
\ No newline at end of file
@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox
+from core.instrumentation import timed
 
 
 class ETFTransactionManager:
@@ -14,6 +15,7 @@ class ETFTransactionManager:
     def __init__(self):
         self.history_file = 'etf_transaction_history.json'
     
+    @timed('json.save etf_transactions')
     def record_transaction(self, ticker, operation, quantity, price):
         """Запись операции в историю транзакций ETF"""
         try:
@@ -208,25 +208,34 @@ class ETFUIComponents:
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Заполняем данными
+        # Заполняем данными (идентификатор строки - тикер)
         for etf in portfolio_data:
-            profit = etf.get('profit', 0)
-            profit_percent = etf.get('profit_percent', 0)
-            
-            self.tree.insert("", tk.END, values=(
-                etf['ticker'],
-                etf.get('name', ''),
-                etf['quantity'],
-                f"{etf['buy_price']:.2f}",
-                f"{etf.get('commission', 0):.2f}",
-                f"{etf.get('total_cost', 0):.2f}",
-                f"{etf.get('current_price', 0):.2f}",
-                f"{etf.get('current_value', 0):.2f}",
-                f"{etf.get('dividend_yield', 0):.2f}%",
-                f"{etf.get('annual_dividend', 0):.2f}",
-                f"{profit:+.2f}",
-                f"{profit_percent:+.2f}%"
-            ))
+            self.tree.insert("", tk.END, iid=etf['ticker'], values=self._row_values(etf))
+    
+    def update_row(self, etf):
+        """Обновление одной строки таблицы без перестройки всей таблицы"""
+        if self.tree.exists(etf['ticker']):
+            self.tree.item(etf['ticker'], values=self._row_values(etf))
+    
+    def _row_values(self, etf):
+        """Значения строки таблицы для ETF"""
+        profit = etf.get('profit', 0)
+        profit_percent = etf.get('profit_percent', 0)
+        
+        return (
+            etf['ticker'],
+            etf.get('name', ''),
+            etf['quantity'],
+            f"{etf['buy_price']:.2f}",
+            f"{etf.get('commission', 0):.2f}",
+            f"{etf.get('total_cost', 0):.2f}",
+            f"{etf.get('current_price', 0):.2f}",
+            f"{etf.get('current_value', 0):.2f}",
+            f"{etf.get('dividend_yield', 0):.2f}%",
+            f"{etf.get('annual_dividend', 0):.2f}",
+            f"{profit:+.2f}",
+            f"{profit_percent:+.2f}%"
+        )
     
     def update_statistics(self, portfolio_data):
         """Обновление статистики портфеля ETF"""
@@ -4,6 +4,10 @@ from tkinter import ttk, messagebox
 from .etf_manager import ETFPortfolioManager
 from .etf_ui import ETFUIComponents
 from .etf_transactions import ETFTransactionManager
+from background_jobs import BackgroundJobRunner
+from commission_window import show_commission_settings
+from export_manager import export_rows
+from quote_bus import get_quote_bus
 
 
 class ETFPortfolioWindow:
@@ -23,6 +27,7 @@ class ETFPortfolioWindow:
         self.portfolio_manager = ETFPortfolioManager()
         self.transaction_manager = ETFTransactionManager()
         self.ui_components = ETFUIComponents(self.window, self)
+        self.job_runner = BackgroundJobRunner(self.window)
         
         # Создание интерфейса
         self.ui_components.create_main_interface()
@@ -30,6 +35,11 @@ class ETFPortfolioWindow:
         # Обновление цен при открытии
         self.update_all_prices()
         
+        # Живое обновление цен через общую шину котировок
+        self.quote_subscription = get_quote_bus().subscribe(
+            self.window, self.portfolio_manager.get_tickers, self.on_quotes,
+            board=self.portfolio_manager.BOARD)
+        
         self.window.protocol("WM_DELETE_WINDOW", self.close)
     
     def add_etf(self):
@@ -105,16 +115,35 @@ class ETFPortfolioWindow:
         
         # Показываем диалог прогресса
         progress_window = self.ui_components.show_progress_dialog("Обновление цен ETF...")
+        updated_tickers = set()
+        
+        def fetch_quotes(job):
+            # Котировки грузятся в фоне, строки обновляются по мере поступления пачек
+            return self.portfolio_manager.fetch_all_quotes(
+                lambda quotes: job.post(apply_quotes, quotes))
+        
+        def apply_quotes(quotes):
+            for etf in self.portfolio_manager.portfolio_data:
+                quote = quotes.get(etf['ticker'])
+                if quote and self.portfolio_manager.apply_quote(etf, quote):
+                    updated_tickers.add(etf['ticker'])
+                    self.ui_components.update_row(etf)
+            self.ui_components.update_statistics(self.portfolio_manager.portfolio_data)
         
-        def update_task():
-            # Обновляем цены и получаем результаты
-            updated_count, total_count = self.portfolio_manager.update_all_prices()
+        def finish_update(missing):
+            # Для неполученных котировок - прежнее поведение с ценой покупки
+            for etf in self.portfolio_manager.portfolio_data:
+                if etf['ticker'] not in updated_tickers:
+                    self.portfolio_manager.apply_quote(etf, None)
             
             # Закрываем прогресс и обновляем интерфейс
             progress_window.destroy()
             self._refresh_interface()
             
             # Показываем детальный отчет
+            total_count = len(self.portfolio_manager.portfolio_data)
+            updated_count = sum(1 for etf in self.portfolio_manager.portfolio_data
+                                if etf['ticker'] in updated_tickers)
             if updated_count == total_count:
                 messagebox.showinfo("Обновление завершено", 
                                   f"Цены успешно обновлены для всех {total_count} ETF")
@@ -123,8 +152,21 @@ class ETFPortfolioWindow:
                                   f"Цены обновлены для {updated_count} из {total_count} ETF\n"
                                   f"Не удалось обновить: {total_count - updated_count} ETF")
         
-        # Запускаем обновление с задержкой для отображения прогресса
-        self.window.after(100, update_task)
+        def fail_update(error):
+            progress_window.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось обновить цены ETF: {error}")
+        
+        self.job_runner.submit(fetch_quotes, on_done=finish_update, on_error=fail_update)
+    
+    def on_quotes(self, quotes):
+        """Переоценка ETF по котировкам из шины (вызывается в потоке интерфейса)"""
+        for etf in self.portfolio_manager.portfolio_data:
+            quote = quotes.get(etf['ticker'])
+            # Котировки без цены (например, вне торгов) не сбрасывают текущую оценку
+            if quote and (quote.get('LAST') or quote.get('LCURRENTPRICE')):
+                self.portfolio_manager.apply_quote(etf, quote)
+                self.ui_components.update_row(etf)
+        self.ui_components.update_statistics(self.portfolio_manager.portfolio_data)
     
     def delete_selected(self):
         """Удаление выбранного ETF из портфеля"""
@@ -165,16 +207,17 @@ class ETFPortfolioWindow:
         self.ui_components.show_dividend_calculation(portfolio_data)
     
     def export_to_csv(self):
-        """Экспорт портфеля ETF в CSV файл"""
-        success, message = self.portfolio_manager.export_to_csv()
-        if success:
-            messagebox.showinfo("Экспорт завершен", message)
-        else:
-            messagebox.showerror("Ошибка", message)
+        """Экспорт портфеля ETF в CSV/Parquet в фоновом потоке"""
+        if not self.portfolio_manager.portfolio_data:
+            messagebox.showwarning("Экспорт", "Портфель ETF пуст")
+            return
+        
+        headers, make_rows = self.portfolio_manager.export_source()
+        export_rows(self.window, "etf_portfolio", headers, make_rows, "Экспорт портфеля ETF")
     
     def show_commission_settings(self):
         """Показать настройки комиссий"""
-        self.portfolio_manager.show_commission_settings(self.window)
+        show_commission_settings(self.window)
     
     def _refresh_interface(self):
         """Обновление интерфейса"""
@@ -184,5 +227,7 @@ class ETFPortfolioWindow:
     
     def close(self):
         """Закрытие окна портфеля ETF"""
+        self.job_runner.cancel_all()
+        self.quote_subscription.cancel()
         self.portfolio_manager.save_portfolio_data()
         self.window.destroy()
\ No newline at end of file
@@ -0,0 +1,181 @@
+# export_manager.py
+import csv
+import gzip
+import os
+from datetime import datetime
+from tkinter import filedialog, messagebox
+from background_jobs import BackgroundJobRunner
+
+
+# Форматы экспорта: расширение файла -> описание для диалога сохранения
+EXPORT_FORMATS = {
+    '.csv': "CSV",
+    '.csv.gz': "CSV (gzip)",
+    '.parquet': "Parquet"
+}
+
+
+def detect_format(path):
+    """
+    Определение формата экспорта по имени файла.
+
+    Args:
+        path: путь к файлу
+
+    Returns:
+        str: расширение из EXPORT_FORMATS (по умолчанию '.csv')
+    """
+    name = path.lower()
+    for extension in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if name.endswith(extension):
+            return extension
+    return '.csv'
+
+
+class RowExporter:
+    """
+    Потоковая запись строк в файл. Строки берутся из генератора
+    и пишутся пачками по batch_size, поэтому в памяти никогда
+    не хранится больше одной пачки, сколько бы строк ни было в источнике.
+    """
+
+    def __init__(self, batch_size=5000, delimiter=';'):
+        """
+        Инициализация экспорта.
+
+        Args:
+            batch_size: количество строк в одной пачке записи
+            delimiter: разделитель колонок CSV
+        """
+        self.batch_size = batch_size
+        self.delimiter = delimiter
+
+    def _batches(self, rows, job=None):
+        """Разбиение потока строк на пачки с проверкой отмены и отчетом о ходе"""
+        batch = []
+        written = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                if job:
+                    job.check_cancelled()
+                yield batch
+                written += len(batch)
+                batch = []
+                if job:
+                    job.progress(written)
+        if batch:
+            yield batch
+            written += len(batch)
+            if job:
+                job.progress(written)
+
+    def write(self, path, headers, rows, job=None):
+        """
+        Запись строк в файл в формате, определенном по расширению.
+        Запись идет во временный файл, который заменяет целевой только
+        после успешного завершения - при ошибке или отмене старый файл не портится.
+
+        Args:
+            path: путь к файлу (.csv, .csv.gz или .parquet)
+            headers: заголовки колонок
+            rows: итерируемый источник строк (генератор)
+            job: фоновая задача для отчета о ходе и отмены
+
+        Returns:
+            int: количество записанных строк
+        """
+        file_format = detect_format(path)
+        temp_path = path + '.tmp'
+        try:
+            if file_format == '.parquet':
+                count = self._write_parquet(temp_path, headers, rows, job)
+            else:
+                if file_format == '.csv.gz':
+                    # Средняя степень сжатия: почти тот же размер при в разы меньшем времени
+                    f = gzip.open(temp_path, 'wt', compresslevel=6, newline='', encoding='utf-8')
+                else:
+                    f = open(temp_path, 'w', newline='', encoding='utf-8')
+                with f:
+                    count = self._write_csv(f, headers, rows, job)
+            os.replace(temp_path, path)
+            return count
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _write_csv(self, f, headers, rows, job):
+        """Запись CSV пачками"""
+        writer = csv.writer(f, delimiter=self.delimiter)
+        writer.writerow(headers)
+        count = 0
+        for batch in self._batches(rows, job):
+            writer.writerows(batch)
+            count += len(batch)
+        return count
+
+    def _write_parquet(self, path, headers, rows, job):
+        """Запись Parquet группами строк (по одной на пачку)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для экспорта в Parquet установите пакет pyarrow")
+
+        writer = None
+        count = 0
+        try:
+            for batch in self._batches(rows, job):
+                columns = {header: [row[index] for row in batch] for index, header in enumerate(headers)}
+                if writer is None:
+                    table = pa.table(columns)
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    # Схема берется из первой пачки, следующие приводятся к ней
+                    table = pa.table(columns).cast(writer.schema)
+                writer.write_table(table)
+                count += len(batch)
+            if writer is None:
+                pq.write_table(pa.table({header: [] for header in headers}), path)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+
+def export_rows(parent, default_name, headers, make_rows, title="Экспорт", delimiter=';'):
+    """
+    Экспорт с выбором файла и записью в фоновом потоке.
+
+    Args:
+        parent: окно, в потоке которого показываются сообщения
+        default_name: имя файла по умолчанию без расширения
+        headers: заголовки колонок
+        make_rows: функция без аргументов, возвращающая генератор строк;
+            вызывается в рабочем потоке, поэтому не должна обращаться к виджетам
+        title: заголовок диалога и сообщений
+        delimiter: разделитель колонок CSV
+
+    Returns:
+        BackgroundJob: задача экспорта или None, если файл не выбран
+    """
+    path = filedialog.asksaveasfilename(
+        parent=parent,
+        title=title,
+        initialfile=f"{default_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        defaultextension='.csv',
+        filetypes=[(description, f"*{extension}") for extension, description in EXPORT_FORMATS.items()]
+    )
+    if not path:
+        return None
+
+    def on_done(count):
+        messagebox.showinfo(title, f"Экспортировано строк: {count}\nФайл: {path}", parent=parent)
+
+    def on_error(error):
+        messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {error}", parent=parent)
+
+    return BackgroundJobRunner(parent).submit(
+        lambda job: RowExporter(delimiter=delimiter).write(path, headers, make_rows(), job),
+        on_done=on_done, on_error=on_error
+    )
@@ -0,0 +1,121 @@
+# import_report.py
+"""
+Отчет о времени импорта модулей при запуске приложения.
+
+Запускает интерпретатор с -X importtime, собирает время импорта
+каждого модуля и печатает самые медленные. С --json результат
+дописывается в файл истории, чтобы отслеживать изменения между версиями.
+
+Пример:
+    python import_report.py --top 15 --json import_times.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+
+def measure_imports(module, python=sys.executable):
+    """
+    Замер времени импорта модуля в отдельном процессе.
+
+    Args:
+        module: имя импортируемого модуля
+        python: путь к интерпретатору
+
+    Returns:
+        list: записи {'module', 'self_ms', 'cumulative_ms', 'depth'} в порядке вывода -X importtime
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        # Трассировка ошибки импорта идет в stderr после строк importtime
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"Не удалось импортировать {module}:\n" + "\n".join(errors[-5:]))
+
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        records.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            # Вложенность импорта обозначается отступом имени модуля
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2
+        })
+    return records
+
+
+def summarize(records, top=20):
+    """
+    Сводка по замеру.
+
+    Args:
+        records: результат measure_imports
+        top: количество самых медленных модулей
+
+    Returns:
+        dict: общее время и самые медленные модули (по накопленному и собственному времени)
+    """
+    top_level = [record for record in records if record['depth'] == 0]
+    return {
+        'total_ms': round(sum(record['cumulative_ms'] for record in top_level), 1),
+        'modules': len(records),
+        'slowest_cumulative': sorted(top_level, key=lambda r: r['cumulative_ms'], reverse=True)[:top],
+        'slowest_self': sorted(records, key=lambda r: r['self_ms'], reverse=True)[:top]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта модулей при запуске")
+    parser.add_argument('--module', default='main', help="модуль для замера (по умолчанию main)")
+    parser.add_argument('--top', type=int, default=20, help="количество самых медленных модулей")
+    parser.add_argument('--json', dest='json_path', help="файл истории замеров (JSON)")
+    parser.add_argument('--budget', type=float, help="допустимое общее время импорта, мс")
+    args = parser.parse_args()
+
+    try:
+        summary = summarize(measure_imports(args.module), args.top)
+    except RuntimeError as e:
+        print(e)
+        return 2
+
+    print(f"Импорт {args.module}: {summary['total_ms']:.1f} мс, модулей: {summary['modules']}")
+    print("\nВерхний уровень (накопленное время):")
+    for record in summary['slowest_cumulative']:
+        print(f"  {record['cumulative_ms']:9.1f} мс  {record['module']}")
+    print("\nСобственное время модулей:")
+    for record in summary['slowest_self']:
+        print(f"  {record['self_ms']:9.1f} мс  {record['module']}")
+
+    if args.json_path:
+        history = []
+        if os.path.exists(args.json_path):
+            with open(args.json_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        history.append({
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'module': args.module,
+            'python': sys.version.split()[0],
+            'total_ms': summary['total_ms'],
+            'modules': summary['modules'],
+            'slowest': {r['module']: r['cumulative_ms'] for r in summary['slowest_cumulative']}
+        })
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+
+    if args.budget is not None and summary['total_ms'] > args.budget:
+        print(f"\nПревышен бюджет времени импорта: {summary['total_ms']:.1f} > {args.budget:.1f} мс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
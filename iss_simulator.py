@@ -0,0 +1,401 @@
+# iss_simulator.py
+"""
+Локальный симулятор ISS Мосбиржи для бенчмарков и нагрузочных тестов.
+
+Отдает в формате ISS (блоки columns/data) те запросы, которые делает приложение:
+    /iss/engines/stock/markets/{market}/boards/{board}/securities.json
+    /iss/engines/stock/markets/{market}/boards/{board}/securities/{ticker}.json
+    /iss/history/engines/stock/markets/{market}/boards/{board}/securities/{ticker}.json
+История отдается страницами по 100 строк с блоком history.cursor.
+Данные - синтетические (случайное блуждание с фиксированным seed) или записанные с биржи.
+
+Примеры:
+    python iss_simulator.py serve --port 8765 --latency 80 --jitter 40 --error-rate 0.02
+    MOEX_ISS_URL=http://127.0.0.1:8765/iss python main.py
+
+    python iss_simulator.py record SBER GAZP IMOEX -o iss_data.json
+    python iss_simulator.py serve --data iss_data.json
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+HISTORY_PAGE_SIZE = 100
+
+SECURITIES_COLUMNS = ['SECID', 'BOARDID', 'SHORTNAME', 'PREVPRICE', 'LOTSIZE', 'SECNAME']
+MARKETDATA_COLUMNS = ['SECID', 'BOARDID', 'OPEN', 'LOW', 'HIGH', 'LAST', 'LCURRENTPRICE',
+                      'VOLTODAY', 'VALTODAY', 'SYSTIME', 'UPDATETIME']
+INDEX_MARKETDATA_COLUMNS = ['SECID', 'BOARDID', 'LASTVALUE', 'OPENVALUE', 'CURRENTVALUE',
+                            'LOW', 'HIGH', 'SYSTIME', 'UPDATETIME']
+HISTORY_COLUMNS = ['BOARDID', 'TRADEDATE', 'SHORTNAME', 'SECID', 'NUMTRADES', 'VALUE',
+                   'OPEN', 'LOW', 'HIGH', 'LEGALCLOSEPRICE', 'WAPRICE', 'CLOSE', 'VOLUME']
+
+# Режимы торгов по умолчанию для рынков
+DEFAULT_BOARDS = {'shares': 'TQBR', 'index': 'SNDX'}
+
+
+class SimulatedInstrument:
+    """
+    Инструмент симулятора: дневная история закрытий и текущая сессия,
+    цена которой меняется случайным блужданием при каждом обращении.
+    """
+
+    def __init__(self, ticker, board, history, shortname=None, volatility=0.02, seed=None):
+        """
+        Инициализация инструмента.
+
+        Args:
+            ticker: тикер
+            board: режим торгов
+            history: пары (date, цена закрытия) в хронологическом порядке
+            shortname: краткое название
+            volatility: дневная волатильность для блуждания текущей цены
+            seed: начальное значение генератора случайных чисел
+        """
+        self.ticker = ticker
+        self.board = board
+        self.history = history
+        self.shortname = shortname or ticker
+        self.volatility = volatility
+        self._random = random.Random(seed if seed is not None else ticker)
+        self._lock = threading.Lock()
+
+        self.prev_price = history[-1][1] if history else 100.0
+        self.open = round(self.prev_price * (1 + self._random.gauss(0, volatility / 4)), 2)
+        self.last = self.open
+        self.low = self.high = self.open
+        self.volume = 0
+        self._last_tick = time.monotonic()
+
+    @classmethod
+    def synthetic(cls, ticker, board, days=1500, start_price=None, volatility=0.02, seed=None):
+        """
+        Инструмент с синтетической историей (геометрическое случайное блуждание по рабочим дням).
+
+        Args:
+            ticker: тикер
+            board: режим торгов
+            days: количество календарных дней истории
+            start_price: начальная цена (по умолчанию - случайная от 50 до 5000)
+            volatility: дневная волатильность
+            seed: начальное значение генератора случайных чисел
+        """
+        rng = random.Random(seed if seed is not None else f"history:{ticker}")
+        price = start_price or rng.uniform(50, 5000)
+        history = []
+        day = date.today() - timedelta(days=days)
+        while day < date.today():
+            if day.weekday() < 5:
+                price *= math.exp(rng.gauss(0.0002, volatility))
+                history.append((day, round(price, 2)))
+            day += timedelta(days=1)
+        return cls(ticker, board, history, volatility=volatility, seed=seed)
+
+    def tick(self):
+        """Сдвиг текущей цены пропорционально прошедшему времени (одна минута - один шаг)"""
+        with self._lock:
+            now = time.monotonic()
+            steps = (now - self._last_tick) / 60
+            self._last_tick = now
+            if steps > 0:
+                sigma = self.volatility * math.sqrt(steps / 540)  # 540 минут в торговой сессии
+                self.last = round(self.last * math.exp(self._random.gauss(0, sigma)), 2)
+                self.low = min(self.low, self.last)
+                self.high = max(self.high, self.last)
+                self.volume += self._random.randint(0, 1000)
+            return self.last
+
+    def securities_row(self):
+        """Строка блока securities"""
+        return [self.ticker, self.board, self.shortname, self.prev_price, 1, self.shortname]
+
+    def marketdata_row(self, market):
+        """Строка блока marketdata"""
+        last = self.tick()
+        systime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        update_time = datetime.now().strftime('%H:%M:%S')
+        if market == 'index':
+            return [self.ticker, self.board, last, self.open, last,
+                    self.low, self.high, systime, update_time]
+        return [self.ticker, self.board, self.open, self.low, self.high, last, last,
+                self.volume, round(self.volume * last, 2), systime, update_time]
+
+    def history_rows(self, from_date=None, till_date=None):
+        """Строки блока history за период"""
+        rows = []
+        for day, close in self.history:
+            if (from_date and day < from_date) or (till_date and day > till_date):
+                continue
+            rows.append([self.board, day.isoformat(), self.shortname, self.ticker, 1000,
+                         round(close * 1_000_000, 2), close, close, close, close, close, close, 1_000_000])
+        return rows
+
+
+class ISSSimulator:
+    """
+    HTTP-сервер симулятора ISS с настраиваемой задержкой и внедрением ошибок.
+    """
+
+    def __init__(self, instruments=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 hang_rate=0.0, hang_seconds=30.0, seed=None):
+        """
+        Инициализация симулятора.
+
+        Args:
+            instruments: {(рынок, тикер): SimulatedInstrument}; неизвестные тикеры создаются синтетически
+            latency: средняя задержка ответа в миллисекундах
+            jitter: разброс задержки в миллисекундах (равномерный, +-jitter)
+            error_rate: доля запросов, на которые отвечаем ошибкой 500
+            hang_rate: доля запросов, которые зависают на hang_seconds (проверка таймаутов)
+            hang_seconds: длительность зависания в секундах
+            seed: начальное значение генератора для задержек и ошибок
+        """
+        self.instruments = instruments if instruments is not None else {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'hangs': 0}
+        self.server = None
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """
+        Симулятор с данными, записанными командой record.
+
+        Args:
+            path: JSON-файл вида {рынок: {тикер: {'board', 'shortname', 'history': [[дата, цена], ...]}}}
+            **options: параметры конструктора
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+        instruments = {}
+        for market, tickers in recorded.items():
+            for ticker, item in tickers.items():
+                history = [(date.fromisoformat(day), close) for day, close in item['history']]
+                instruments[(market, ticker)] = SimulatedInstrument(
+                    ticker, item['board'], history, item.get('shortname'))
+        return cls(instruments, **options)
+
+    def instrument(self, market, board, ticker):
+        """Инструмент по рынку и тикеру (синтетический, если не записан)"""
+        key = (market, ticker.upper())
+        with self._lock:
+            if key not in self.instruments:
+                self.instruments[key] = SimulatedInstrument.synthetic(ticker.upper(), board)
+            return self.instruments[key]
+
+    def _inject_faults(self):
+        """Задержка, зависание или ошибка для очередного запроса"""
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0) / 1000
+            roll = self._random.random()
+            hang = roll < self.hang_rate
+            error = not hang and roll < self.hang_rate + self.error_rate
+            if hang:
+                self.stats['hangs'] += 1
+            if error:
+                self.stats['errors'] += 1
+
+        time.sleep(self.hang_seconds if hang else delay)
+        return error
+
+    def handle(self, path, query):
+        """
+        Ответ на запрос ISS.
+
+        Args:
+            path: путь запроса
+            query: параметры запроса (результат parse_qs)
+
+        Returns:
+            tuple: (HTTP-статус, объект ответа)
+        """
+        parts = [part for part in path.split('/') if part]
+        if parts and parts[0] == 'iss':
+            parts = parts[1:]
+        is_history = bool(parts) and parts[0] == 'history'
+        if is_history:
+            parts = parts[1:]
+
+        # engines/stock/markets/{market}/boards/{board}/securities[/{ticker}].json
+        if len(parts) < 7 or parts[0] != 'engines' or parts[2] != 'markets' or parts[4] != 'boards':
+            return 404, {'error': f"unknown path {path}"}
+        market, board = parts[3], parts[5]
+        resource = parts[6:]
+
+        def param(name, default=None):
+            return query.get(name, [default])[0]
+
+        if is_history:
+            if len(resource) != 2:
+                return 404, {'error': "history requires a ticker"}
+            ticker = resource[1].removesuffix('.json')
+            from_date = param('from')
+            till_date = param('till')
+            rows = self.instrument(market, board, ticker).history_rows(
+                date.fromisoformat(from_date) if from_date else None,
+                date.fromisoformat(till_date) if till_date else None)
+            start = int(param('start', 0))
+            return 200, {
+                'history': {'columns': HISTORY_COLUMNS, 'data': rows[start:start + HISTORY_PAGE_SIZE]},
+                'history.cursor': {'columns': ['INDEX', 'TOTAL', 'PAGESIZE'],
+                                   'data': [[start, len(rows), HISTORY_PAGE_SIZE]]}
+            }
+
+        if resource[0] == 'securities.json':
+            tickers = [t for t in (param('securities') or '').split(',') if t]
+        elif len(resource) == 2:
+            tickers = [resource[1].removesuffix('.json')]
+        else:
+            return 404, {'error': f"unknown path {path}"}
+
+        instruments = [self.instrument(market, board, ticker) for ticker in tickers]
+        columns = INDEX_MARKETDATA_COLUMNS if market == 'index' else MARKETDATA_COLUMNS
+        blocks = {
+            'securities': {'columns': SECURITIES_COLUMNS,
+                           'data': [instrument.securities_row() for instrument in instruments]},
+            'marketdata': {'columns': columns,
+                           'data': [instrument.marketdata_row(market) for instrument in instruments]}
+        }
+        only = param('iss.only')
+        if only:
+            blocks = {name: block for name, block in blocks.items() if name in only.split(',')}
+        return 200, blocks
+
+    def start(self, host='127.0.0.1', port=0):
+        """
+        Запуск сервера в фоновом потоке.
+
+        Args:
+            host: адрес
+            port: порт (0 - любой свободный)
+
+        Returns:
+            str: базовый адрес ISS для MOEX_ISS_URL / moex_client.set_base_url
+        """
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if simulator._inject_faults():
+                    status, body = 500, {'error': "injected failure"}
+                else:
+                    request = urlparse(self.path)
+                    try:
+                        status, body = simulator.handle(request.path, parse_qs(request.query))
+                    except ValueError as e:
+                        status, body = 400, {'error': str(e)}
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # клиент не дождался ответа (таймаут)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self.server.server_address[1]}/iss"
+
+    def stop(self):
+        """Остановка сервера"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def record(tickers, path, days=1500):
+    """
+    Запись дневной истории с настоящего ISS для последующего воспроизведения.
+
+    Args:
+        tickers: тикеры (индексы - IMOEX, RTSI и т.п. - записываются с рынка index)
+        path: файл для записи
+        days: глубина истории в днях
+    """
+    from core.moex_client import fetch_history, fetch_marketdata
+
+    recorded = {}
+    for ticker in tickers:
+        market = 'index' if ticker in ('IMOEX', 'RTSI', 'MOEXBC') else 'shares'
+        board = DEFAULT_BOARDS[market]
+        try:
+            history = fetch_history(ticker, datetime.now() - timedelta(days=days), market=market, board=board)
+            quote = fetch_marketdata([ticker], market=market, board=board).get(ticker, {})
+        except Exception as e:
+            print(f"Ошибка записи {ticker}: {e}")
+            continue
+        recorded.setdefault(market, {})[ticker] = {
+            'board': board,
+            'shortname': quote.get('SHORTNAME', ticker),
+            'history': [[day.date().isoformat(), close] for day, close in history]
+        }
+        print(f"{ticker}: {len(history)} дней")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(recorded, f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор ISS Мосбиржи")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="запустить сервер")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--data', help="файл, записанный командой record")
+    serve.add_argument('--latency', type=float, default=0.0, help="средняя задержка, мс")
+    serve.add_argument('--jitter', type=float, default=0.0, help="разброс задержки, мс")
+    serve.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 500")
+    serve.add_argument('--hang-rate', type=float, default=0.0, help="доля зависающих запросов")
+    serve.add_argument('--hang-seconds', type=float, default=30.0, help="длительность зависания, с")
+    serve.add_argument('--seed', type=int, help="seed для задержек и ошибок")
+
+    record_parser = commands.add_parser('record', help="записать историю с настоящего ISS")
+    record_parser.add_argument('tickers', nargs='+')
+    record_parser.add_argument('-o', '--output', default='iss_data.json')
+    record_parser.add_argument('--days', type=int, default=1500)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record([ticker.upper() for ticker in args.tickers], args.output, args.days)
+        return
+
+    options = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, seed=args.seed)
+    simulator = ISSSimulator.from_file(args.data, **options) if args.data else ISSSimulator(**options)
+    base_url = simulator.start(args.host, args.port)
+    print(f"Симулятор ISS: {base_url}")
+    print(f"Запуск приложения: MOEX_ISS_URL={base_url} python main.py")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+        print(f"Остановлен. Запросов: {simulator.stats['requests']}, "
+              f"ошибок: {simulator.stats['errors']}, зависаний: {simulator.stats['hangs']}")
+
+
+if __name__ == "__main__":
+    main()
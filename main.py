@@ -1,7 +1,25 @@
 # main.py
 from stock_monitor import StockMonitor
 import tkinter as tk
-from PIL import Image, ImageTk
+from core.instrumentation import get_profile_capture
+
+def set_icon(root, path):
+    """
+    Установка иконки окна. Иконка необязательна: без файла или без Pillow
+    приложение запускается со стандартной иконкой.
+    
+    Args:
+        root: главное окно
+        path: путь к изображению
+    """
+    try:
+        from PIL import Image, ImageTk
+        # Ссылка на изображение хранится в окне, иначе его удалит сборщик мусора
+        root.icon_image = ImageTk.PhotoImage(Image.open(path))
+        root.iconphoto(False, root.icon_image)
+    except Exception as e:
+        print(f"Ошибка загрузки иконки {path}: {e}")
+
 def main():
     """
     Главная функция приложения.
@@ -9,11 +27,14 @@ def main():
     """
     root = tk.Tk()
     app = StockMonitor(root)
-    load = Image.open('logo.png')
-    render = ImageTk.PhotoImage(load)
-    root.iconphoto(False, render)
+    set_icon(root, 'logo.png')
     
     root.mainloop()
+    
+    # Профиль, начатый через MOEX_PROFILE и не остановленный вручную, сохраняется при выходе
+    path = get_profile_capture().stop()
+    if path:
+        print(f"Профиль сохранен: {path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,248 @@
+# quote_bus.py
+import queue
+import threading
+import time
+import tkinter as tk
+from core.market_schedule import AdaptiveScheduler
+from core.moex_client import RateLimitError, fetch_marketdata_batches
+from core.instrumentation import get_metrics, timed
+
+
+class QuoteSubscription:
+    """
+    Подписка окна на котировки. Котировки кладутся в очередь подписки
+    рабочим потоком шины и передаются в callback в потоке окна через after().
+    """
+
+    def __init__(self, bus, widget, tickers, callback, board, poll_interval):
+        """
+        Инициализация подписки.
+
+        Args:
+            bus: шина котировок
+            widget: окно, в потоке которого вызывается callback
+            tickers: список тикеров или функция без аргументов, возвращающая список
+            callback: функция, принимающая dict {тикер: котировка}
+            board: режим торгов ('TQBR', 'TQTF', ...)
+            poll_interval: период разбора очереди в миллисекундах
+        """
+        self.bus = bus
+        self.widget = widget
+        self.callback = callback
+        self.board = board
+        self.poll_interval = poll_interval
+        self.active = True
+        self._tickers_source = tickers
+        self._tickers = frozenset()
+        self._quotes = queue.Queue()
+        # Момент получения самой ранней из переданных в callback котировок (time.perf_counter)
+        self.received_at = None
+
+    @property
+    def tickers(self):
+        """Текущий набор тикеров подписки"""
+        return self._tickers
+
+    def refresh_tickers(self):
+        """Перечитать набор тикеров (вызывается в потоке окна)"""
+        source = self._tickers_source() if callable(self._tickers_source) else self._tickers_source
+        tickers = frozenset(ticker.upper() for ticker in source)
+        if tickers != self._tickers:
+            self._tickers = tickers
+            self.bus.wake()
+
+    def set_tickers(self, tickers):
+        """Заменить набор тикеров подписки"""
+        self._tickers_source = tickers
+        self.refresh_tickers()
+
+    def deliver(self, quotes):
+        """Передать котировки подписке (вызывается из потока шины)"""
+        selected = {ticker: quote for ticker, quote in quotes.items() if ticker in self._tickers}
+        if selected:
+            self._quotes.put((time.perf_counter(), selected))
+
+    def cancel(self):
+        """Отменить подписку"""
+        self.active = False
+        self.bus.unsubscribe(self)
+
+    def _drain(self):
+        """Разбор очереди котировок в потоке окна"""
+        if not self.active:
+            return
+        try:
+            if not self.widget.winfo_exists():
+                raise tk.TclError("window destroyed")
+        except tk.TclError:
+            # Окно закрыто - подписка больше не нужна
+            self.cancel()
+            return
+
+        self.refresh_tickers()
+
+        # Из накопившихся пачек берем самые свежие котировки по каждому тикеру
+        latest = {}
+        received_at = None
+        while True:
+            try:
+                batch_time, batch = self._quotes.get_nowait()
+            except queue.Empty:
+                break
+            latest.update(batch)
+            received_at = batch_time if received_at is None else received_at
+
+        if latest:
+            self.received_at = received_at
+            get_metrics().observe('quote_bus.queue_wait', (time.perf_counter() - received_at) * 1000)
+            try:
+                self.callback(latest)
+            except Exception as e:
+                print(f"Ошибка обработки котировок: {e}")
+
+        self.widget.after(self.poll_interval, self._drain)
+
+
+class QuoteBus:
+    """
+    Общая шина котировок процесса. Один рабочий поток опрашивает MOEX
+    по объединению тикеров всех подписок пачечными запросами
+    и раздает котировки подписанным окнам. Период опроса выбирает
+    AdaptiveScheduler: реже вне торгов, чаще при росте волатильности,
+    с нарастающей задержкой после ошибок.
+    """
+
+    def __init__(self, interval=5, timeout=10):
+        """
+        Инициализация шины.
+
+        Args:
+            interval: обычный период опроса биржи в секундах
+            timeout: срок ожидания котировок одного опроса в секундах
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.scheduler = AdaptiveScheduler(interval)
+        self.next_poll_at = None  # time.monotonic() следующего опроса
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def subscribe(self, widget, tickers, callback, board='TQBR', poll_interval=100):
+        """
+        Подписка окна на котировки.
+
+        Args:
+            widget: окно; при его закрытии подписка отменяется автоматически
+            tickers: список тикеров или функция, возвращающая актуальный список
+            callback: функция, принимающая dict {тикер: котировка}, вызывается в потоке окна
+            board: режим торгов
+            poll_interval: период разбора очереди в миллисекундах
+
+        Returns:
+            QuoteSubscription: подписка (для смены тикеров и отмены)
+        """
+        subscription = QuoteSubscription(self, widget, tickers, callback, board, poll_interval)
+        subscription.refresh_tickers()
+        with self._lock:
+            self._subscriptions.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self.wake()
+        widget.after(poll_interval, subscription._drain)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Отмена подписки"""
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def set_interval(self, interval):
+        """Изменение обычного периода опроса в секундах"""
+        self.interval = interval
+        self.scheduler.set_interval(interval)
+        self.wake()
+
+    def seconds_until_poll(self):
+        """
+        Фактическая пауза до следующего опроса с учетом расписания торгов,
+        волатильности и задержки после ошибок.
+
+        Returns:
+            float: секунды или None, если опрос не идет
+        """
+        next_poll_at = self.next_poll_at
+        if next_poll_at is None:
+            return None
+        return max(0.0, next_poll_at - time.monotonic())
+
+    def wake(self):
+        """Внеочередной опрос (например, после смены тикеров)"""
+        self._wake_event.set()
+
+    @timed('quote_bus.poll')
+    def poll_once(self):
+        """Один опрос биржи по объединению всех подписок"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        boards = {}
+        for subscription in subscriptions:
+            boards.setdefault(subscription.board, set()).update(subscription.tickers)
+
+        received = []
+        errors = []
+        for board, tickers in boards.items():
+            if not tickers:
+                continue
+            board_subscriptions = [s for s in subscriptions if s.board == board]
+
+            def fan_out(quotes):
+                received.append(quotes)
+                self.scheduler.record_quotes(quotes)
+                for subscription in board_subscriptions:
+                    subscription.deliver(quotes)
+
+            fetch_marketdata_batches(sorted(tickers), fan_out, board=board, timeout=self.timeout,
+                                     on_error=errors.append)
+
+        if received:
+            self.scheduler.record_success()
+        elif errors or any(boards.values()):
+            # Ни одной пачки: ошибка или истек срок ожидания
+            retry_after = max((e.retry_after or 0 for e in errors if isinstance(e, RateLimitError)), default=0)
+            self.scheduler.record_error(retry_after)
+
+    def _run(self):
+        """Цикл опроса; завершается, когда не осталось подписок"""
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    self.next_poll_at = None
+                    return
+            self._wake_event.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Ошибка опроса котировок: {e}")
+                self.scheduler.record_error()
+            delay = self.scheduler.next_delay()
+            self.next_poll_at = time.monotonic() + delay
+            get_metrics().observe('quote_bus.poll_delay', delay * 1000)
+            # Смена тикеров или периода будит поток раньше срока
+            self._wake_event.wait(delay)
+
+
+_shared_bus = None
+
+
+def get_quote_bus():
+    """Общая для процесса шина котировок"""
+    global _shared_bus
+    if _shared_bus is None:
+        _shared_bus = QuoteBus()
+    return _shared_bus
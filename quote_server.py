@@ -0,0 +1,620 @@
+# quote_server.py
+"""
+Локальный сервер котировок и оценок портфелей для других программ.
+
+Отдает по HTTP (JSON) те же котировки, оценку портфелей рабочей области
+и коэффициент Шарпа, что считает приложение, и рассылает изменения
+котировок по WebSocket. Запросы всех клиентов к ISS объединяются:
+одновременные запросы одного режима торгов уходят на биржу одним пакетным
+запросом, свежие котировки отдаются из памяти, а подписки WebSocket
+обслуживает один общий цикл опроса.
+
+    GET /api/health
+    GET /api/metrics
+    GET /api/quotes?tickers=SBER,GAZP[&board=TQBR]
+    GET /api/portfolios
+    GET /api/portfolios/<имя>
+    GET /api/portfolios/<имя>/sharpe[?days=365&risk_free=7.5]
+    WS  /ws   {"action": "subscribe", "tickers": ["SBER"], "board": "TQBR"}
+              {"action": "unsubscribe", "tickers": ["SBER"]}
+
+Пример:
+    python quote_server.py --port 8780 --workspace portfolios --interval 5
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from datetime import date, datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlparse
+from core.data_handler import DataHandler
+from core.errors import PortfolioError
+from core.instrumentation import get_metrics
+from core.moex_client import fetch_marketdata_batches, set_base_url
+from core.portfolio import Portfolio
+from core.workspace import Workspace
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+WS_MAX_MESSAGE = 64 * 1024
+
+WS_CONTINUATION = 0x0
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+def json_default(value):
+    """Преобразование значений, которые json не сериализует (даты, числа numpy)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def encode_frame(opcode, payload):
+    """
+    Кадр WebSocket от сервера (без маски, одним фрагментом).
+
+    Args:
+        opcode: код кадра (WS_TEXT, WS_CLOSE, ...)
+        payload: данные кадра (bytes)
+
+    Returns:
+        bytes: кадр
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_message(reader):
+    """
+    Чтение сообщения WebSocket от клиента (фрагменты собираются в одно сообщение).
+
+    Returns:
+        tuple: (код сообщения, данные)
+    """
+    opcode = None
+    message = b''
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if len(message) + length > WS_MAX_MESSAGE:
+            raise ValueError("Слишком большое сообщение WebSocket")
+
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+        frame_opcode = first & 0x0F
+        if frame_opcode >= WS_CLOSE:
+            # Управляющие кадры могут приходить между фрагментами сообщения
+            return frame_opcode, payload
+        if frame_opcode != WS_CONTINUATION:
+            opcode = frame_opcode
+        message += payload
+        if first & 0x80:
+            return opcode, message
+
+
+class QuoteFlight:
+    """Один исходящий запрос котировок режима торгов, к которому присоединяются клиенты"""
+
+    def __init__(self, board):
+        self.board = board
+        self.tickers = set()
+        self.started = False
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class QuoteWatcher:
+    """Клиент WebSocket: подписка на тикеры и очередь исходящих сообщений"""
+
+    def __init__(self, queue_size=100):
+        """
+        Инициализация клиента.
+
+        Args:
+            queue_size: размер очереди сообщений (у медленного клиента старые сообщения отбрасываются)
+        """
+        self.board = 'TQBR'
+        self.tickers = set()
+        self.queue = asyncio.Queue(queue_size)
+
+    def push(self, message):
+        """Поставить сообщение в очередь отправки"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            get_metrics().increment('quote_server.ws_dropped')
+        self.queue.put_nowait(message)
+
+
+class QuoteHub:
+    """
+    Общий для всех клиентов источник котировок. Свежие котировки отдаются
+    из памяти; недостающие тикеры одновременных запросов собираются в один
+    пакетный запрос к ISS на режим торгов. Подписки WebSocket обслуживаются
+    одним циклом опроса по объединению тикеров.
+    """
+
+    def __init__(self, interval=5, timeout=10, max_age=None, coalesce_window=0.02):
+        """
+        Инициализация источника.
+
+        Args:
+            interval: период опроса биржи для подписок WebSocket в секундах
+            timeout: срок ожидания одного пакетного запроса в секундах
+            max_age: срок годности котировки для HTTP-запросов (по умолчанию - interval)
+            coalesce_window: сколько ждать присоединения других запросов перед отправкой, с
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = interval if max_age is None else max_age
+        self.coalesce_window = coalesce_window
+        self.watchers = set()
+        self._quotes = {}  # (режим торгов, тикер) -> (время получения, котировка)
+        self._published = {}  # (режим торгов, тикер) -> последняя разосланная котировка
+        self._flights = {}  # режим торгов -> QuoteFlight
+        self._wake_event = asyncio.Event()
+
+    def _stale(self, board, tickers, max_age):
+        """Тикеры без котировки моложе max_age секунд"""
+        now = time.monotonic()
+        stale = set()
+        for ticker in tickers:
+            cached = self._quotes.get((board, ticker))
+            if cached is None or now - cached[0] > max_age:
+                stale.add(ticker)
+        return stale
+
+    async def get_quotes(self, tickers, board='TQBR', max_age=None):
+        """
+        Котировки тикеров с объединением одновременных запросов.
+
+        Args:
+            tickers: тикеры
+            board: режим торгов
+            max_age: срок годности котировок (0 - обязательно запросить биржу)
+
+        Returns:
+            dict: {тикер: котировка ISS} для полученных тикеров
+        """
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        pending = self._stale(board, tickers, self.max_age if max_age is None else max_age)
+        if len(pending) < len(tickers):
+            get_metrics().increment('quote_server.cache_hits', len(tickers) - len(pending))
+
+        while pending:
+            flight = self._join(board, pending)
+            covered = pending & flight.tickers
+            await asyncio.shield(flight.future)
+            # Тикеры, не попавшие в уже начатый запрос, уходят следующим
+            pending -= covered
+
+        return {ticker: self._quotes[(board, ticker)][1]
+                for ticker in tickers if (board, ticker) in self._quotes}
+
+    def _join(self, board, tickers):
+        """Присоединение к текущему запросу режима торгов или создание нового"""
+        flight = self._flights.get(board)
+        if flight is None:
+            flight = self._flights[board] = QuoteFlight(board)
+            flight.tickers.update(tickers)
+            asyncio.ensure_future(self._fly(flight))
+            return flight
+
+        get_metrics().increment('quote_server.coalesced')
+        if not flight.started:
+            flight.tickers.update(tickers)
+        return flight
+
+    async def _fly(self, flight):
+        """Выполнение пакетного запроса в пуле потоков и рассылка результата"""
+        await asyncio.sleep(self.coalesce_window)
+        flight.started = True
+        received = {}
+        get_metrics().increment('quote_server.upstream_fetches')
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: fetch_marketdata_batches(sorted(flight.tickers), received.update,
+                                                       board=flight.board, timeout=self.timeout))
+        except Exception as e:
+            print(f"Ошибка получения котировок: {e}")
+        finally:
+            received_at = time.monotonic()
+            for ticker, quote in received.items():
+                self._quotes[(flight.board, ticker)] = (received_at, quote)
+            del self._flights[flight.board]
+            flight.future.set_result(None)
+        self.publish(flight.board, received)
+
+    def publish(self, board, quotes):
+        """Рассылка изменившихся котировок подписанным клиентам WebSocket"""
+        changed = {}
+        for ticker, quote in quotes.items():
+            if self._published.get((board, ticker)) != quote:
+                self._published[(board, ticker)] = quote
+                changed[ticker] = quote
+        if not changed:
+            return
+
+        views = {}
+        for watcher in list(self.watchers):
+            if watcher.board != board:
+                continue
+            selected = watcher.tickers.intersection(changed)
+            if not selected:
+                continue
+            for ticker in selected:
+                if ticker not in views:
+                    views[ticker] = quote_view(ticker, changed[ticker])
+            watcher.push({'type': 'quotes', 'board': board,
+                          'quotes': {ticker: views[ticker] for ticker in selected if views[ticker]}})
+
+    def wake(self):
+        """Внеочередной опрос (например, после новой подписки)"""
+        self._wake_event.set()
+
+    async def run(self):
+        """Цикл опроса биржи по объединению тикеров подписок WebSocket"""
+        while True:
+            self._wake_event.clear()
+            boards = {}
+            for watcher in list(self.watchers):
+                boards.setdefault(watcher.board, set()).update(watcher.tickers)
+            for board, tickers in boards.items():
+                if not tickers:
+                    continue
+                try:
+                    await self.get_quotes(tickers, board, max_age=0)
+                except Exception as e:
+                    print(f"Ошибка опроса котировок: {e}")
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def quote_view(ticker, quote):
+    """
+    Котировка в том виде, в каком ее показывает монитор (разбор DataHandler).
+
+    Returns:
+        dict: данные котировки или None, если цены нет
+    """
+    data = DataHandler(ticker).parse_quote(quote)
+    if not data['success']:
+        return None
+    data['name'] = quote.get('SHORTNAME') or ticker
+    return data
+
+
+class QuoteServer:
+    """HTTP/WebSocket сервер поверх общего источника котировок и рабочей области"""
+
+    def __init__(self, workspace, hub, sharpe_ttl=300):
+        """
+        Инициализация сервера.
+
+        Args:
+            workspace: рабочая область с портфелями
+            hub: источник котировок QuoteHub
+            sharpe_ttl: срок хранения рассчитанного коэффициента Шарпа в секундах
+        """
+        self.workspace = workspace
+        self.hub = hub
+        self.sharpe_ttl = sharpe_ttl
+        self._mtimes = {}
+        self._sharpe = {}  # (имя, дней, ставка) -> (время расчета, результат)
+        self._sharpe_flights = {}
+        self._poller = None
+
+    def portfolio(self, name):
+        """Портфель рабочей области; перечитывается, если файл изменило приложение"""
+        path = os.path.join(self.workspace.portfolio_dir(name), Portfolio.FILENAME)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        if self._mtimes.get(name, mtime) != mtime:
+            self.workspace.close(name)
+        self._mtimes[name] = mtime
+        return self.workspace.open(name)
+
+    async def valuation(self, name):
+        """
+        Оценка портфеля по текущим котировкам. Файлы портфеля не изменяются:
+        котировки применяются к копиям позиций.
+
+        Returns:
+            tuple: (позиции, статистика портфеля)
+        """
+        portfolio = self.portfolio(name)
+        quotes = await self.hub.get_quotes([stock['ticker'] for stock in portfolio.portfolio_data])
+        positions = []
+        for stock in portfolio.portfolio_data:
+            position = dict(stock)
+            quote = quotes.get(stock['ticker'])
+            # Котировки без цены (например, вне торгов) не сбрасывают сохраненную оценку
+            if quote and (quote.get('LAST') or quote.get('LCURRENTPRICE')):
+                portfolio.apply_quote(position, quote)
+            positions.append(position)
+        return positions, portfolio.get_portfolio_statistics(positions)
+
+    async def sharpe(self, name, days, risk_free_rate):
+        """
+        Коэффициент Шарпа и показатели активов портфеля. Одинаковые
+        одновременные запросы считаются один раз, результат хранится sharpe_ttl секунд.
+        """
+        key = (name, days, risk_free_rate)
+        cached = self._sharpe.get(key)
+        if cached and time.monotonic() - cached[0] <= self.sharpe_ttl:
+            return cached[1]
+
+        task = self._sharpe_flights.get(key)
+        if task is None:
+            task = self._sharpe_flights[key] = asyncio.ensure_future(self._compute_sharpe(key))
+            task.add_done_callback(lambda _: self._sharpe_flights.pop(key, None))
+        else:
+            get_metrics().increment('quote_server.coalesced')
+        return await asyncio.shield(task)
+
+    async def _compute_sharpe(self, key):
+        """Расчет коэффициента Шарпа в пуле потоков"""
+        from batch_runner import risk_report
+
+        name, days, risk_free_rate = key
+        positions, _ = await self.valuation(name)
+        if not positions:
+            raise PortfolioError("Портфель пуст")
+
+        summary, assets = await asyncio.get_running_loop().run_in_executor(
+            None, risk_report, positions, days, risk_free_rate, 0, None)
+        if 'error' in summary:
+            raise PortfolioError(summary['error'])
+
+        result = dict(summary, portfolio=name, risk_free_rate=risk_free_rate, assets=assets)
+        self._sharpe[key] = (time.monotonic(), result)
+        return result
+
+    async def route(self, path, query):
+        """
+        Обработка HTTP-запроса.
+
+        Returns:
+            tuple: (код ответа, данные ответа)
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts[:1] != ['api']:
+            return 404, {'error': "Неизвестный адрес"}
+        parts = parts[1:]
+
+        if parts == ['health']:
+            return 200, {'status': 'ok', 'portfolios': len(self.workspace.names()),
+                         'clients': len(self.hub.watchers)}
+
+        if parts == ['metrics']:
+            return 200, get_metrics().snapshot()
+
+        if parts == ['quotes']:
+            tickers = [ticker for ticker in query.get('tickers', [''])[0].split(',') if ticker.strip()]
+            if not tickers:
+                return 400, {'error': "Укажите тикеры: ?tickers=SBER,GAZP"}
+            board = query.get('board', ['TQBR'])[0].upper()
+            quotes = await self.hub.get_quotes([ticker.strip() for ticker in tickers], board)
+            views = {ticker: quote_view(ticker, quote) for ticker, quote in quotes.items()}
+            return 200, {
+                'board': board,
+                'quotes': {ticker: view for ticker, view in views.items() if view},
+                'missing': sorted({ticker.strip().upper() for ticker in tickers}
+                                  - {ticker for ticker, view in views.items() if view})
+            }
+
+        if parts == ['portfolios']:
+            names = self.workspace.names()
+            # Оценки запрашиваются одновременно - котировки уходят на биржу одним запросом
+            valuations = await asyncio.gather(*(self.valuation(name) for name in names))
+            per_portfolio = {name: statistics for name, (_, statistics) in zip(names, valuations)}
+            return 200, {
+                'portfolios': per_portfolio,
+                'total_cost': sum(stats['total_cost'] for stats in per_portfolio.values()),
+                'total_current_value': sum(stats['total_current_value'] for stats in per_portfolio.values()),
+                'total_profit': sum(stats['total_profit'] for stats in per_portfolio.values())
+            }
+
+        if len(parts) in (2, 3) and parts[0] == 'portfolios' and parts[1] not in self.workspace.names():
+            return 404, {'error': f"Портфель {parts[1]} не найден"}
+
+        if len(parts) == 2 and parts[0] == 'portfolios':
+            positions, statistics = await self.valuation(parts[1])
+            return 200, {'portfolio': parts[1], 'positions': positions, 'statistics': statistics}
+
+        if len(parts) == 3 and parts[0] == 'portfolios' and parts[2] == 'sharpe':
+            days = int(query.get('days', ['365'])[0])
+            risk_free_rate = float(query.get('risk_free', ['7.5'])[0])
+            if days < 30:
+                return 400, {'error': "Период должен быть не меньше 30 дней"}
+            return 200, await self.sharpe(parts[1], days, risk_free_rate)
+
+        return 404, {'error': "Неизвестный адрес"}
+
+    async def handle(self, reader, writer):
+        """Обработка соединения: HTTP-запрос или переход на WebSocket"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(request_line) != 3:
+                return
+            method, target, _ = request_line
+            url = urlparse(target)
+
+            if url.path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                await self.websocket(reader, writer, headers)
+                return
+
+            if method != 'GET':
+                status, payload = 405, {'error': "Поддерживается только GET"}
+            else:
+                with get_metrics().timer('quote_server.request'):
+                    try:
+                        status, payload = await self.route(url.path, parse_qs(url.query))
+                    except ValueError as e:
+                        status, payload = 400, {'error': str(e)}
+                    except Exception as e:
+                        print(f"Ошибка обработки запроса {target}: {e}")
+                        status, payload = 500, {'error': str(e)}
+
+            body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+            writer.write((f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                          f"Content-Type: application/json; charset=utf-8\r\n"
+                          f"Content-Length: {len(body)}\r\n"
+                          f"Access-Control-Allow-Origin: *\r\n"
+                          f"Connection: close\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def websocket(self, reader, writer, headers):
+        """Сеанс WebSocket: подписки клиента и рассылка котировок"""
+        key = headers.get('sec-websocket-key')
+        if not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+        writer.write((f"HTTP/1.1 101 Switching Protocols\r\n"
+                      f"Upgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('ascii'))
+        await writer.drain()
+
+        watcher = QuoteWatcher()
+        self.hub.watchers.add(watcher)
+        sender = asyncio.ensure_future(self._send_loop(watcher, writer))
+        try:
+            while True:
+                opcode, payload = await read_message(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(encode_frame(WS_CLOSE, payload[:2]))
+                    break
+                if opcode == WS_PING:
+                    writer.write(encode_frame(WS_PONG, payload))
+                elif opcode == WS_TEXT:
+                    await self.on_message(watcher, payload)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.hub.watchers.discard(watcher)
+            sender.cancel()
+
+    async def _send_loop(self, watcher, writer):
+        """Отправка сообщений из очереди клиента"""
+        try:
+            while True:
+                message = await watcher.queue.get()
+                data = json.dumps(message, ensure_ascii=False, default=json_default).encode('utf-8')
+                writer.write(encode_frame(WS_TEXT, data))
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def on_message(self, watcher, payload):
+        """Команда клиента WebSocket"""
+        try:
+            command = json.loads(payload.decode('utf-8'))
+            action = command.get('action')
+            tickers = {ticker.upper() for ticker in command.get('tickers', [])}
+        except (ValueError, AttributeError, TypeError):
+            watcher.push({'type': 'error', 'error': "Ожидается JSON вида {\"action\": ..., \"tickers\": [...]}"})
+            return
+
+        if action == 'subscribe':
+            board = str(command.get('board', watcher.board)).upper()
+            if board != watcher.board:
+                watcher.board = board
+                watcher.tickers = set()
+            watcher.tickers |= tickers
+            # Новый подписчик сразу получает текущие котировки
+            quotes = await self.hub.get_quotes(tickers, board)
+            views = {ticker: quote_view(ticker, quote) for ticker, quote in quotes.items()}
+            watcher.push({'type': 'quotes', 'board': board,
+                          'quotes': {ticker: view for ticker, view in views.items() if view}})
+            self.hub.wake()
+        elif action == 'unsubscribe':
+            watcher.tickers -= tickers
+        else:
+            watcher.push({'type': 'error', 'error': f"Неизвестная команда: {action}"})
+
+    async def start(self, host='127.0.0.1', port=8780):
+        """
+        Запуск сервера и цикла опроса.
+
+        Returns:
+            asyncio.Server: запущенный сервер
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        self._poller = asyncio.ensure_future(self.hub.run())
+        return server
+
+    async def serve(self, host='127.0.0.1', port=8780):
+        """Работа сервера до прерывания"""
+        server = await self.start(host, port)
+        print(f"Сервер котировок: http://{host}:{port}/api, WebSocket ws://{host}:{port}/ws")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._poller.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервер котировок и оценок портфелей")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес сервера")
+    parser.add_argument('--port', type=int, default=8780, help="порт сервера")
+    parser.add_argument('--workspace', default='portfolios', help="каталог рабочей области со счетами")
+    parser.add_argument('--interval', type=float, default=5, help="период опроса биржи, с")
+    parser.add_argument('--timeout', type=float, default=10, help="срок ожидания котировок, с")
+    parser.add_argument('--sharpe-ttl', type=float, default=300, help="срок хранения расчета Шарпа, с")
+    parser.add_argument('--iss-url', help="адрес ISS (по умолчанию - MOEX_ISS_URL или iss.moex.com)")
+    args = parser.parse_args()
+
+    if args.iss_url:
+        set_base_url(args.iss_url)
+
+    async def run():
+        hub = QuoteHub(interval=args.interval, timeout=args.timeout)
+        server = QuoteServer(Workspace(args.workspace, price_timeout=args.timeout), hub, args.sharpe_ttl)
+        await server.serve(args.host, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Сервер остановлен")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import requests
 import json
+from background_jobs import BackgroundJobRunner
+from core.analytics import (price_history, history_entry, portfolio_daily_returns,
+                            sharpe_metrics, asset_metrics)
 
 class SharpeCalculator:
     """
@@ -27,6 +28,7 @@ class SharpeCalculator:
         self.historical_data = {}
         self.sharpe_ratio = 0
         self.risk_free_rate = 7.5  # Безрисковая ставка по умолчанию (% годовых)
+        self.job_runner = BackgroundJobRunner(self.window)
         
         # Создание интерфейса
         self.create_widgets()
@@ -72,6 +74,19 @@ class SharpeCalculator:
         period_combo.pack(side=tk.LEFT, padx=5)
         ttk.Label(period_frame, text="дней").pack(side=tk.LEFT)
         
+        # Параметры моделирования Монте-Карло
+        mc_frame = ttk.Frame(control_frame)
+        mc_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(mc_frame, text="Монте-Карло:").pack(side=tk.LEFT)
+        self.mc_method_var = tk.StringVar(value="bootstrap")
+        ttk.Combobox(mc_frame, textvariable=self.mc_method_var, state="readonly",
+                     values=["bootstrap", "normal"], width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(mc_frame, text="траекторий:").pack(side=tk.LEFT)
+        self.mc_paths_var = tk.StringVar(value="100000")
+        ttk.Combobox(mc_frame, textvariable=self.mc_paths_var,
+                     values=["10000", "50000", "100000", "200000"], width=10).pack(side=tk.LEFT, padx=5)
+        
         # Кнопки управления
         button_frame = ttk.Frame(control_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -82,6 +97,8 @@ class SharpeCalculator:
                   command=self.calculate_sharpe).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Обновить исторические данные", 
                   command=self.update_historical_data).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Оценка риска (Монте-Карло)", 
+                  command=self.run_monte_carlo).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Экспорт отчета", 
                   command=self.export_report).pack(side=tk.RIGHT, padx=5)
         
@@ -184,38 +201,7 @@ class SharpeCalculator:
     
     def get_historical_prices(self, ticker, days=365):
         """Получение исторических цен для тикера"""
-        try:
-            # Используем MOEX API для получения исторических данных
-            url = f"https://iss.moex.com/iss/history/engines/stock/markets/shares/boards/TQBR/securities/{ticker}.json"
-            from_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-            url += f"?from={from_date}"
-            
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                history_data = data['history']['data']
-                
-                prices = []
-                dates = []
-                
-                for point in reversed(history_data):  # В хронологическом порядке
-                    try:
-                        date_str = point[1]  # TRADEDATE
-                        close_price = point[11]  # CLOSE
-                        
-                        if date_str and close_price:
-                            trade_date = datetime.strptime(date_str, '%Y-%m-%d')
-                            prices.append(float(close_price))
-                            dates.append(trade_date)
-                    except:
-                        continue
-                
-                return dates, prices
-                
-        except Exception as e:
-            print(f"Ошибка получения исторических данных для {ticker}: {e}")
-        
-        return [], []
+        return price_history(ticker, days)
     
     def update_historical_data(self):
         """Обновление исторических данных для всех активов в портфеле"""
@@ -223,64 +209,62 @@ class SharpeCalculator:
             messagebox.showwarning("Внимание", "Портфель пуст")
             return
         
+        tickers = list(dict.fromkeys(stock['ticker'] for stock in self.portfolio_data))
+        days = int(self.period_var.get())
+        
         progress_window = tk.Toplevel(self.window)
         progress_window.title("Обновление данных")
-        progress_window.geometry("300x120")
+        progress_window.geometry("300x150")
         progress_window.transient(self.window)
         progress_window.grab_set()
         
         ttk.Label(progress_window, text="Обновление исторических данных...").pack(pady=10)
-        progress = ttk.Progressbar(progress_window, mode='determinate', maximum=len(self.portfolio_data))
+        progress = ttk.Progressbar(progress_window, mode='determinate', maximum=len(tickers))
         progress.pack(pady=10, padx=20, fill=tk.X)
         
         status_label = ttk.Label(progress_window, text="")
         status_label.pack()
         
-        def update_data():
-            self.historical_data = {}
-            updated_count = 0
-            
-            for i, stock in enumerate(self.portfolio_data):
-                ticker = stock['ticker']
-                status_label.config(text=f"Обработка {ticker}...")
-                progress['value'] = i + 1
-                progress_window.update()
-                
-                days = int(self.period_var.get())
-                dates, prices = self.get_historical_prices(ticker, days)
-                
+        def update_data(job):
+            # Выполняется в рабочем потоке - с виджетами работаем только через job
+            historical_data = {}
+            for i, (ticker, result, error) in enumerate(
+                    job.map(lambda ticker: self.get_historical_prices(ticker, days), tickers), start=1):
+                if error is not None:
+                    print(f"Ошибка загрузки истории {ticker}: {error}")
+                    job.progress(i, len(tickers), f"Ошибка загрузки {ticker}")
+                    continue
+                job.progress(i, len(tickers), f"Загружен {ticker}")
+                dates, prices = result
                 if dates and prices:
-                    self.historical_data[ticker] = {
-                        'dates': dates,
-                        'prices': prices,
-                        'returns': self.calculate_returns(prices)
-                    }
-                    updated_count += 1
-            
-            self.window.after(0, lambda: finish_update(updated_count))
+                    historical_data[ticker] = history_entry(dates, prices)
+            return historical_data
         
-        def finish_update(updated_count):
+        def show_progress(done, total, message):
+            progress['value'] = done
+            status_label.config(text=message)
+        
+        def finish_update(historical_data):
             progress_window.destroy()
+            self.historical_data = historical_data
             messagebox.showinfo("Обновление", 
-                              f"Данные обновлены для {updated_count} из {len(self.portfolio_data)} активов")
+                              f"Данные обновлены для {len(historical_data)} из {len(tickers)} активов")
         
-        import threading
-        thread = threading.Thread(target=update_data)
-        thread.daemon = True
-        thread.start()
-    
-    def calculate_returns(self, prices):
-        """Расчет дневной доходности на основе цен"""
-        if len(prices) < 2:
-            return []
+        def fail_update(error):
+            progress_window.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось обновить исторические данные: {error}")
+        
+        def cancel_update():
+            progress_window.destroy()
+            messagebox.showinfo("Обновление", "Обновление данных отменено")
         
-        returns = []
-        for i in range(1, len(prices)):
-            daily_return = (prices[i] - prices[i-1]) / prices[i-1] * 100
-            returns.append(daily_return)
+        job = self.job_runner.submit(update_data, on_progress=show_progress, on_done=finish_update,
+                                     on_error=fail_update, on_cancel=cancel_update)
         
-        return returns
+        ttk.Button(progress_window, text="Отмена", command=job.cancel).pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", job.cancel)
     
+
     def calculate_sharpe(self):
         """Расчет коэффициента Шарпа для портфеля"""
         if not self.portfolio_data or not self.historical_data:
@@ -299,19 +283,9 @@ class SharpeCalculator:
                 messagebox.showerror("Ошибка", "Не удалось рассчитать доходность портфеля")
                 return
             
-            # Расчет коэффициента Шарпа
-            avg_return = np.mean(portfolio_returns)
-            std_return = np.std(portfolio_returns)
-            
-            # Годовая доходность и волатильность
-            annual_return = avg_return * 252  # 252 торговых дня в году
-            annual_volatility = std_return * np.sqrt(252)
-            
-            # Коэффициент Шарпа (годовой)
-            if annual_volatility != 0:
-                self.sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility
-            else:
-                self.sharpe_ratio = 0
+            # Годовые доходность, волатильность и коэффициент Шарпа
+            annual_return, annual_volatility, self.sharpe_ratio = sharpe_metrics(
+                portfolio_returns, risk_free_rate)
             
             # Обновление интерфейса
             self.update_results_display(annual_return, annual_volatility)
@@ -325,51 +299,113 @@ class SharpeCalculator:
     
     def calculate_portfolio_returns(self):
         """Расчет доходности портфеля"""
-        # Находим общие даты для всех активов
-        common_dates = None
-        for ticker, data in self.historical_data.items():
-            if common_dates is None:
-                common_dates = set(data['dates'])
-            else:
-                common_dates = common_dates.intersection(set(data['dates']))
-        
-        if not common_dates:
-            return []
-        
-        common_dates = sorted(common_dates)
-        
-        # Расчет весов портфеля
-        total_value = sum(stock.get('current_value', 0) for stock in self.portfolio_data)
-        weights = {}
-        for stock in self.portfolio_data:
-            ticker = stock['ticker']
-            if total_value > 0:
-                weights[ticker] = stock.get('current_value', 0) / total_value
-            else:
-                weights[ticker] = 0
-        
-        # Расчет дневной доходности портфеля
-        portfolio_returns = []
-        
-        for i in range(1, len(common_dates)):
-            daily_return = 0
-            for ticker, data in self.historical_data.items():
-                # Находим индекс даты в данных актива
-                try:
-                    date_idx = data['dates'].index(common_dates[i])
-                    prev_date_idx = data['dates'].index(common_dates[i-1])
-                    
-                    if (date_idx < len(data['returns']) and 
-                        prev_date_idx < len(data['returns'])):
-                        asset_return = data['returns'][date_idx]
-                        daily_return += weights.get(ticker, 0) * asset_return
-                except ValueError:
-                    continue
-            
-            portfolio_returns.append(daily_return)
-        
-        return portfolio_returns
-    
+        return portfolio_daily_returns(self.historical_data, self.portfolio_data)
+
+    def run_monte_carlo(self):
+        """Оценка будущего риска портфеля методом Монте-Карло"""
+        if not self.portfolio_data or not self.historical_data:
+            messagebox.showwarning("Внимание",
+                                 "Нет данных для моделирования. Загрузите портфель и обновите исторические данные.")
+            return
+
+        try:
+            n_paths = int(self.mc_paths_var.get())
+            if n_paths <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Количество траекторий должно быть положительным числом")
+            return
+
+        from core.monte_carlo import MonteCarloSimulator, build_returns_matrix, portfolio_weights
+
+        tickers, dates, returns_matrix = build_returns_matrix(self.historical_data)
+        if len(returns_matrix) < 2:
+            messagebox.showerror("Ошибка", "Недостаточно общих дат в исторических данных активов")
+            return
+
+        weights = portfolio_weights(self.portfolio_data, tickers)
+        initial_value = sum(stock.get('current_value', 0) for stock in self.portfolio_data)
+        method = self.mc_method_var.get()
+
+        progress_window = tk.Toplevel(self.window)
+        progress_window.title("Моделирование...")
+        progress_window.geometry("300x100")
+        progress_window.transient(self.window)
+
+        ttk.Label(progress_window, text=f"Моделирование {n_paths:,} траекторий...".replace(',', ' ')).pack(pady=10)
+        progress = ttk.Progressbar(progress_window, mode='indeterminate')
+        progress.pack(pady=10, padx=20, fill=tk.X)
+        progress.start()
+
+        def simulate(job):
+            simulator = MonteCarloSimulator(returns_matrix, weights, method=method, n_paths=n_paths)
+            return simulator.run(initial_value)
+
+        def close_progress():
+            progress.stop()
+            progress_window.destroy()
+
+        def finish(results):
+            close_progress()
+            self.show_monte_carlo_results(results)
+
+        def fail(error):
+            close_progress()
+            messagebox.showerror("Ошибка", f"Ошибка моделирования: {error}")
+
+        # Результат передается в поток интерфейса через очередь, без вызова after() из рабочего потока
+        self.job_runner.submit(simulate, on_done=finish, on_error=fail, on_cancel=close_progress)
+
+    def show_monte_carlo_results(self, results):
+        """Отображение результатов моделирования Монте-Карло"""
+        mc_window = tk.Toplevel(self.window)
+        mc_window.title("Оценка риска портфеля (Монте-Карло)")
+        mc_window.geometry("900x650")
+
+        main_frame = ttk.Frame(mc_window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        method_text = "бутстреп истории" if results['method'] == 'bootstrap' else "нормальное распределение"
+        ttk.Label(main_frame,
+                 text=f"{results['n_paths']:,} траекторий на {results['horizon']} торговых дней ({method_text})".replace(',', ' '),
+                 font=("Arial", 12, "bold")).pack(pady=(0, 10))
+
+        stats_frame = ttk.LabelFrame(main_frame, text="Показатели риска на горизонте", padding="10")
+        stats_frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(stats_frame,
+                 text=f"Ожидаемая доходность: {results['expected_return'] * 100:+.2f}%").pack(anchor=tk.W)
+        for level in sorted(results['var']):
+            ttk.Label(stats_frame,
+                     text=(f"VaR {level:.0%}: {results['var'][level] * 100:.2f}% "
+                           f"({results['var_value'][level]:,.2f} руб) | "
+                           f"CVaR {level:.0%}: {results['cvar'][level] * 100:.2f}% "
+                           f"({results['cvar_value'][level]:,.2f} руб)")).pack(anchor=tk.W)
+        ttk.Label(stats_frame, text=f"Время расчета: {results['elapsed']:.2f} сек",
+                 foreground="gray").pack(anchor=tk.W)
+
+        chart_frame = ttk.LabelFrame(main_frame, text="Перцентильные полосы стоимости портфеля", padding="10")
+        chart_frame.pack(fill=tk.BOTH, expand=True)
+
+        fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+        bands = results['percentile_bands']
+        days = np.arange(1, results['horizon'] + 1)
+        base = results['initial_value'] if results['initial_value'] > 0 else 100
+
+        ax.fill_between(days, base * (1 + bands[5]), base * (1 + bands[95]), alpha=0.2, color='blue', label='5-95%')
+        ax.fill_between(days, base * (1 + bands[25]), base * (1 + bands[75]), alpha=0.3, color='blue', label='25-75%')
+        ax.plot(days, base * (1 + bands[50]), color='blue', linewidth=2, label='Медиана')
+        ax.set_xlabel('Торговые дни', fontsize=10)
+        ax.set_ylabel('Стоимость портфеля (руб)', fontsize=10)
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+
+        canvas = FigureCanvasTkAgg(fig, chart_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        ttk.Button(main_frame, text="Закрыть", command=mc_window.destroy).pack(pady=10)
+
     def update_results_display(self, annual_return, annual_volatility):
         """Обновление отображения результатов"""
         sharpe_color = "green" if self.sharpe_ratio > 1 else "orange" if self.sharpe_ratio > 0 else "red"
@@ -413,37 +449,17 @@ class SharpeCalculator:
         for item in self.details_tree.get_children():
             self.details_tree.delete(item)
         
-        total_value = sum(stock.get('current_value', 0) for stock in self.portfolio_data)
-        
-        for stock in self.portfolio_data:
-            ticker = stock['ticker']
-            weight = (stock.get('current_value', 0) / total_value * 100) if total_value > 0 else 0
-            
-            if ticker in self.historical_data:
-                asset_returns = self.historical_data[ticker]['returns']
-                if asset_returns:
-                    asset_avg_return = np.mean(asset_returns) * 252  # Годовая доходность
-                    asset_volatility = np.std(asset_returns) * np.sqrt(252)
-                    
-                    if asset_volatility != 0:
-                        asset_sharpe = (asset_avg_return - float(self.risk_free_var.get())) / asset_volatility
-                    else:
-                        asset_sharpe = 0
-                    
-                    # Расчет корреляции с портфелем
-                    if len(asset_returns) == len(portfolio_returns):
-                        correlation = np.corrcoef(asset_returns, portfolio_returns)[0,1]
-                    else:
-                        correlation = 0
-                    
-                    self.details_tree.insert("", tk.END, values=(
-                        ticker,
-                        f"{weight:.1f}%",
-                        f"{asset_avg_return:.2f}%",
-                        f"{asset_volatility:.2f}%",
-                        f"{asset_sharpe:.2f}",
-                        f"{correlation:.2f}"
-                    ))
+        rows = asset_metrics(self.historical_data, self.portfolio_data, portfolio_returns,
+                             float(self.risk_free_var.get()))
+        for row in rows:
+            self.details_tree.insert("", tk.END, values=(
+                row['ticker'],
+                f"{row['weight']:.1f}%",
+                f"{row['return']:.2f}%",
+                f"{row['volatility']:.2f}%",
+                f"{row['sharpe']:.2f}",
+                f"{row['correlation']:.2f}"
+            ))
     
     def export_report(self):
         """Экспорт отчета в CSV"""
@@ -490,4 +506,5 @@ class SharpeCalculator:
     
     def close(self):
         """Закрытие окна"""
+        self.job_runner.cancel_all()
         self.window.destroy()
\ No newline at end of file
@@ -3,16 +3,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 
-import threading
-import time
 import json
-import pandas as pd
+import time
 from datetime import datetime, timedelta
-from data_handler import DataHandler
+from core.data_handler import DataHandler
+from quote_bus import get_quote_bus
+from background_jobs import BackgroundJobRunner
+from core.moex_client import fetch_marketdata
 from chart_manager import ChartManager
-from calculator_window import CalculatorWindow
-from commission_manager import CommissionManager
-from etf_portfolio.init import ETFPortfolioWindow
+from export_manager import export_rows
+from core.instrumentation import get_metrics, get_profile_capture, timed
+from ui_watchdog import start_watchdog
 
 class StockMonitor:
     """
@@ -32,6 +33,12 @@ class StockMonitor:
         self.calculator_windows = []  # Список открытых окон калькулятора
         self.update_interval = 5  # Интервал обновления в секундах
         self.auto_update = True   # Флаг автообновления
+        self.status_job = None  # отложенное обновление статуса автообновления
+        self.quote_bus = get_quote_bus()  # Общая шина котировок для всех окон
+        self.quote_subscription = None
+        self.job_runner = BackgroundJobRunner(self.root)
+        get_profile_capture()  # запись профиля с запуска, если задана MOEX_PROFILE
+        start_watchdog(self.root)  # журнал зависаний интерфейса
         
         # Создание интерфейса
         
@@ -40,6 +47,9 @@ class StockMonitor:
         self.load_daily_data()    # Загрузка исторических данных
         self.update_data()        # Запуск обновления данных
         
+        # Графики (matplotlib) создаются после первой отрисовки окна
+        self.root.after(50, self.create_charts)
+        
     def create_menu(self):
         """Создание верхнего меню для навигации между окнами"""
         menubar = tk.Menu(self.root)
@@ -50,6 +60,7 @@ class StockMonitor:
         menubar.add_cascade(label="Файл", menu=file_menu)
         file_menu.add_command(label="Сменить тикер", command=self.change_ticker)
         file_menu.add_command(label="Портфель акций", command=self.open_portfolio)
+        file_menu.add_command(label="Счета...", command=self.open_workspace)
         file_menu.add_command(label="Портфель ETF", command=self.open_etf_portfolio)
         file_menu.add_command(label="Калькулятор IBO", command=self.open_calculator)
         file_menu.add_command(label="Калькулятор Шарпа", command=self.open_sharpe_calculator)
@@ -83,17 +94,19 @@ class StockMonitor:
         # Меню "Помощь"
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Помощь", menu=help_menu)
+        help_menu.add_command(label="Диагностика", command=self.open_diagnostics)
         help_menu.add_command(label="О программе", command=self.show_about)
    
     
+    def open_diagnostics(self):
+        """Открытие окна метрик производительности"""
+        from diagnostics_window import DiagnosticsWindow
+        DiagnosticsWindow(self.root)
+    
     def open_commission_settings(self):
         """Открытие настроек комиссий"""
-        if hasattr(self, 'portfolio_window') and self.portfolio_window:
-            self.portfolio_window.commission_manager.show_commission_settings()
-        else:
-            # Создаем временный менеджер комиссий
-            temp_manager = CommissionManager(self.root)
-            temp_manager.show_commission_settings()
+        from commission_window import show_commission_settings
+        show_commission_settings(self.root)
         
     def change_ticker(self):
         """Смена тикера акции"""
@@ -118,6 +131,7 @@ class StockMonitor:
     
     def open_calculator(self):
         """Создание нового окна калькулятора"""
+        from calculator_window import CalculatorWindow
         calculator = CalculatorWindow(self.root, self.data_handler)
         self.calculator_windows.append(calculator)
         self.update_windows_menu()
@@ -292,9 +306,7 @@ class StockMonitor:
                 new_interval = int(interval_var.get())
                 if 1 <= new_interval <= 300:  # Ограничение от 1 до 300 секунд
                     self.update_interval = new_interval
-                    self.auto_update_status.config(
-                        text=f"Автообновление: ВКЛ (каждые {self.update_interval} сек)"
-                    )
+                    self.update_auto_update_status()
                     # Перезапускаем автообновление если оно активно
                     if self.auto_update:
                         self.toggle_auto_update()
@@ -374,12 +386,12 @@ class StockMonitor:
         # Вкладка внутридневного графика
         intraday_frame = ttk.Frame(self.notebook)
         self.notebook.add(intraday_frame, text="Внутридневной график")
-        self.chart_manager.create_intraday_chart(intraday_frame)
+        self.intraday_frame = intraday_frame
         
         # Вкладка графика за день
         daily_frame = ttk.Frame(self.notebook)
         self.notebook.add(daily_frame, text="График за день")
-        self.chart_manager.create_daily_chart(daily_frame)
+        self.daily_frame = daily_frame
         
         # Кнопки управления
         button_frame = ttk.Frame(main_frame)
@@ -424,16 +436,28 @@ class StockMonitor:
         interval_combo.bind('<<ComboboxSelected>>', self.change_interval)
         
         # Статус автообновления
-        self.auto_update_status = ttk.Label(main_frame, text=f"Автообновление: ВКЛ (каждые {self.update_interval} сек)")
+        self.auto_update_status = ttk.Label(main_frame, text="")
         self.auto_update_status.grid(row=7, column=0, columnspan=3)
+        self.update_auto_update_status()
         
         # Настройка весов для растягивания
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(5, weight=1)
+    
+    def create_charts(self):
+        """Создание графиков и отрисовка накопленных к этому моменту данных"""
+        if self.chart_manager.charts_ready:
+            return
+        self.chart_manager.create_intraday_chart(self.intraday_frame)
+        self.chart_manager.create_daily_chart(self.daily_frame)
+        self.chart_manager.update_intraday_chart()
+        self.chart_manager.update_daily_chart()
+    
     def open_etf_portfolio(self):
         """Открытие окна портфеля ETF"""
+        from etf_portfolio.init import ETFPortfolioWindow
         try:
             # Проверяем, существует ли уже окно портфеля ETF
             if hasattr(self, 'etf_portfolio_window') and self.etf_portfolio_window.window.winfo_exists():
@@ -460,40 +484,82 @@ class StockMonitor:
             self.load_daily_data()
             self.manual_update()
     
+    @timed('json.load daily_data')
     def load_daily_data(self):
-        """Загрузка сохраненных данных и создание предыдущих точек графика"""
+        """
+        Отрисовка графика из сохраненных данных без обращения к бирже.
+        Если данных за сегодня нет, показываются данные прошлой сессии (если есть),
+        а начальные точки графика строятся после фоновой загрузки котировки.
+        """
+        saved_prices = []
         try:
             filename = f"{self.current_ticker.lower()}_daily_data.json"
             with open(filename, 'r') as f:
                 saved_data = json.load(f)
                 saved_date = datetime.fromisoformat(saved_data['date'])
                 today = self.data_handler.get_moscow_time().date()
+                saved_prices = [(datetime.fromisoformat(d), p) for d, p in saved_data['prices']]
                 
                 if saved_date.date() == today:
                     # Загружаем сохраненные данные за сегодня
-                    self.chart_manager.daily_data = [(datetime.fromisoformat(d), p) for d, p in saved_data['prices']]
-                    self.chart_manager.intraday_dates = [d for d, p in self.chart_manager.daily_data[-50:]]
-                    self.chart_manager.intraday_prices = [p for d, p in self.chart_manager.daily_data[-50:]]
+                    self.show_daily_data(saved_prices)
                     print(f"Загружены сохраненные данные за сегодня для {self.current_ticker}")
-                    
-                    # Обновляем графики с загруженными данными
-                    self.chart_manager.update_intraday_chart()
-                    self.chart_manager.update_daily_chart()
                     return
         except FileNotFoundError:
             print(f"Файл с сохраненными данными для {self.current_ticker} не найден, создаем новые данные")
         except Exception as e:
             print(f"Ошибка загрузки данных для {self.current_ticker}: {e}")
         
-        # Если сохраненных данных нет или они за другой день, создаем начальные данные
-        self.create_initial_chart_data()
+        # Пока идет загрузка, показываем данные прошлой сессии
+        if saved_prices:
+            self.show_daily_data(saved_prices)
+        self.load_initial_chart_data()
     
-    def create_initial_chart_data(self):
-        """Создание начальных данных для графика с предыдущими ценами"""
-        current_time = self.data_handler.get_moscow_time()
+    def show_daily_data(self, prices):
+        """Отображение точек дневного графика"""
+        self.chart_manager.daily_data = list(prices)
+        self.chart_manager.intraday_dates = [d for d, p in self.chart_manager.daily_data[-50:]]
+        self.chart_manager.intraday_prices = [p for d, p in self.chart_manager.daily_data[-50:]]
+        self.chart_manager.update_intraday_chart()
+        self.chart_manager.update_daily_chart()
+    
+    def load_initial_chart_data(self):
+        """Фоновая загрузка котировки для начальных данных графика"""
+        ticker = self.current_ticker
+        # Точки, пришедшие из шины котировок во время загрузки, сохраняются
+        cached_points = len(self.chart_manager.daily_data)
+        self.time_label.config(text=f"Загрузка данных {ticker}...")
+        
+        def apply_quote(quote):
+            if ticker != self.current_ticker:
+                return  # тикер сменили во время загрузки
+            if quote:
+                data = self.data_handler.parse_quote(quote)
+            else:
+                data = self.data_handler.get_fallback_data()
+            live_points = self.chart_manager.daily_data[cached_points:]
+            
+            self.create_initial_chart_data(data)
+            if live_points:
+                self.show_daily_data(self.chart_manager.daily_data + live_points)
+            if not data['success']:
+                self.time_label.config(text="Нет данных с биржи - график построен по резервной цене")
+        
+        def fail(error):
+            print(f"Ошибка получения данных для {ticker}: {error}")
+            apply_quote(None)
+        
+        self.job_runner.submit(lambda job: fetch_marketdata([ticker]).get(ticker),
+                               on_done=apply_quote, on_error=fail)
+    
+    def create_initial_chart_data(self, data):
+        """
+        Создание начальных данных для графика с предыдущими ценами.
         
-        # Получаем текущую цену для создания исторических данных
-        data = self.data_handler.get_stock_data()
+        Args:
+            data: текущие данные по акции в формате DataHandler
+        """
+        current_time = self.data_handler.get_moscow_time()
         current_price = data['price']
         
         # Создаем данные за последние 2 часа с интервалом в 5 минут
@@ -546,6 +612,7 @@ class StockMonitor:
         
         print(f"Созданы начальные данные графика с предыдущими ценами для {self.current_ticker}")
     
+    @timed('json.save daily_data')
     def save_daily_data(self):
         """Сохранение дневных данных в JSON файл"""
         try:
@@ -565,21 +632,26 @@ class StockMonitor:
         return self.data_handler.get_stock_data()
     
     def update_data(self):
-        """Запуск потока для автоматического обновления данных"""
-        def update_thread():
-            while self.auto_update:
-                try:
-                    data = self.get_stock_data()
-                    if data['success']:
-                        self.root.after(0, self.update_interface, data)
-                    time.sleep(self.update_interval)
-                except Exception as e:
-                    print(f"Ошибка в потоке обновления: {e}")
-                    time.sleep(self.update_interval)
-        
-        self.update_thread = threading.Thread(target=update_thread, daemon=True)
-        self.update_thread.start()
+        """Подписка на котировки текущего тикера через общую шину котировок"""
+        self.quote_bus.set_interval(self.update_interval)
+        if self.quote_subscription is None or not self.quote_subscription.active:
+            self.quote_subscription = self.quote_bus.subscribe(
+                self.root, lambda: [self.current_ticker], self.on_quotes)
     
+    def on_quotes(self, quotes):
+        """Обработка котировок из шины (вызывается в потоке интерфейса)"""
+        quote = quotes.get(self.current_ticker)
+        if quote and self.auto_update:
+            data = self.data_handler.parse_quote(quote)
+            if data['success']:
+                self.update_interface(data)
+                # Время от получения котировки до отрисовки: отложенная перерисовка
+                # графиков (draw_idle) выполняется раньше этого idle-обработчика
+                received_at = self.quote_subscription.received_at
+                self.root.after_idle(lambda: get_metrics().observe(
+                    'ui.tick_to_paint', (time.perf_counter() - received_at) * 1000))
+    
+    @timed('ui.update_interface')
     def update_interface(self, data):
         """Обновление интерфейса с новыми данными"""
         current_time = data['time']
@@ -671,11 +743,35 @@ class StockMonitor:
         
         if self.auto_update:
             self.auto_update_btn.config(text="Автообновление ВКЛ")
-            self.auto_update_status.config(text=f"Автообновление: ВКЛ (каждые {self.update_interval} сек)")
             self.update_data()
+            self.update_auto_update_status()
         else:
+            if self.quote_subscription is not None:
+                self.quote_subscription.cancel()
+                self.quote_subscription = None
             self.auto_update_btn.config(text="Автообновление ВЫКЛ")
+            self.update_auto_update_status()
+    
+    def update_auto_update_status(self):
+        """
+        Статус автообновления: базовый интервал и фактическая пауза до опроса
+        (шина растягивает ее вне торгов и после ошибок, сокращает при волатильности).
+        Пока автообновление включено, статус обновляется раз в секунду.
+        """
+        if self.status_job is not None:
+            self.root.after_cancel(self.status_job)
+            self.status_job = None
+        
+        if not self.auto_update:
             self.auto_update_status.config(text="Автообновление: ВЫКЛ")
+            return
+        
+        text = f"Автообновление: ВКЛ (базовый интервал {self.update_interval} сек"
+        seconds = self.quote_bus.seconds_until_poll()
+        if seconds is not None:
+            text += f", следующий опрос через {seconds:.0f} сек"
+        self.auto_update_status.config(text=text + ")")
+        self.status_job = self.root.after(1000, self.update_auto_update_status)
     
     def change_interval(self, event=None):
         """Изменение интервала обновления"""
@@ -683,7 +779,7 @@ class StockMonitor:
             new_interval = int(self.interval_var.get())
             if new_interval != self.update_interval:
                 self.update_interval = new_interval
-                self.auto_update_status.config(text=f"Автообновление: ВКЛ (каждые {self.update_interval} сек)")
+                self.update_auto_update_status()
                 
                 if self.auto_update:
                     self.toggle_auto_update()
@@ -692,27 +788,27 @@ class StockMonitor:
             pass
     
     def export_data(self):
-        """Экспорт данных в CSV"""
-        try:
-            if self.chart_manager.daily_data:
-                df = pd.DataFrame({
-                    'DateTime': [d for d, p in self.chart_manager.daily_data],
-                    'Price': [p for d, p in self.chart_manager.daily_data]
-                })
-                
-                filename = f"{self.current_ticker.lower()}_daily_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                df.to_csv(filename, index=False, encoding='utf-8')
-                messagebox.showinfo("Экспорт", f"Данные экспортированы в файл: {filename}")
-            else:
-                messagebox.showwarning("Экспорт", "Нет данных для экспорта")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {e}")
+        """Экспорт дневных данных в CSV/Parquet в фоновом потоке"""
+        if not self.chart_manager.daily_data:
+            messagebox.showwarning("Экспорт", "Нет данных для экспорта")
+            return
+        
+        # Снимок списка точек; строки формируются генератором при записи.
+        # Разделитель - запятая, как в прежнем формате файла дневных данных
+        daily_data = list(self.chart_manager.daily_data)
+        export_rows(self.root, f"{self.current_ticker.lower()}_daily_data", ['DateTime', 'Price'],
+                    lambda: (list(point) for point in daily_data), delimiter=',')
     
     def open_portfolio(self):
         """Открытие окна портфеля акций"""
         from stock_portfolio.main_window import PortfolioWindow
         PortfolioWindow(self.root, self.data_handler)
 
+    def open_workspace(self):
+        """Открытие окна счетов (именованных портфелей)"""
+        from stock_portfolio.workspace_window import WorkspaceWindow
+        WorkspaceWindow(self.root, self.data_handler)
+
     def open_sharpe_calculator(self):
         """Создание калькулятора коэффициента Шарпа"""
         from sharpe_calculator import SharpeCalculator
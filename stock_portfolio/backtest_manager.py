@@ -0,0 +1,251 @@
+# Менеджер бэктеста - восстановление истории стоимости портфеля по журналу операций
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from tkinter import messagebox, ttk
+import tkinter as tk
+from background_jobs import BackgroundJobRunner
+from core.history_cache import get_history_cache
+
+
+class BacktestManager:
+    """
+    Воспроизведение журнала операций на дневной истории цен закрытия:
+    позиции, стоимость, денежные потоки, реализованная/нереализованная
+    прибыль и доходность, взвешенная по времени (TWR).
+    """
+
+    def __init__(self, portfolio_manager):
+        """
+        Инициализация менеджера бэктеста.
+
+        Args:
+            portfolio_manager: ссылка на менеджер портфеля
+        """
+        self.portfolio_manager = portfolio_manager
+
+    def load_price_history(self, tickers, from_date, max_workers=8):
+        """
+        Загрузка дневных цен закрытия для списка тикеров.
+
+        Args:
+            tickers: список тикеров
+            from_date: начальная дата истории
+            max_workers: количество параллельных загрузок
+
+        Returns:
+            dict: {тикер: pd.Series цен закрытия с индексом по датам}
+        """
+        cache = get_history_cache()
+        
+        def load(ticker):
+            try:
+                return ticker, cache.get_history(ticker, from_date)
+            except Exception as e:
+                print(f"Ошибка получения исторических данных для {ticker}: {e}")
+                return ticker, pd.Series(dtype=float)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(executor.map(load, tickers))
+
+    def run_backtest(self, transactions, price_history, end_date=None):
+        """
+        Воспроизведение операций на истории цен.
+
+        Args:
+            transactions: список операций в формате TransactionManager
+            price_history: {тикер: pd.Series цен закрытия}
+            end_date: последняя дата бэктеста (по умолчанию - последняя дата цен)
+
+        Returns:
+            dict: 'holdings' и 'values' (дни x тикеры), 'summary' (дневные итоги портфеля)
+        """
+        if not transactions:
+            raise ValueError("Журнал операций пуст")
+
+        trades = pd.DataFrame(transactions)
+        # Закрытия позиций без продажи (удаление из портфеля) - не сделки
+        trades = trades[trades['operation'].isin(('buy', 'sell'))]
+        if trades.empty:
+            raise ValueError("Журнал операций пуст")
+        trades['day'] = pd.to_datetime(trades['date'], format='ISO8601').dt.normalize()
+        trades['sign'] = np.where(trades['operation'] == 'buy', 1.0, -1.0)
+        # Для операций без записанной комиссии - оценка по текущему расписанию одним векторным расчетом
+        estimated_commission = self.portfolio_manager.commission_manager.schedule.batch_costs(
+            trades['quantity'].to_numpy(dtype=float) * trades['price'].to_numpy(dtype=float))
+        if 'commission' not in trades:
+            trades['commission'] = estimated_commission
+        trades['commission'] = trades['commission'].fillna(pd.Series(estimated_commission, index=trades.index))
+        trades = trades.sort_values('day', kind='stable')
+
+        # Календарь - все торговые дни из истории цен, начиная с первой операции
+        calendar = pd.DatetimeIndex(sorted(set().union(*(series.index for series in price_history.values()))))
+        calendar = calendar.union(trades['day'].unique())
+        if end_date is not None:
+            calendar = calendar[calendar <= pd.Timestamp(end_date)]
+        calendar = calendar[calendar >= trades['day'].iloc[0]]
+        n_days = len(calendar)
+
+        holdings = {}
+        values = {}
+        total_cash_flow = np.zeros(n_days)
+        total_realized = np.zeros(n_days)
+        total_cost_basis = np.zeros(n_days)
+
+        for ticker, ticker_trades in trades.groupby('ticker', sort=False):
+            day_idx = calendar.searchsorted(ticker_trades['day'].to_numpy())
+            in_range = day_idx < n_days
+            ticker_trades = ticker_trades[in_range]
+            day_idx = day_idx[in_range]
+
+            quantity = ticker_trades['quantity'].to_numpy(dtype=float)
+            price = ticker_trades['price'].to_numpy(dtype=float)
+            commission = ticker_trades['commission'].to_numpy(dtype=float)
+            sign = ticker_trades['sign'].to_numpy()
+
+            # Позиция на конец каждого дня - накопленная сумма изменений количества
+            quantity_delta = np.zeros(n_days)
+            np.add.at(quantity_delta, day_idx, sign * quantity)
+            position = np.cumsum(quantity_delta)
+
+            # Денежный поток инвестора: покупка - внесение денег, продажа - изъятие
+            cash_flow = np.zeros(n_days)
+            np.add.at(cash_flow, day_idx, sign * quantity * price + commission)
+
+            # Реализованная прибыль по средней цене (как в PortfolioManager) -
+            # последовательный проход только по операциям, а не по дням
+            realized = np.zeros(len(quantity))
+            basis_after = np.zeros(len(quantity))
+            held = 0.0
+            cost_basis = 0.0
+            for i in range(len(quantity)):
+                if sign[i] > 0:
+                    held += quantity[i]
+                    cost_basis += quantity[i] * price[i] + commission[i]
+                elif held > 0:
+                    sold = min(quantity[i], held)
+                    average_cost = cost_basis / held
+                    realized[i] = sold * (price[i] - average_cost) - commission[i]
+                    cost_basis -= sold * average_cost
+                    held -= sold
+                basis_after[i] = cost_basis
+
+            realized_daily = np.zeros(n_days)
+            np.add.at(realized_daily, day_idx, realized)
+
+            # Стоимость позиции в каждый день - по последней известной цене закрытия
+            last_trade_idx = np.full(n_days, -1)
+            last_trade_idx[day_idx] = np.arange(len(day_idx))
+            last_trade_idx = np.maximum.accumulate(last_trade_idx)
+            has_trade = last_trade_idx >= 0
+            basis_daily = np.where(has_trade, basis_after[last_trade_idx], 0.0)
+
+            close = price_history.get(ticker, pd.Series(dtype=float))
+            close = close[~close.index.duplicated(keep='last')].reindex(calendar).ffill().to_numpy()
+            trade_price = np.where(has_trade, price[last_trade_idx], np.nan)
+            close = np.where(np.isnan(close), trade_price, close)
+
+            holdings[ticker] = position
+            values[ticker] = np.nan_to_num(position * close)
+            total_cash_flow += cash_flow
+            total_realized += realized_daily
+            total_cost_basis += basis_daily
+
+        holdings = pd.DataFrame(holdings, index=calendar)
+        values = pd.DataFrame(values, index=calendar)
+        portfolio_value = values.sum(axis=1).to_numpy()
+
+        # TWR: дневная доходность без учета внесений и изъятий
+        previous_value = np.concatenate(([0.0], portfolio_value[:-1]))
+        daily_return = np.divide(portfolio_value - total_cash_flow, previous_value,
+                                 out=np.ones(n_days), where=previous_value > 0) - 1
+        twr = np.cumprod(1 + daily_return) - 1
+
+        summary = pd.DataFrame({
+            'value': portfolio_value,
+            'cash_flow': total_cash_flow,
+            'net_invested': np.cumsum(total_cash_flow),
+            'cost_basis': total_cost_basis,
+            'realized_pnl': np.cumsum(total_realized),
+            'unrealized_pnl': portfolio_value - total_cost_basis,
+            'daily_return': daily_return,
+            'twr': twr
+        }, index=calendar)
+        summary['total_pnl'] = summary['realized_pnl'] + summary['unrealized_pnl']
+
+        return {'holdings': holdings, 'values': values, 'summary': summary}
+
+    def show_backtest(self, parent_window):
+        """Показать историю стоимости портфеля по журналу операций"""
+        transactions = self.portfolio_manager.transaction_manager.transaction_history
+        if not transactions:
+            messagebox.showwarning("Внимание", "История операций пуста")
+            return
+
+        progress_window = tk.Toplevel(parent_window)
+        progress_window.title("Бэктест портфеля...")
+        progress_window.geometry("300x100")
+        progress_window.transient(parent_window)
+
+        ttk.Label(progress_window, text="Загрузка истории цен...").pack(pady=10)
+        progress = ttk.Progressbar(progress_window, mode='indeterminate')
+        progress.pack(pady=10, padx=20, fill=tk.X)
+        progress.start()
+
+        def calculate_backtest(job):
+            first_date = min(datetime.fromisoformat(t['date']) for t in transactions)
+            tickers = sorted({t['ticker'] for t in transactions})
+            price_history = self.load_price_history(tickers, first_date - timedelta(days=7))
+            return self.run_backtest(transactions, price_history)
+
+        def show_error(error):
+            progress.stop()
+            progress_window.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось выполнить бэктест: {error}")
+
+        def show_results(results):
+            progress.stop()
+            progress_window.destroy()
+
+            summary = results['summary']
+            last = summary.iloc[-1]
+
+            backtest_window = tk.Toplevel(parent_window)
+            backtest_window.title("Бэктест портфеля по истории операций")
+            backtest_window.geometry("900x650")
+
+            main_frame = ttk.Frame(backtest_window, padding="10")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+
+            stats_frame = ttk.LabelFrame(main_frame, text="Итоги", padding="10")
+            stats_frame.pack(fill=tk.X, pady=(0, 10))
+
+            ttk.Label(stats_frame, text=(f"Период: {summary.index[0]:%d.%m.%Y} - {summary.index[-1]:%d.%m.%Y} | "
+                                         f"Стоимость: {last['value']:,.2f} руб | "
+                                         f"Чистые вложения: {last['net_invested']:,.2f} руб")).pack(anchor=tk.W)
+            ttk.Label(stats_frame, text=(f"Реализованная прибыль: {last['realized_pnl']:+,.2f} руб | "
+                                         f"Нереализованная прибыль: {last['unrealized_pnl']:+,.2f} руб | "
+                                         f"TWR: {last['twr'] * 100:+.2f}%"),
+                     font=("Arial", 10, "bold")).pack(anchor=tk.W)
+
+            chart_frame = ttk.LabelFrame(main_frame, text="Стоимость портфеля", padding="10")
+            chart_frame.pack(fill=tk.BOTH, expand=True)
+
+            fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+            ax.plot(summary.index, summary['value'], color='blue', linewidth=2, label='Стоимость')
+            ax.plot(summary.index, summary['net_invested'], color='gray', linestyle='--', label='Чистые вложения')
+            ax.set_ylabel('руб')
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+            fig.autofmt_xdate()
+
+            canvas = FigureCanvasTkAgg(fig, chart_frame)
+            canvas.draw()
+            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+            ttk.Button(main_frame, text="Закрыть", command=backtest_window.destroy).pack(pady=10)
+
+        BackgroundJobRunner(progress_window).submit(calculate_backtest, on_done=show_results, on_error=show_error)
@@ -1,11 +1,15 @@
 # Менеджер сравнения - сравнение портфеля с индексом Мосбиржи
-import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkinter import messagebox, ttk
 import tkinter as tk
 import random
+import threading
+from background_jobs import BackgroundJobRunner
+from core.history_cache import get_history_cache
+from core.moex_client import fetch_marketdata, fetch_marketdata_batches
+from core.benchmark_analytics import returns_matrix, portfolio_returns, relative_metrics
 
 class ComparisonManager:
     """
@@ -21,6 +25,7 @@ class ComparisonManager:
             portfolio_window: ссылка на главное окно портфеля
         """
         self.portfolio_manager = portfolio_manager
+        self.request_timeout = 10  # срок ожидания котировок в секундах
 
     def show_index_comparison(self, parent_window):
         """Показать сравнение с индексом с получением цен открытия акций"""
@@ -28,176 +33,183 @@ class ComparisonManager:
             messagebox.showwarning("Внимание", "Портфель пуст")
             return
         
-        # Создаем окно прогресса
-        progress_window = tk.Toplevel(parent_window)
-        progress_window.title("Получение данных...")
-        progress_window.geometry("300x100")
-        progress_window.transient(parent_window)
+        positions = list(self.portfolio_manager.portfolio_data)
+        open_prices = {}
         
-        ttk.Label(progress_window, text="Получение цен открытия акций...").pack(pady=10)
-        progress = ttk.Progressbar(progress_window, mode='indeterminate')
-        progress.pack(pady=10, padx=20, fill=tk.X)
-        progress.start()
+        # Окно результатов открываем сразу и заполняем по мере получения цен
+        comparison_window = tk.Toplevel(parent_window)
+        comparison_window.title("Сравнение с IMOEX - доходность за сегодня")
+        comparison_window.geometry("900x900")
         
-        def calculate_comparison():
-            # Получаем данные IMOEX
-            imoex_data = self.get_imoex_detailed_data()
-            
-            # Рассчитываем стоимость портфеля на открытии и сейчас
+        main_frame = ttk.Frame(comparison_window, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text="Сравнение с индексом Мосбиржи", 
+                 font=("Arial", 14, "bold")).pack(pady=(0, 15))
+        
+        ttk.Label(main_frame, text="Доходность за текущий торговый день", 
+                 font=("Arial", 11, "bold"), foreground="blue").pack(pady=(0, 10))
+        
+        status_label = ttk.Label(main_frame, text=f"Получение цен открытия: 0 из {len(positions)}")
+        status_label.pack(pady=(0, 5))
+        progress = ttk.Progressbar(main_frame, mode='determinate', maximum=len(positions))
+        progress.pack(fill=tk.X, pady=(0, 10))
+        
+        # Детальная статистика
+        stats_frame = ttk.LabelFrame(main_frame, text="Общая статистика", padding="10")
+        stats_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        # Создаем сетку для статистики
+        stats_grid = ttk.Frame(stats_frame)
+        stats_grid.pack(fill=tk.X)
+        
+        # Заголовки
+        ttk.Label(stats_grid, text="", font=("Arial", 9, "bold")).grid(row=0, column=0, padx=5, pady=2, sticky=tk.W)
+        ttk.Label(stats_grid, text="На открытии", font=("Arial", 9, "bold")).grid(row=0, column=1, padx=5, pady=2)
+        ttk.Label(stats_grid, text="Текущая", font=("Arial", 9, "bold")).grid(row=0, column=2, padx=5, pady=2)
+        ttk.Label(stats_grid, text="Изменение", font=("Arial", 9, "bold")).grid(row=0, column=3, padx=5, pady=2)
+        
+        # Ячейки статистики заполняются по мере поступления данных
+        stats_cells = {}
+        for row, name in enumerate(("Портфель", "Индекс IMOEX", "Разница"), start=1):
+            ttk.Label(stats_grid, text=name, font=("Arial", 9, "bold")).grid(row=row, column=0, padx=5, pady=2, sticky=tk.W)
+            for column in (1, 2, 3):
+                cell = ttk.Label(stats_grid, text="...", font=("Arial", 9, "bold") if column == 3 else None)
+                cell.grid(row=row, column=column, padx=5, pady=2)
+                stats_cells[(row, column)] = cell
+        stats_cells[(3, 1)].config(text="")
+        stats_cells[(3, 2)].config(text="")
+        
+        # Детали по акциям
+        details_frame = ttk.LabelFrame(main_frame, text="Детали по акциям", padding="10")
+        details_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        # Таблица
+        columns = ("ticker", "open_price", "current_price", "return")
+        tree = ttk.Treeview(details_frame, columns=columns, show="headings", height=6)
+        
+        headers = {
+            "ticker": "Тикер",
+            "open_price": "Цена открытия",
+            "current_price": "Текущая цена", 
+            "return": "Изменение %"
+        }
+        
+        for col in columns:
+            tree.heading(col, text=headers[col])
+            if col == "ticker":
+                tree.column(col, width=80, minwidth=70)
+            else:
+                tree.column(col, width=100, minwidth=90)
+        
+        for index, stock in enumerate(positions):
+            tree.insert("", tk.END, iid=str(index), values=(
+                stock['ticker'],
+                "...",
+                f"{stock.get('current_price', stock['buy_price']):.2f}",
+                "..."
+            ))
+        
+        # Прокрутка
+        v_scroll = ttk.Scrollbar(details_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=v_scroll.set)
+        
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # График сравнения
+        chart_frame = ttk.LabelFrame(main_frame, text="Визуальное сравнение", padding="10")
+        chart_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        # Кнопка закрытия
+        ttk.Button(main_frame, text="Закрыть", 
+                  command=comparison_window.destroy).pack(pady=10)
+        
+        def set_change_cell(row, change_text, change_percent):
+            color = "green" if change_percent >= 0 else "red"
+            stats_cells[(row, 3)].config(text=change_text, foreground=color)
+        
+        def calculate_portfolio_return():
+            """Доходность портфеля по уже полученным ценам открытия"""
             portfolio_open_value = 0
             portfolio_current_value = 0
-            detailed_stocks = []
-            
-            for stock in self.portfolio_manager.portfolio_data:
-                quantity = stock['quantity']
-                
-                # Получаем цену открытия для каждой акции
-                open_price = self.get_stock_open_price(stock['ticker'])
+            for stock in positions:
+                open_price = open_prices.get(stock['ticker'])
+                if open_price is None:
+                    continue
                 current_price = stock.get('current_price', stock['buy_price'])
-                
-                stock_open_value = quantity * open_price
-                stock_current_value = quantity * current_price
-                stock_return = ((current_price - open_price) / open_price * 100) if open_price > 0 else 0
-                
-                portfolio_open_value += stock_open_value
-                portfolio_current_value += stock_current_value
-                
-                detailed_stocks.append({
-                    'ticker': stock['ticker'],
-                    'open_price': open_price,
-                    'current_price': current_price,
-                    'return': stock_return
-                })
+                portfolio_open_value += stock['quantity'] * open_price
+                portfolio_current_value += stock['quantity'] * current_price
             
-            # Расчет доходности портфеля за сегодня
             if portfolio_open_value > 0:
                 portfolio_return = ((portfolio_current_value - portfolio_open_value) / portfolio_open_value) * 100
             else:
                 portfolio_return = 0
-            
-            imoex_return = imoex_data['change_percent']
-            
-            # Закрываем прогресс и показываем результаты
-            parent_window.after(0, lambda: show_results(
-                portfolio_return, imoex_return, 
-                portfolio_open_value, portfolio_current_value,
-                imoex_data, detailed_stocks
-            ))
+            return portfolio_open_value, portfolio_current_value, portfolio_return
         
-        def show_results(portfolio_return, imoex_return, portfolio_open_value, 
-                        portfolio_current_value, imoex_data, detailed_stocks):
-            progress.stop()
-            progress_window.destroy()
-            
-            # Создаем окно результатов
-            comparison_window = tk.Toplevel(parent_window)
-            comparison_window.title("Сравнение с IMOEX - доходность за сегодня")
-            comparison_window.geometry("900x900")
-            
-            main_frame = ttk.Frame(comparison_window, padding="20")
-            main_frame.pack(fill=tk.BOTH, expand=True)
-            
-            ttk.Label(main_frame, text="Сравнение с индексом Мосбиржи", 
-                     font=("Arial", 14, "bold")).pack(pady=(0, 15))
+        def apply_open_prices(prices):
+            """Обновление строк таблицы и итогов портфеля для очередной пачки цен"""
+            open_prices.update(prices)
             
-            ttk.Label(main_frame, text="Доходность за текущий торговый день", 
-                     font=("Arial", 11, "bold"), foreground="blue").pack(pady=(0, 10))
-            
-            # Детальная статистика
-            stats_frame = ttk.LabelFrame(main_frame, text="Общая статистика", padding="10")
-            stats_frame.pack(fill=tk.X, pady=(0, 10))
-            
-            # Создаем сетку для статистики
-            stats_grid = ttk.Frame(stats_frame)
-            stats_grid.pack(fill=tk.X)
-            
-            # Заголовки
-            ttk.Label(stats_grid, text="", font=("Arial", 9, "bold")).grid(row=0, column=0, padx=5, pady=2, sticky=tk.W)
-            ttk.Label(stats_grid, text="На открытии", font=("Arial", 9, "bold")).grid(row=0, column=1, padx=5, pady=2)
-            ttk.Label(stats_grid, text="Текущая", font=("Arial", 9, "bold")).grid(row=0, column=2, padx=5, pady=2)
-            ttk.Label(stats_grid, text="Изменение", font=("Arial", 9, "bold")).grid(row=0, column=3, padx=5, pady=2)
-            
-            # Данные портфеля
-            ttk.Label(stats_grid, text="Портфель", font=("Arial", 9, "bold")).grid(row=1, column=0, padx=5, pady=2, sticky=tk.W)
-            ttk.Label(stats_grid, text=f"{portfolio_open_value:,.2f} руб").grid(row=1, column=1, padx=5, pady=2)
-            ttk.Label(stats_grid, text=f"{portfolio_current_value:,.2f} руб").grid(row=1, column=2, padx=5, pady=2)
+            for index, stock in enumerate(positions):
+                open_price = prices.get(stock['ticker'])
+                if open_price is None:
+                    continue
+                current_price = stock.get('current_price', stock['buy_price'])
+                stock_return = ((current_price - open_price) / open_price * 100) if open_price > 0 else 0
+                tree.item(str(index), values=(
+                    stock['ticker'],
+                    f"{open_price:.2f}",
+                    f"{current_price:.2f}",
+                    f"{stock_return:+.2f}%"
+                ))
             
-            portfolio_color = "green" if portfolio_return >= 0 else "red"
-            portfolio_change = portfolio_current_value - portfolio_open_value
-            ttk.Label(stats_grid, text=f"{portfolio_change:+,.2f} руб ({portfolio_return:+.2f}%)", 
-                     foreground=portfolio_color, font=("Arial", 9, "bold")).grid(row=1, column=3, padx=5, pady=2)
+            received = sum(1 for stock in positions if stock['ticker'] in open_prices)
+            progress['value'] = received
+            status_label.config(text=f"Получение цен открытия: {received} из {len(positions)}")
             
-            # Данные индекса
-            ttk.Label(stats_grid, text="Индекс IMOEX", font=("Arial", 9, "bold")).grid(row=2, column=0, padx=5, pady=2, sticky=tk.W)
-            ttk.Label(stats_grid, text=f"{imoex_data['open']:.2f}").grid(row=2, column=1, padx=5, pady=2)
-            ttk.Label(stats_grid, text=f"{imoex_data['current']:.2f}").grid(row=2, column=2, padx=5, pady=2)
+            portfolio_open_value, portfolio_current_value, portfolio_return = calculate_portfolio_return()
+            stats_cells[(1, 1)].config(text=f"{portfolio_open_value:,.2f} руб")
+            stats_cells[(1, 2)].config(text=f"{portfolio_current_value:,.2f} руб")
+            set_change_cell(1, f"{portfolio_current_value - portfolio_open_value:+,.2f} руб ({portfolio_return:+.2f}%)",
+                            portfolio_return)
+        
+        def show_results(imoex_data):
+            """Итоговая статистика и график после получения всех данных"""
+            progress.pack_forget()
+            status_label.config(text=f"Данные получены в {datetime.now().strftime('%H:%M:%S')}")
             
-            imoex_color = "green" if imoex_data['change_percent'] >= 0 else "red"
-            imoex_change = imoex_data['current'] - imoex_data['open']
-            ttk.Label(stats_grid, text=f"{imoex_change:+.2f} ({imoex_data['change_percent']:+.2f}%)", 
-                     foreground=imoex_color, font=("Arial", 9, "bold")).grid(row=2, column=3, padx=5, pady=2)
+            _, _, portfolio_return = calculate_portfolio_return()
             
-            # Разница
-            difference = portfolio_return - imoex_data['change_percent']
-            difference_color = "green" if difference >= 0 else "red"
-            ttk.Label(stats_grid, text="Разница", font=("Arial", 9, "bold")).grid(row=3, column=0, padx=5, pady=2, sticky=tk.W)
-            ttk.Label(stats_grid, text="", foreground=difference_color, font=("Arial", 9, "bold")).grid(row=3, column=1, padx=5, pady=2)
-            ttk.Label(stats_grid, text="", foreground=difference_color, font=("Arial", 9, "bold")).grid(row=3, column=2, padx=5, pady=2)
-            ttk.Label(stats_grid, text=f"{difference:+.2f}%", 
-                     foreground=difference_color, font=("Arial", 9, "bold")).grid(row=3, column=3, padx=5, pady=2)
+            categories = ['Ваш портфель']
+            returns = [portfolio_return]
+            colors = ['#2E8B57' if portfolio_return >= 0 else '#DC143C']
             
-            # Детали по акциям
-            if len(detailed_stocks) > 0:
-                details_frame = ttk.LabelFrame(main_frame, text="Детали по акциям", padding="10")
-                details_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-                
-                # Таблица
-                columns = ("ticker", "open_price", "current_price", "return")
-                tree = ttk.Treeview(details_frame, columns=columns, show="headings", height=6)
-                
-                headers = {
-                    "ticker": "Тикер",
-                    "open_price": "Цена открытия",
-                    "current_price": "Текущая цена", 
-                    "return": "Изменение %"
-                }
-                
-                for col in columns:
-                    tree.heading(col, text=headers[col])
-                    if col == "ticker":
-                        tree.column(col, width=80, minwidth=70)
-                    else:
-                        tree.column(col, width=100, minwidth=90)
+            if imoex_data is None:
+                # Индекс не получен - не показываем выдуманные нули
+                stats_cells[(2, 1)].config(text="")
+                stats_cells[(2, 2)].config(text="")
+                stats_cells[(2, 3)].config(text="нет данных по индексу", foreground="gray")
+                stats_cells[(3, 3)].config(text="—", foreground="gray")
+            else:
+                imoex_return = imoex_data['change_percent']
                 
-                # Заполняем данными
-                for stock in detailed_stocks:
-                    return_color = "green" if stock['return'] >= 0 else "red"
-                    tree.insert("", tk.END, values=(
-                        stock['ticker'],
-                        f"{stock['open_price']:.2f}",
-                        f"{stock['current_price']:.2f}",
-                        f"{stock['return']:+.2f}%"
-                    ))
+                # Данные индекса
+                stats_cells[(2, 1)].config(text=f"{imoex_data['open']:.2f}")
+                stats_cells[(2, 2)].config(text=f"{imoex_data['current']:.2f}")
+                imoex_change = imoex_data['current'] - imoex_data['open']
+                set_change_cell(2, f"{imoex_change:+.2f} ({imoex_return:+.2f}%)", imoex_return)
                 
-                # Прокрутка
-                v_scroll = ttk.Scrollbar(details_frame, orient=tk.VERTICAL, command=tree.yview)
-                tree.configure(yscrollcommand=v_scroll.set)
+                # Разница
+                difference = portfolio_return - imoex_return
+                set_change_cell(3, f"{difference:+.2f}%", difference)
                 
-                tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-                v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            # График сравнения
-            chart_frame = ttk.LabelFrame(main_frame, text="Визуальное сравнение", padding="10")
-            chart_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+                categories.append('Индекс IMOEX')
+                returns.append(imoex_return)
+                colors.append('#1E90FF' if imoex_return >= 0 else '#FF8C00')
             
             fig, ax = plt.subplots(figsize=(8, 4), dpi=80)
             
-            categories = ['Ваш портфель', 'Индекс IMOEX']
-            returns = [portfolio_return, imoex_return]
-            
-            colors = ['#2E8B57' if portfolio_return >= 0 else '#DC143C', 
-                      '#1E90FF' if imoex_return >= 0 else '#FF8C00']
-            
             bars = ax.bar(categories, returns, color=colors, alpha=0.7)
             ax.set_ylabel('Доходность (%)')
             ax.set_title('Сравнение доходности за сегодня')
@@ -216,39 +228,72 @@ class ComparisonManager:
             canvas = FigureCanvasTkAgg(fig, chart_frame)
             canvas.draw()
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        def calculate_comparison(job):
+            # Индекс запрашиваем параллельно с котировками акций
+            imoex_result = {}
+            imoex_thread = threading.Thread(
+                target=lambda: imoex_result.update(data=self.get_imoex_detailed_data()), daemon=True)
+            imoex_thread.start()
+            
+            # Цены открытия всех акций - пачками по одному запросу на 50 тикеров
+            no_price = set()
+            
+            def on_batch(quotes):
+                prices = {}
+                for ticker, quote in quotes.items():
+                    price = self.extract_open_price(quote)
+                    if price is None:
+                        # Котировка пришла, но без цены открытия и закрытия
+                        no_price.add(ticker)
+                    else:
+                        prices[ticker] = price
+                job.post(apply_open_prices, prices)
+            
+            missing = fetch_marketdata_batches([stock['ticker'] for stock in positions], on_batch,
+                                               timeout=self.request_timeout)
+            missing |= no_price
             
-            # Кнопка закрытия
-            ttk.Button(main_frame, text="Закрыть", 
-                      command=comparison_window.destroy).pack(pady=10)
-        
-        # Запускаем в отдельном потоке
-        import threading
-        thread = threading.Thread(target=calculate_comparison)
-        thread.daemon = True
-        thread.start() 
+            # Для неполученных тикеров используем текущую цену из портфеля
+            fallback = {}
+            for stock in positions:
+                if stock['ticker'] in missing and stock['ticker'] not in fallback:
+                    fallback[stock['ticker']] = stock.get('current_price', stock['buy_price'])
+            if fallback:
+                job.post(apply_open_prices, fallback)
+            
+            imoex_thread.join(self.request_timeout)
+            return imoex_result.get('data')
+        
+        # Запускаем в фоне - события разбираются в потоке окна сравнения
+        BackgroundJobRunner(comparison_window).submit(calculate_comparison, on_done=show_results)
    
+    def extract_open_price(self, quote):
+        """
+        Цена открытия из котировки ISS.
+        
+        Args:
+            quote: строка котировки по названиям колонок
+            
+        Returns:
+            float: цена открытия, цена закрытия предыдущего дня или None
+        """
+        for column in ('OPEN', 'PREVPRICE', 'LCLOSEPRICE'):
+            value = quote.get(column)
+            if value:
+                return float(value)
+        return None
 
     def get_stock_open_price(self, ticker):
         """Получить цену открытия для одной акции"""
         try:
-            url = f"https://iss.moex.com/iss/engines/stock/markets/shares/boards/TQBR/securities/{ticker}.json"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                market_data = data['marketdata']['data']
-                
-                if market_data and market_data[0]:
-                    open_price = market_data[0][9]  # OPEN price (индекс 9)
-                    if open_price is not None:
-                        return float(open_price)
-                    
-                    # Если цена открытия не доступна, используем цену закрытия предыдущего дня
-                    prev_close = market_data[0][11]  # PREVADMITTEDQUOTE
-                    if prev_close is not None:
-                        return float(prev_close)
-        except:
-            pass
+            quote = fetch_marketdata([ticker], timeout=self.request_timeout).get(ticker)
+            if quote:
+                open_price = self.extract_open_price(quote)
+                if open_price is not None:
+                    return open_price
+        except Exception as e:
+            print(f"Ошибка получения цены открытия {ticker}: {e}")
         
         # Если не получилось, используем текущую цену из портфеля
         for stock in self.portfolio_manager.portfolio_data:
@@ -258,28 +303,151 @@ class ComparisonManager:
         return 0
 
     def get_imoex_detailed_data(self):
-        """Получение детальных данных IMOEX (открытие и текущая цена)"""
+        """
+        Получение детальных данных IMOEX (открытие и текущая цена).
+        
+        Returns:
+            dict: {'open', 'current', 'change_percent'} или None, если данных по индексу нет
+        """
         try:
-            url = "https://iss.moex.com/iss/engines/stock/markets/index/boards/SNDX/securities/IMOEX.json"
-            response = requests.get(url, timeout=10)
+            quote = fetch_marketdata(['IMOEX'], market='index', board='SNDX',
+                                     timeout=self.request_timeout).get('IMOEX', {})
+            open_price = quote.get('OPENVALUE')
+            current_price = quote.get('CURRENTVALUE') or quote.get('LASTVALUE')
             
-            if response.status_code == 200:
-                data = response.json()
-                market_data = data['marketdata']['data']
-                
-                if market_data and market_data[0]:
-                    open_price = market_data[0][2]  # OPEN
-                    current_price = market_data[0][4] or market_data[0][3]  # LAST или LCURRENTPRICE
-                    
-                    if open_price and current_price:
-                        change_percent = ((current_price - open_price) / open_price) * 100
-                        return {
-                            'open': float(open_price),
-                            'current': float(current_price),
-                            'change_percent': change_percent
-                        }
+            if open_price and current_price:
+                change_percent = ((current_price - open_price) / open_price) * 100
+                return {
+                    'open': float(open_price),
+                    'current': float(current_price),
+                    'change_percent': change_percent
+                }
         except:
             pass
         
-        # Запасные данные
-        return {'open': 3200, 'current': 3220, 'change_percent': 0.62}
\ No newline at end of file
+        # Запасные данные - два последних закрытия из локальной истории индекса
+        try:
+            history = self.get_imoex_history(datetime.now() - timedelta(days=14))
+            if len(history) >= 2:
+                open_price, current_price = history.iloc[-2], history.iloc[-1]
+                return {
+                    'open': float(open_price),
+                    'current': float(current_price),
+                    'change_percent': (current_price - open_price) / open_price * 100
+                }
+        except Exception as e:
+            print(f"Ошибка получения истории IMOEX: {e}")
+        
+        return None
+
+    def get_imoex_history(self, from_date):
+        """
+        Дневная история индекса IMOEX из локального кэша с догрузкой с ISS.
+        
+        Args:
+            from_date: начальная дата
+            
+        Returns:
+            pd.Series: значения индекса на закрытие
+        """
+        return get_history_cache().get_history('IMOEX', from_date, market='index', board='SNDX')
+
+    def calculate_benchmark_metrics(self, years=3, window=63, risk_free_rate=0.0):
+        """
+        Расчет бета, альфа, ошибки слежения и информационного коэффициента к IMOEX.
+        
+        Args:
+            years: глубина истории в годах
+            window: окно скользящих метрик в торговых днях
+            risk_free_rate: безрисковая ставка (% годовых)
+            
+        Returns:
+            tuple: (pd.DataFrame скользящих метрик, dict метрик за период)
+        """
+        from_date = datetime.now() - timedelta(days=365 * years)
+        cache = get_history_cache()
+        
+        weights = {}
+        for stock in self.portfolio_manager.portfolio_data:
+            weights[stock['ticker']] = weights.get(stock['ticker'], 0) + stock.get('current_value', 0)
+        
+        price_history = {ticker: cache.get_history(ticker, from_date) for ticker in weights}
+        asset_returns = returns_matrix(price_history)
+        if asset_returns.empty:
+            raise ValueError("Нет общей истории цен по активам портфеля")
+        
+        benchmark = self.get_imoex_history(from_date).pct_change().dropna()
+        return relative_metrics(portfolio_returns(asset_returns, weights), benchmark,
+                                window=window, risk_free_rate=risk_free_rate)
+
+    def show_benchmark_analytics(self, parent_window):
+        """Показать бета, альфа, ошибку слежения и информационный коэффициент к IMOEX"""
+        if not self.portfolio_manager.portfolio_data:
+            messagebox.showwarning("Внимание", "Портфель пуст")
+            return
+        
+        progress_window = tk.Toplevel(parent_window)
+        progress_window.title("Получение данных...")
+        progress_window.geometry("300x100")
+        progress_window.transient(parent_window)
+        
+        ttk.Label(progress_window, text="Загрузка истории портфеля и IMOEX...").pack(pady=10)
+        progress = ttk.Progressbar(progress_window, mode='indeterminate')
+        progress.pack(pady=10, padx=20, fill=tk.X)
+        progress.start()
+        
+        def calculate_metrics(job):
+            return self.calculate_benchmark_metrics()
+        
+        def show_error(error):
+            progress.stop()
+            progress_window.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось рассчитать метрики относительно IMOEX: {error}")
+        
+        def show_results(metrics):
+            rolling, summary = metrics
+            progress.stop()
+            progress_window.destroy()
+            if 'beta' not in summary:
+                messagebox.showwarning("Внимание", "Недостаточно общей истории портфеля и индекса")
+                return
+            
+            analytics_window = tk.Toplevel(parent_window)
+            analytics_window.title("Портфель относительно IMOEX")
+            analytics_window.geometry("900x700")
+            
+            main_frame = ttk.Frame(analytics_window, padding="10")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+            
+            stats_frame = ttk.LabelFrame(main_frame, text=f"За период ({summary['days']} торговых дней)", padding="10")
+            stats_frame.pack(fill=tk.X, pady=(0, 10))
+            
+            ttk.Label(stats_frame, text=(f"Доходность портфеля: {summary['portfolio_return'] * 100:+.2f}% | "
+                                         f"Доходность IMOEX: {summary['benchmark_return'] * 100:+.2f}%")).pack(anchor=tk.W)
+            ttk.Label(stats_frame, text=(f"Бета: {summary['beta']:.2f} | "
+                                         f"Альфа: {summary['alpha'] * 100:+.2f}% годовых | "
+                                         f"Ошибка слежения: {summary['tracking_error'] * 100:.2f}% | "
+                                         f"Информационный коэф.: {summary['information_ratio']:.2f}"),
+                     font=("Arial", 10, "bold")).pack(anchor=tk.W)
+            
+            chart_frame = ttk.LabelFrame(main_frame, text="Скользящие метрики (окно 63 дня)", padding="10")
+            chart_frame.pack(fill=tk.BOTH, expand=True)
+            
+            fig, (beta_ax, ir_ax) = plt.subplots(2, 1, figsize=(8, 5), dpi=90, sharex=True)
+            beta_ax.plot(rolling.index, rolling['beta'], color='blue', label='Бета')
+            beta_ax.axhline(y=1, color='black', linestyle='--', alpha=0.3)
+            beta_ax.grid(True, alpha=0.3)
+            beta_ax.legend()
+            ir_ax.plot(rolling.index, rolling['information_ratio'], color='green', label='Информационный коэф.')
+            ir_ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+            ir_ax.grid(True, alpha=0.3)
+            ir_ax.legend()
+            fig.autofmt_xdate()
+            
+            canvas = FigureCanvasTkAgg(fig, chart_frame)
+            canvas.draw()
+            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            
+            ttk.Button(main_frame, text="Закрыть", command=analytics_window.destroy).pack(pady=10)
+        
+        BackgroundJobRunner(progress_window).submit(calculate_metrics, on_done=show_results, on_error=show_error)
\ No newline at end of file
@@ -1,44 +1,16 @@
-# Менеджер дивидендов - управление дивидендными выплатами
-import json
-import os
+# Менеджер дивидендов - диалоги дивидендных выплат
 from datetime import datetime
 from tkinter import messagebox, ttk
 import tkinter as tk
+from core.dividends import DividendStore, calculate_dividend
+from core.errors import PortfolioError
+from export_manager import export_rows
 
-class DividendManager:
+class DividendManager(DividendStore):
     """
-    Управление дивидендными выплатами: добавление, история, расчеты.
+    Диалоги добавления, истории и экспорта дивидендов; учет выплат - в DividendStore.
     """
     
-    def __init__(self, portfolio_manager):
-        """
-        Инициализация менеджера дивидендов.
-        
-        Args:
-            portfolio_manager: ссылка на менеджер портфеля
-        """
-        self.portfolio_manager = portfolio_manager
-        self.dividend_history = []
-        self.load_dividend_history()
-    
-    def load_dividend_history(self):
-        """Загрузка истории дивидендов из JSON файла"""
-        try:
-            if os.path.exists('dividends_history.json'):
-                with open('dividends_history.json', 'r', encoding='utf-8') as f:
-                    self.dividend_history = json.load(f)
-        except Exception as e:
-            print(f"Ошибка загрузки истории дивидендов: {e}")
-            self.dividend_history = []
-    
-    def save_dividend_history(self):
-        """Сохранение истории дивидендов в JSON файл"""
-        try:
-            with open('dividends_history.json', 'w', encoding='utf-8') as f:
-                json.dump(self.dividend_history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Ошибка сохранения истории дивидендов: {e}")
-    
     def add_dividend_payment(self, parent_window):
         """
         Отображение диалога добавления дивидендной выплаты.
@@ -171,9 +143,8 @@ class DividendManager:
                         return
                 
                 if quantity > 0 and amount_per_share > 0:
-                    total_dividends = quantity * amount_per_share
-                    tax_amount = total_dividends * (tax_rate / 100)
-                    net_dividends = total_dividends - tax_amount
+                    total_dividends, tax_amount, net_dividends = calculate_dividend(
+                        quantity, amount_per_share, tax_rate)
                     
                     total_dividends_label.config(
                         text=f"Всего дивидендов: {total_dividends:.2f} руб", 
@@ -204,44 +175,9 @@ class DividendManager:
                 tax_rate = float(dividend_tax_var.get() or 13)
                 payment_date = dividend_date_var.get()
 
-                if not ticker or quantity <= 0 or amount_per_share <= 0:
-                    messagebox.showerror("Ошибка", "Заполните все поля корректно")
-                    return
-
-                # Проверяем доступное количество акций
-                stock = next((s for s in self.portfolio_manager.portfolio_data if s['ticker'] == ticker), None)
-                if not stock:
-                    messagebox.showerror("Ошибка", f"Акция {ticker} не найдена в портфеле")
-                    return
-
-                if quantity > stock['quantity']:
-                    messagebox.showerror("Ошибка", 
-                                       f"Недостаточно акций. Запрошено: {quantity}, доступно: {stock['quantity']}")
-                    return
-
-                # Расчет выплаты
-                total_dividends = quantity * amount_per_share
-                tax_amount = total_dividends * (tax_rate / 100)
-                net_dividends = total_dividends - tax_amount
-
-                # Создаем запись о дивидендах
-                dividend_data = {
-                    'ticker': ticker,
-                    'date': payment_date,
-                    'quantity': quantity,
-                    'amount_per_share': amount_per_share,
-                    'total_amount': total_dividends,
-                    'tax_rate': tax_rate,
-                    'tax_amount': tax_amount,
-                    'net_amount': net_dividends,
-                    'total_shares_in_portfolio': stock['quantity']
-                }
-
-                # Сохраняем в историю дивидендов
-                self.save_dividend_payment(dividend_data)
-
-                # Обновляем статистику портфеля
-                self.update_portfolio_with_dividend(ticker, net_dividends, quantity)
+                dividend_data = self.record_dividend(ticker, quantity, amount_per_share,
+                                                     tax_rate, payment_date)
+                net_dividends = dividend_data['net_amount']
 
                 messagebox.showinfo("Успех", 
                                   f"Дивиденды по {ticker} добавлены:\n"
@@ -249,6 +185,8 @@ class DividendManager:
                                   f"Чистая выплата: {net_dividends:.2f} руб")
                 dividend_window.destroy()
 
+            except PortfolioError as e:
+                messagebox.showerror("Ошибка", str(e))
             except ValueError as e:
                 messagebox.showerror("Ошибка", f"Некорректные данные: {e}")
 
@@ -269,55 +207,6 @@ class DividendManager:
         update_available_shares()
         calculate_dividends()
 
-    def save_dividend_payment(self, dividend_data):
-        """
-        Сохранение дивидендной выплаты в историю.
-        
-        Args:
-            dividend_data: данные о дивидендной выплате
-        """
-        try:
-            self.dividend_history.append(dividend_data)
-            self.save_dividend_history()
-                
-        except Exception as e:
-            print(f"Ошибка сохранения дивидендов: {e}")
-
-    def update_portfolio_with_dividend(self, ticker, dividend_amount, dividend_quantity):
-        """
-        Обновление портфеля с учетом полученных дивидендов.
-        
-        Args:
-            ticker: тикер акции
-            dividend_amount: сумма дивидендов
-            dividend_quantity: количество акций с дивидендами
-        """
-        # Добавляем поле для учета дивидендов в данные акции
-        for stock in self.portfolio_manager.portfolio_data:
-            if stock['ticker'] == ticker:
-                if 'dividend_income' not in stock:
-                    stock['dividend_income'] = 0
-                if 'dividend_transactions' not in stock:
-                    stock['dividend_transactions'] = []
-                
-                # Добавляем общую сумму дивидендов
-                stock['dividend_income'] += dividend_amount
-                
-                # Сохраняем информацию о транзакции
-                dividend_transaction = {
-                    'date': datetime.now().isoformat(),
-                    'quantity': dividend_quantity,
-                    'amount': dividend_amount,
-                    'type': 'dividend'
-                }
-                stock['dividend_transactions'].append(dividend_transaction)
-                
-                # Пересчитываем общую доходность
-                self.portfolio_manager.calculate_stock_values(stock)
-                break
-        
-        self.portfolio_manager.save_portfolio_data()
-
     def show_dividend_history(self, parent_window):
         """Показать историю дивидендов"""
         try:
@@ -419,48 +308,41 @@ class DividendManager:
             button_frame.pack(fill=tk.X)
             
             ttk.Button(button_frame, text="Экспорт в CSV", 
-                      command=lambda: self.export_dividends_to_csv(self.dividend_history)).pack(side=tk.LEFT, padx=5)
+                      command=lambda: self.export_dividends_to_csv(self.dividend_history, history_window)).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="Закрыть", 
                       command=history_window.destroy).pack(side=tk.RIGHT, padx=5)
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить историю дивидендов: {e}")
 
-    def export_dividends_to_csv(self, dividends_data):
+    def export_dividends_to_csv(self, dividends_data, parent_window=None):
         """
-        Экспорт истории дивидендов в CSV.
+        Экспорт истории дивидендов в CSV/Parquet в фоновом потоке.
         
         Args:
             dividends_data: данные дивидендов для экспорта
+            parent_window: родительское окно
         """
-        try:
-            if not dividends_data:
-                messagebox.showwarning("Экспорт", "Нет данных для экспорта")
-                return
-            
-            filename = f"dividends_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            import csv
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file, delimiter=';')
-                
-                headers = ["Дата выплаты", "Тикер", "Количество акций", "Дивиденд на акцию",
-                          "Общая сумма", "Налоговая ставка", "Сумма налога", "Чистая сумма"]
-                writer.writerow(headers)
-                
-                for dividend in dividends_data:
-                    writer.writerow([
-                        dividend['date'],
-                        dividend['ticker'],
-                        dividend['quantity'],
-                        f"{dividend['amount_per_share']:.2f}",
-                        f"{dividend['total_amount']:.2f}",
-                        f"{dividend['tax_rate']:.2f}%",
-                        f"{dividend['tax_amount']:.2f}",
-                        f"{dividend['net_amount']:.2f}"
-                    ])
-            
-            messagebox.showinfo("Экспорт", f"История дивидендов экспортирована в файл:\n{filename}")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось экспортировать историю дивидендов: {e}")
\ No newline at end of file
+        if not dividends_data:
+            messagebox.showwarning("Экспорт", "Нет данных для экспорта")
+            return
+        
+        headers = ["Дата выплаты", "Тикер", "Количество акций", "Дивиденд на акцию",
+                   "Общая сумма", "Налоговая ставка %", "Сумма налога", "Чистая сумма"]
+        dividends = list(dividends_data)
+        
+        def make_rows():
+            for dividend in dividends:
+                yield [
+                    dividend['date'],
+                    dividend['ticker'],
+                    dividend['quantity'],
+                    round(dividend['amount_per_share'], 2),
+                    round(dividend['total_amount'], 2),
+                    round(dividend['tax_rate'], 2),
+                    round(dividend['tax_amount'], 2),
+                    round(dividend['net_amount'], 2)
+                ]
+        
+        export_rows(parent_window or self.portfolio_manager.parent, "dividends_history",
+                    headers, make_rows, "Экспорт истории дивидендов")
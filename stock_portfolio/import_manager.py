@@ -0,0 +1,415 @@
+# Менеджер импорта - загрузка сделок из отчетов брокера (CSV/XLSX)
+import codecs
+import copy
+import csv
+import os
+from datetime import datetime
+import numpy as np
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from background_jobs import BackgroundJobRunner
+
+
+class ImportManager:
+    """
+    Потоковый импорт сделок: строки читаются и проверяются пачками,
+    затем все сделки применяются к портфелю и журналу одной транзакцией
+    с одним сохранением и одним пакетным обновлением цен.
+    """
+
+    # Возможные названия колонок в отчетах брокеров
+    COLUMN_ALIASES = {
+        'date': ('date', 'datetime', 'trade date', 'дата', 'дата сделки', 'дата и время'),
+        'ticker': ('ticker', 'secid', 'symbol', 'тикер', 'код', 'код инструмента'),
+        'operation': ('operation', 'side', 'type', 'операция', 'вид сделки', 'направление'),
+        'quantity': ('quantity', 'qty', 'количество', 'кол-во'),
+        'price': ('price', 'цена', 'цена сделки'),
+        'commission': ('commission', 'fee', 'комиссия', 'комиссия брокера')
+    }
+    OPERATION_ALIASES = {
+        'buy': ('buy', 'b', 'покупка', 'купля', 'к'),
+        'sell': ('sell', 's', 'продажа', 'п')
+    }
+    DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d.%m.%Y', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M')
+
+    def __init__(self, portfolio_manager, chunk_size=1000):
+        """
+        Инициализация менеджера импорта.
+
+        Args:
+            portfolio_manager: ссылка на менеджер портфеля
+            chunk_size: количество строк в одной пачке разбора
+        """
+        self.portfolio_manager = portfolio_manager
+        self.chunk_size = chunk_size
+
+    def iter_rows(self, path):
+        """
+        Построчное чтение отчета без загрузки файла целиком.
+
+        Args:
+            path: путь к файлу .csv или .xlsx
+
+        Yields:
+            tuple: (номер строки, словарь {поле: значение})
+        """
+        if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+            rows = self._iter_xlsx(path)
+        else:
+            rows = self._iter_csv(path)
+
+        header = None
+        for line, values in rows:
+            if header is None:
+                header = self._map_header(values)
+                continue
+            if not any(value not in (None, '') for value in values):
+                continue
+            yield line, {field: values[index] for field, index in header.items() if index < len(values)}
+
+    def _iter_csv(self, path):
+        """Чтение CSV с определением разделителя и кодировки (UTF-8 или Windows-1251)"""
+        encoding = self._detect_encoding(path)
+        with open(path, 'r', encoding=encoding, newline='') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+            except csv.Error:
+                dialect = csv.excel
+            for line, values in enumerate(csv.reader(f, dialect), start=1):
+                yield line, values
+
+    def _detect_encoding(self, path, block_size=65536):
+        """
+        Кодировка файла: проверяется весь файл до выдачи первой строки,
+        иначе ошибка декодирования в конце файла привела бы к повторному
+        чтению уже выданных строк.
+
+        Args:
+            path: путь к файлу
+            block_size: размер читаемого блока в байтах
+
+        Returns:
+            str: 'utf-8-sig' или 'cp1251'
+        """
+        for encoding in ('utf-8-sig', 'cp1251'):
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(block_size), b''):
+                        decoder.decode(block)
+                decoder.decode(b'', final=True)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("Не удалось определить кодировку файла")
+
+    def _iter_xlsx(self, path):
+        """Чтение первого листа XLSX в потоковом режиме"""
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Для импорта XLSX установите пакет openpyxl")
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for line, values in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+                yield line, list(values)
+        finally:
+            workbook.close()
+
+    def _map_header(self, values):
+        """Сопоставление колонок файла с полями сделки"""
+        names = [str(value).strip().lower() if value is not None else '' for value in values]
+        header = {}
+        for field, aliases in self.COLUMN_ALIASES.items():
+            for index, name in enumerate(names):
+                if name in aliases:
+                    header[field] = index
+                    break
+
+        missing = [field for field in ('date', 'ticker', 'operation', 'quantity', 'price') if field not in header]
+        if missing:
+            raise ValueError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+        return header
+
+    def _parse_number(self, value):
+        """Разбор числа с учетом русского формата (пробелы в разрядах, запятая)"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        text = str(value).replace('\xa0', '').replace(' ', '').replace(',', '.')
+        return float(text)
+
+    def _parse_date(self, value):
+        """Разбор даты сделки"""
+        if isinstance(value, datetime):
+            return value
+        text = str(value).strip()
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+        for date_format in self.DATE_FORMATS:
+            try:
+                return datetime.strptime(text, date_format)
+            except ValueError:
+                continue
+        raise ValueError(f"неизвестный формат даты '{text}'")
+
+    def parse_row(self, row):
+        """
+        Проверка и разбор одной строки отчета.
+
+        Args:
+            row: словарь {поле: значение}
+
+        Returns:
+            dict: сделка (комиссия None, если в отчете ее нет)
+        """
+        ticker = str(row.get('ticker') or '').strip().upper()
+        if not ticker:
+            raise ValueError("пустой тикер")
+
+        operation_text = str(row.get('operation') or '').strip().lower()
+        operation = next((name for name, aliases in self.OPERATION_ALIASES.items()
+                          if operation_text in aliases), None)
+        if operation is None:
+            raise ValueError(f"неизвестная операция '{operation_text}'")
+
+        quantity = self._parse_number(row.get('quantity'))
+        price = self._parse_number(row.get('price'))
+        if quantity <= 0 or quantity != int(quantity) or price <= 0:
+            raise ValueError("количество должно быть целым положительным, цена - положительной")
+
+        commission = row.get('commission')
+        return {
+            'date': self._parse_date(row.get('date')),
+            'ticker': ticker,
+            'operation': operation,
+            'quantity': int(quantity),
+            'price': price,
+            'commission': None if commission in (None, '') else self._parse_number(commission)
+        }
+
+    def read_transactions(self, path, progress=None):
+        """
+        Чтение и проверка отчета пачками по chunk_size строк.
+        Не изменяет портфель, поэтому может выполняться в фоновом потоке.
+
+        Args:
+            path: путь к файлу
+            progress: функция progress(количество разобранных строк)
+
+        Returns:
+            tuple: (список сделок, список ошибок 'строка N: причина')
+        """
+        transactions = []
+        errors = []
+        chunk = []
+
+        def flush():
+            parsed = []
+            for line, row in chunk:
+                try:
+                    parsed.append(self.parse_row(row))
+                except (ValueError, TypeError) as e:
+                    errors.append(f"строка {line}: {e}")
+            self._fill_commissions(parsed)
+            transactions.extend(parsed)
+            chunk.clear()
+            if progress:
+                progress(len(transactions) + len(errors))
+
+        for line, row in self.iter_rows(path):
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                flush()
+        flush()
+
+        transactions.sort(key=lambda transaction: transaction['date'])
+        return transactions, errors
+
+    def _fill_commissions(self, transactions):
+        """Оценка отсутствующих в отчете комиссий одним векторным расчетом на пачку"""
+        missing = [t for t in transactions if t['commission'] is None]
+        if not missing:
+            return
+        commission_manager = self.portfolio_manager.commission_manager
+        amounts = np.array([t['quantity'] * t['price'] for t in missing])
+        # Индивидуальные условия тикеров считаются отдельно, остальное - профилем акций
+        costs = commission_manager.schedule.batch_costs(amounts)
+        for transaction, cost in zip(missing, costs):
+            if transaction['ticker'] in commission_manager.ticker_schedules:
+                cost = commission_manager.get_schedule(transaction['ticker']).total(
+                    transaction['quantity'] * transaction['price'])
+            transaction['commission'] = float(cost)
+
+    def apply_transactions(self, transactions):
+        """
+        Применение сделок к портфелю и истории одной транзакцией:
+        изменения собираются на копии позиций и фиксируются только целиком.
+        Сделки, уже записанные в истории (те же дата, тикер, операция,
+        количество и цена), пропускаются - повторный импорт отчета
+        не удваивает позиции.
+
+        Args:
+            transactions: сделки, отсортированные по дате
+
+        Returns:
+            tuple: (количество примененных сделок, список ошибок, количество пропущенных повторов)
+        """
+        manager = self.portfolio_manager
+        recorded = {self._transaction_key(t) for t in manager.transaction_manager.transaction_history}
+        duplicates = 0
+        positions = {stock['ticker']: copy.deepcopy(stock) for stock in manager.portfolio_data}
+        order = [stock['ticker'] for stock in manager.portfolio_data]
+        applied = []
+        errors = []
+
+        for transaction in transactions:
+            if self._transaction_key(transaction) in recorded:
+                duplicates += 1
+                continue
+            ticker = transaction['ticker']
+            quantity = transaction['quantity']
+            amount = quantity * transaction['price']
+            position = positions.get(ticker)
+
+            if transaction['operation'] == 'buy':
+                if position is None:
+                    position = positions[ticker] = {
+                        'ticker': ticker,
+                        'quantity': 0,
+                        'buy_price': transaction['price'],
+                        'commission': 0.0,
+                        'total_cost': 0.0,
+                        'added_date': transaction['date'].isoformat()
+                    }
+                    order.append(ticker)
+                position['quantity'] += quantity
+                position['commission'] = position.get('commission', 0) + transaction['commission']
+                position['total_cost'] = position.get('total_cost', 0) + amount + transaction['commission']
+                position['buy_price'] = (position['total_cost'] - position['commission']) / position['quantity']
+            else:
+                if position is None or position['quantity'] < quantity:
+                    available = position['quantity'] if position else 0
+                    errors.append(f"{transaction['date']:%d.%m.%Y} {ticker}: продажа {quantity} шт., "
+                                  f"в портфеле {available} шт.")
+                    continue
+                # Расходы позиции уменьшаются пропорционально проданной доле (средняя цена не меняется)
+                remaining_share = (position['quantity'] - quantity) / position['quantity']
+                position['quantity'] -= quantity
+                position['commission'] = position.get('commission', 0) * remaining_share
+                position['total_cost'] = position.get('total_cost', 0) * remaining_share
+            applied.append(transaction)
+
+        # Фиксация: позиции, история операций и журнал лотов меняются разом
+        manager.portfolio_data[:] = [positions[ticker] for ticker in order
+                                     if ticker in positions and positions[ticker]['quantity'] > 0]
+        for stock in manager.portfolio_data:
+            manager.calculate_stock_values(stock)
+
+        history = manager.transaction_manager.transaction_history
+        history.extend({
+            'date': t['date'].isoformat(),
+            'ticker': t['ticker'],
+            'operation': t['operation'],
+            'quantity': t['quantity'],
+            'price': t['price'],
+            'total': t['quantity'] * t['price'],
+            'commission': t['commission']
+        } for t in applied)
+        history.sort(key=lambda t: t['date'])
+
+        manager.transaction_manager.save_transaction_history()
+        manager.save_portfolio_data()
+        manager.rebuild_lot_ledger()
+        return len(applied), errors, duplicates
+
+    def _transaction_key(self, transaction):
+        """Ключ сделки для поиска повторов: дата, тикер, операция, количество, цена"""
+        date = transaction['date']
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        return (date, transaction['ticker'], transaction['operation'],
+                int(transaction['quantity']), float(transaction['price']))
+
+    def show_import_dialog(self, parent_window, on_imported=None):
+        """
+        Выбор файла и импорт сделок: разбор в фоне, применение в потоке интерфейса.
+
+        Args:
+            parent_window: родительское окно
+            on_imported: функция, вызываемая после успешного импорта
+        """
+        path = filedialog.askopenfilename(
+            parent=parent_window,
+            title="Импорт сделок из отчета брокера",
+            filetypes=[("Отчеты брокера", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not path:
+            return
+
+        progress_window = tk.Toplevel(parent_window)
+        progress_window.title("Импорт сделок")
+        progress_window.geometry("300x150")
+        progress_window.transient(parent_window)
+        progress_window.grab_set()
+
+        ttk.Label(progress_window, text=f"Разбор отчета {os.path.basename(path)}...").pack(pady=10)
+        # Число строк в отчете заранее неизвестно - показываем количество разобранных
+        progress = ttk.Progressbar(progress_window, mode='indeterminate')
+        progress.pack(pady=10, padx=20, fill=tk.X)
+        progress.start()
+
+        status_label = ttk.Label(progress_window, text="")
+        status_label.pack()
+
+        def read(job):
+            # Выполняется в рабочем потоке - с виджетами работаем только через job
+            def report(count):
+                job.check_cancelled()
+                job.progress(count, None, f"Разобрано строк: {count}")
+            return self.read_transactions(path, report)
+
+        def show_progress(done, total, message):
+            status_label.config(text=message)
+
+        def apply(result):
+            progress_window.destroy()
+            transactions, errors = result
+            if not transactions:
+                messagebox.showerror("Импорт", "В файле нет корректных сделок\n\n" + "\n".join(errors[:20]))
+                return
+
+            if errors and not messagebox.askyesno(
+                    "Импорт",
+                    f"Корректных сделок: {len(transactions)}, строк с ошибками: {len(errors)}\n\n"
+                    + "\n".join(errors[:20]) + "\n\nИмпортировать корректные сделки?"):
+                return
+
+            applied_count, apply_errors, duplicates = self.apply_transactions(transactions)
+            message = f"Импортировано сделок: {applied_count}"
+            if duplicates:
+                message += f"\nПропущено сделок, уже записанных в истории: {duplicates}"
+            if apply_errors:
+                message += f"\nПропущено продаж без позиции: {len(apply_errors)}\n\n" + "\n".join(apply_errors[:20])
+            messagebox.showinfo("Импорт", message)
+
+            if on_imported:
+                on_imported()
+
+        def fail(error):
+            progress_window.destroy()
+            messagebox.showerror("Ошибка", f"Не удалось импортировать файл: {error}")
+
+        def cancel_import():
+            progress_window.destroy()
+            messagebox.showinfo("Импорт", "Импорт отменен")
+
+        job = BackgroundJobRunner(progress_window).submit(read, on_progress=show_progress, on_done=apply,
+                                                          on_error=fail, on_cancel=cancel_import)
+
+        ttk.Button(progress_window, text="Отмена", command=job.cancel).pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", job.cancel)
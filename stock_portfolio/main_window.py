@@ -1,29 +1,45 @@
 # portfolio/main_window.py
 import tkinter as tk
+from tkinter import messagebox
+from background_jobs import BackgroundJobRunner
+from quote_bus import get_quote_bus
 from .portfolio_stock_manager import PortfolioManager
 from .ui_components import UIComponents
 from .chart_manager import ChartManager
 
 class PortfolioWindow:
-    def __init__(self, parent, data_handler=None):
+    def __init__(self, parent, data_handler=None, workspace=None, portfolio_name=None):
         self.parent = parent
         self.data_handler = data_handler
         self.window = tk.Toplevel(parent)
-        self.window.title("Мой портфель акций")
+        self.window.title(f"Мой портфель акций - {portfolio_name}" if portfolio_name else "Мой портфель акций")
         self.window.geometry("1300x700")
         self.window.minsize(1000, 500)
         
         # Менеджеры
-        self.portfolio_manager = PortfolioManager(data_handler, self.window)
+        if workspace is not None:
+            # Именованный портфель рабочей области: объект общий для всех окон счета
+            self.portfolio_manager = workspace.open(portfolio_name)
+            self.portfolio_manager.data_handler = data_handler
+            self.portfolio_manager.parent = self.window
+        else:
+            self.portfolio_manager = PortfolioManager(data_handler, self.window)
         self.ui_components = UIComponents(self.window, self.portfolio_manager, self)
         self.chart_manager = ChartManager(self.portfolio_manager)
         # Создание интерфейса
         self.ui_components.create_widgets()
         
+        self.job_runner = BackgroundJobRunner(self.window)
+        
         # Обновление цен при открытии
-        self.portfolio_manager.update_all_prices()
+        self.update_all_prices()
         self.portfolio_manager.load_imoex_data()
         
+        # Живое обновление цен через общую шину котировок
+        self.quote_subscription = get_quote_bus().subscribe(
+            self.window, lambda: [stock['ticker'] for stock in self.portfolio_manager.portfolio_data],
+            self.on_quotes)
+        
         self.window.protocol("WM_DELETE_WINDOW", self.close)
     
     # Методы для вызова из UI
@@ -50,21 +66,75 @@ class PortfolioWindow:
         self.ui_components.update_sell_ticker_combo()
     
     def update_all_prices(self):
-        """Обновление всех цен и обновление UI"""
-        self.portfolio_manager.update_all_prices()
-        self.ui_components.refresh_table()
+        """Обновление всех цен в фоне и обновление UI"""
+        if not self.portfolio_manager.portfolio_data:
+            messagebox.showinfo("Информация", "Портфель пуст")
+            return
+        
+        def commit_prices(quotes):
+            # Все котировки применяются разом в потоке интерфейса
+            updated_count = self.portfolio_manager.apply_quotes(quotes)
+            self.ui_components.refresh_table()
+            self.ui_components.update_statistics()
+            messagebox.showinfo("Обновление", 
+                              f"Цены обновлены для {updated_count} из {len(self.portfolio_manager.portfolio_data)} акций")
+        
+        def fail_update(error):
+            messagebox.showerror("Ошибка", f"Не удалось обновить цены: {error}")
+        
+        self.job_runner.submit(lambda job: self.portfolio_manager.fetch_quotes(),
+                               on_done=commit_prices, on_error=fail_update)
+    
+    def on_quotes(self, quotes):
+        """Переоценка позиций по котировкам из шины (вызывается в потоке интерфейса)"""
+        for stock in self.portfolio_manager.portfolio_data:
+            quote = quotes.get(stock['ticker'])
+            # Котировки без цены (например, вне торгов) не сбрасывают текущую оценку
+            if quote and (quote.get('LAST') or quote.get('LCURRENTPRICE')):
+                self.portfolio_manager.apply_quote(stock, quote)
+        self.ui_components.refresh_values()
         self.ui_components.update_statistics()
     
+    def import_transactions(self):
+        """Импорт сделок из отчета брокера с последующим обновлением цен"""
+        from .import_manager import ImportManager
+        
+        def on_imported():
+            self.ui_components.refresh_table()
+            self.ui_components.update_statistics()
+            self.ui_components.update_sell_ticker_combo()
+            # Одно пакетное обновление цен для всех импортированных позиций
+            if self.portfolio_manager.portfolio_data:
+                self.update_all_prices()
+        
+        ImportManager(self.portfolio_manager).show_import_dialog(self.window, on_imported)
+    
     def show_index_comparison(self):
         """Показать сравнение с индексом"""
         from .comparison_manager import ComparisonManager
         comparison_manager = ComparisonManager(self.portfolio_manager)
         comparison_manager.show_index_comparison(self.window)
     
+    def show_benchmark_analytics(self):
+        """Показать метрики портфеля относительно индекса"""
+        from .comparison_manager import ComparisonManager
+        comparison_manager = ComparisonManager(self.portfolio_manager)
+        comparison_manager.show_benchmark_analytics(self.window)
+    
     def show_transaction_history(self):
         """Показать историю транзакций"""
         self.portfolio_manager.transaction_manager.show_transaction_history(self.window)
     
+    def show_tax_report(self):
+        """Показать налоговый отчет по лотам FIFO"""
+        self.portfolio_manager.transaction_manager.show_tax_report(self.window)
+    
+    def show_backtest(self):
+        """Показать бэктест портфеля по истории операций"""
+        from .backtest_manager import BacktestManager
+        backtest_manager = BacktestManager(self.portfolio_manager)
+        backtest_manager.show_backtest(self.window)
+    
     def add_dividend_payment(self):
         """Добавить дивидендную выплату"""
         self.portfolio_manager.dividend_manager.add_dividend_payment(self.window)
@@ -103,5 +173,7 @@ class PortfolioWindow:
     
     def close(self):
         """Закрытие окна с сохранением данных"""
+        self.job_runner.cancel_all()
+        self.quote_subscription.cancel()
         self.portfolio_manager.save_portfolio_data()
         self.window.destroy()
\ No newline at end of file
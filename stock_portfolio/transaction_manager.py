@@ -1,73 +1,27 @@
-# Менеджер транзакций - история операций покупки/продажи
-import json
-import os
+# Менеджер транзакций - окна истории операций и налогового отчета
 from datetime import datetime
 from tkinter import messagebox, ttk
 import tkinter as tk
+from core.transactions import TransactionStore
+from export_manager import export_rows
 
-class TransactionManager:
+class TransactionManager(TransactionStore):
     """
-    Управление историей транзакций: запись, отображение, очистка операций.
+    Отображение и очистка истории транзакций; хранение - в TransactionStore.
     """
     
-    def __init__(self, portfolio_manager):
+    OPERATION_NAMES = {'buy': "Покупка", 'sell': "Продажа", 'close': "Закрытие позиции"}
+    
+    def __init__(self, portfolio_manager, data_dir=None):
         """
         Инициализация менеджера транзакций.
         
         Args:
             portfolio_manager: ссылка на менеджер портфеля
+            data_dir: каталог файлов портфеля (по умолчанию - текущий)
         """
         self.portfolio_manager = portfolio_manager
-        self.transaction_history = []
-        self.load_transaction_history()
-    
-    def load_transaction_history(self):
-        """Загрузка истории транзакций из JSON файла"""
-        try:
-            if os.path.exists('transaction_history.json'):
-                with open('transaction_history.json', 'r', encoding='utf-8') as f:
-                    self.transaction_history = json.load(f)
-        except Exception as e:
-            print(f"Ошибка загрузки истории транзакций: {e}")
-            self.transaction_history = []
-    
-    def save_transaction_history(self):
-        """Сохранение истории транзакций в JSON файл"""
-        try:
-            with open('transaction_history.json', 'w', encoding='utf-8') as f:
-                json.dump(self.transaction_history, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Ошибка сохранения истории транзакций: {e}")
-    
-    def record_transaction(self, ticker, operation, quantity, price):
-        """
-        Запись транзакции в историю.
-        
-        Args:
-            ticker: тикер акции
-            operation: тип операции ('buy' или 'sell')
-            quantity: количество акций
-            price: цена за акцию
-        """
-        try:
-            # Создаем запись о транзакции
-            transaction = {
-                'date': datetime.now().isoformat(),
-                'ticker': ticker,
-                'operation': operation,
-                'quantity': quantity,
-                'price': price,
-                'total': quantity * price
-            }
-            
-            # Добавляем в историю
-            self.transaction_history.append(transaction)
-            
-            # Сохраняем историю
-            self.save_transaction_history()
-                
-        except Exception as e:
-            print(f"Ошибка сохранения истории транзакций: {e}")
+        super().__init__(data_dir)
     
     def show_transaction_history(self, parent_window):
         """Показать историю транзакций"""
@@ -106,7 +60,7 @@ class TransactionManager:
             
             # Заполняем данными (последние 100 операций)
             for transaction in reversed(self.transaction_history[-100:]):
-                operation_text = "Покупка" if transaction['operation'] == 'buy' else "Продажа"
+                operation_text = self.OPERATION_NAMES.get(transaction['operation'], transaction['operation'])
                 
                 date_obj = datetime.fromisoformat(transaction['date'])
                 date_str = date_obj.strftime("%d.%m.%Y %H:%M")
@@ -131,6 +85,8 @@ class TransactionManager:
             button_frame = ttk.Frame(history_window)
             button_frame.pack(fill=tk.X, pady=10)
             
+            ttk.Button(button_frame, text="Экспорт",
+                      command=lambda: self.export_transaction_history(history_window)).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="Очистить историю", 
                       command=lambda: self.clear_transaction_history(history_window)).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="Закрыть", 
@@ -139,6 +95,31 @@ class TransactionManager:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить историю операций: {e}")
     
+    def export_transaction_history(self, parent_window):
+        """
+        Экспорт всей истории операций в CSV/Parquet в фоновом потоке.
+        
+        Args:
+            parent_window: родительское окно
+        """
+        headers = ["Дата и время", "Тикер", "Операция", "Количество", "Цена", "Сумма", "Комиссия"]
+        # Снимок истории; строки формируются генератором при записи
+        transactions = list(self.transaction_history)
+        
+        def make_rows():
+            for transaction in transactions:
+                yield [
+                    transaction['date'],
+                    transaction['ticker'],
+                    transaction['operation'],
+                    transaction['quantity'],
+                    transaction['price'],
+                    round(transaction.get('total', transaction['quantity'] * transaction['price']), 2),
+                    round(transaction.get('commission') or 0, 2)
+                ]
+        
+        export_rows(parent_window, "transaction_history", headers, make_rows, "Экспорт истории операций")
+    
     def clear_transaction_history(self, parent_window):
         """
         Очистка всей истории транзакций.
@@ -148,21 +129,63 @@ class TransactionManager:
         """
         if messagebox.askyesno("Подтверждение", "Очистить всю историю операций?"):
             try:
-                self.transaction_history.clear()
-                self.save_transaction_history()
+                self.clear()
+                self.portfolio_manager.rebuild_lot_ledger()
                 messagebox.showinfo("Успех", "История операций очищена")
                 parent_window.destroy()
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось очистить историю: {e}")
     
-    def get_recent_transactions(self, limit=100):
-        """
-        Получение последних транзакций.
+    def show_tax_report(self, parent_window):
+        """Показать налоговый отчет по годам (FIFO по лотам)"""
+        ledger = self.portfolio_manager.lot_ledger
+        report = ledger.tax_report()
+        if not report:
+            messagebox.showinfo("Налоговый отчет", "Продаж в истории операций нет")
+            return
         
-        Args:
-            limit: количество последних транзакций
-            
-        Returns:
-            list: список последних транзакций
-        """
-        return list(reversed(self.transaction_history[-limit:]))
\ No newline at end of file
+        report_window = tk.Toplevel(parent_window)
+        report_window.title("Налоговый отчет (FIFO)")
+        report_window.geometry("900x500")
+        
+        main_frame = ttk.Frame(report_window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=(f"Расчет по лотам методом FIFO, ставка {ledger.tax_rate * 100:.0f}%. "
+                                    f"Льгота: {ledger.EXEMPTION_PER_YEAR:,.0f} руб за год владения "
+                                    f"от {ledger.EXEMPTION_YEARS} лет").replace(',', ' '),
+                 font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        columns = ("year", "proceeds", "cost", "gain", "exemption", "taxable", "tax")
+        tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=12)
+        
+        headers = {
+            "year": "Год",
+            "proceeds": "Выручка",
+            "cost": "Расходы",
+            "gain": "Прибыль",
+            "exemption": "Льгота ЛДВ",
+            "taxable": "Налоговая база",
+            "tax": "Налог"
+        }
+        
+        for col in columns:
+            tree.heading(col, text=headers[col])
+            tree.column(col, width=110, minwidth=90)
+        
+        for row in report:
+            tree.insert("", tk.END, values=(
+                row['year'],
+                f"{row['proceeds']:,.2f}",
+                f"{row['cost']:,.2f}",
+                f"{row['gain']:+,.2f}",
+                f"{row['exemption']:,.2f}",
+                f"{row['taxable']:,.2f}",
+                f"{row['tax']:,.2f}"
+            ))
+        
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(main_frame, text=f"Итого налог: {sum(row['tax'] for row in report):,.2f} руб",
+                 font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(10, 0))
+        ttk.Button(main_frame, text="Закрыть", command=report_window.destroy).pack(pady=10)
@@ -1,6 +1,7 @@
 # portfolio/ui_components.py
 import tkinter as tk
 from tkinter import ttk
+from commission_window import show_commission_settings
 
 class UIComponents:
     def __init__(self, parent_window, portfolio_manager, portfolio_window):
@@ -54,6 +55,7 @@ class UIComponents:
         self.menu_bar.add_cascade(label="Операции", menu=operations_menu)
         operations_menu.add_command(label="Купить/Добавить", command=self.portfolio_window.add_stock)
         operations_menu.add_command(label="Продать", command=self.portfolio_window.sell_stock)
+        operations_menu.add_command(label="Импорт сделок (CSV/XLSX)", command=lambda: self.portfolio_window.import_transactions())
         operations_menu.add_separator()
         operations_menu.add_command(label="Добавить дивиденды", command=lambda: self.portfolio_window.add_dividend_payment())
         
@@ -63,13 +65,14 @@ class UIComponents:
         management_menu.add_command(label="Удалить выбранное", command=self.portfolio_window.delete_selected)
         management_menu.add_command(label="Очистить портфель", command=self.portfolio_window.clear_portfolio)
         management_menu.add_separator()
-        management_menu.add_command(label="Настройки комиссий", command=self.portfolio_manager.commission_manager.show_commission_settings)
+        management_menu.add_command(label="Настройки комиссий", command=lambda: show_commission_settings(self.window))
         
         # Меню "Аналитика"
         analytics_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="Аналитика", menu=analytics_menu)
         analytics_menu.add_command(label="Обновить все цены", command=self.portfolio_window.update_all_prices)
         analytics_menu.add_command(label="Сравнить с IMOEX", command=lambda: self.portfolio_window.show_index_comparison())
+        analytics_menu.add_command(label="Бета и альфа к IMOEX", command=lambda: self.portfolio_window.show_benchmark_analytics())
         analytics_menu.add_command(label="Графики портфеля", command=lambda: self.portfolio_window.show_portfolio_charts())
         
         # Меню "Отчеты"
@@ -77,6 +80,8 @@ class UIComponents:
         self.menu_bar.add_cascade(label="Отчеты", menu=reports_menu)
         reports_menu.add_command(label="История операций", command=lambda: self.portfolio_window.show_transaction_history())
         reports_menu.add_command(label="История дивидендов", command=lambda: self.portfolio_window.show_dividend_history())
+        reports_menu.add_command(label="Бэктест портфеля", command=lambda: self.portfolio_window.show_backtest())
+        reports_menu.add_command(label="Налоговый отчет (FIFO)", command=lambda: self.portfolio_window.show_tax_report())
         reports_menu.add_separator()
         reports_menu.add_command(label="Экспорт в CSV", command=self.portfolio_window.export_to_csv)
     
@@ -244,41 +249,51 @@ class UIComponents:
             # Убедимся, что все расчеты выполнены
             self.portfolio_manager.calculate_stock_values(stock)
             
-            # Получаем рассчитанные значения
-            capital_gain = stock.get('capital_gain', 0)
-            dividend_income = stock.get('dividend_income', 0)
-            total_profit = stock.get('total_profit', 0)
-            total_profit_percent = stock.get('total_profit_percent', 0)
-            
-            item = self.tree.insert("", tk.END, values=(
-                stock['ticker'],
-                stock.get('name', ''),
-                stock['quantity'],
-                f"{stock['buy_price']:.2f}",
-                f"{stock.get('commission', 0):.2f}",
-                f"{stock.get('total_cost', 0):.2f}",
-                f"{stock.get('current_price', 0):.2f}",
-                f"{stock.get('current_value', 0):.2f}",
-                f"{capital_gain:+.2f}",
-                f"{dividend_income:+.2f}",
-                f"{total_profit:+.2f}",
-                f"{total_profit_percent:+.2f}%"
-            ))
-            
-            # Устанавливаем теги для цветового оформления
-            profit_tags = []
-            if capital_gain >= 0:
-                profit_tags.append('capital_gain_positive')
-            else:
-                profit_tags.append('capital_gain_negative')
-                
-            if total_profit >= 0:
-                profit_tags.append('total_profit_positive')
-            else:
-                profit_tags.append('total_profit_negative')
+            self.tree.insert("", tk.END, values=self._row_values(stock), tags=self._row_tags(stock))
+    
+    def refresh_values(self):
+        """
+        Обновление значений существующих строк без перестройки таблицы
+        (сохраняет выделение и прокрутку при живом обновлении цен).
+        """
+        items = self.tree.get_children()
+        if len(items) != len(self.portfolio_manager.portfolio_data):
+            self.refresh_table()
+            return
+        
+        for item, stock in zip(items, self.portfolio_manager.portfolio_data):
+            self.tree.item(item, values=self._row_values(stock), tags=self._row_tags(stock))
+    
+    def _row_values(self, stock):
+        """Значения строки таблицы для акции"""
+        return (
+            stock['ticker'],
+            stock.get('name', ''),
+            stock['quantity'],
+            f"{stock['buy_price']:.2f}",
+            f"{stock.get('commission', 0):.2f}",
+            f"{stock.get('total_cost', 0):.2f}",
+            f"{stock.get('current_price', 0):.2f}",
+            f"{stock.get('current_value', 0):.2f}",
+            f"{stock.get('capital_gain', 0):+.2f}",
+            f"{stock.get('dividend_income', 0):+.2f}",
+            f"{stock.get('total_profit', 0):+.2f}",
+            f"{stock.get('total_profit_percent', 0):+.2f}%"
+        )
+    
+    def _row_tags(self, stock):
+        """Теги для цветового оформления строки"""
+        profit_tags = []
+        if stock.get('capital_gain', 0) >= 0:
+            profit_tags.append('capital_gain_positive')
+        else:
+            profit_tags.append('capital_gain_negative')
             
-            if profit_tags:
-                self.tree.item(item, tags=profit_tags)
+        if stock.get('total_profit', 0) >= 0:
+            profit_tags.append('total_profit_positive')
+        else:
+            profit_tags.append('total_profit_negative')
+        return profit_tags
     
     def update_statistics(self):
         """
@@ -0,0 +1,166 @@
+# portfolio/workspace_window.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from background_jobs import BackgroundJobRunner
+from core.errors import PortfolioError
+from core.workspace import get_workspace
+from .portfolio_stock_manager import PortfolioManager
+
+
+class WorkspaceWindow:
+    """
+    Окно счетов: список именованных портфелей рабочей области,
+    создание, открытие, удаление и переоценка всех счетов разом.
+    """
+
+    def __init__(self, parent, data_handler=None):
+        """
+        Инициализация окна.
+
+        Args:
+            parent: родительское окно
+            data_handler: обработчик данных для API
+        """
+        self.parent = parent
+        self.data_handler = data_handler
+        # Общая рабочая область процесса; портфели открываются как PortfolioManager
+        self.workspace = get_workspace(portfolio_class=PortfolioManager)
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Счета")
+        self.window.geometry("700x400")
+
+        self.job_runner = BackgroundJobRunner(self.window)
+        self.create_widgets()
+        self.refresh()
+
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def create_widgets(self):
+        """Создание элементов окна"""
+        main_frame = ttk.Frame(self.window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        columns = ("Счет", "Позиций", "Стоимость", "Прибыль", "Прибыль %")
+        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=12)
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=110, anchor=tk.E)
+        self.tree.column("Счет", width=200, anchor=tk.W)
+        self.tree.bind("<Double-1>", lambda event: self.open_selected())
+
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        self.total_label = ttk.Label(main_frame, text="")
+        self.total_label.pack(fill=tk.X, pady=5)
+
+        create_frame = ttk.Frame(main_frame)
+        create_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Label(create_frame, text="Новый счет:").pack(side=tk.LEFT)
+        self.name_var = tk.StringVar()
+        ttk.Entry(create_frame, textvariable=self.name_var, width=25).pack(side=tk.LEFT, padx=5)
+        ttk.Button(create_frame, text="Создать", command=self.create_portfolio).pack(side=tk.LEFT, padx=5)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Button(button_frame, text="Открыть", command=self.open_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Удалить", command=self.delete_selected).pack(side=tk.LEFT, padx=5)
+        self.revalue_button = ttk.Button(button_frame, text="Переоценить все", command=self.revalue_all)
+        self.revalue_button.pack(side=tk.LEFT, padx=5)
+
+    def refresh(self):
+        """Обновление таблицы счетов и итога"""
+        self.tree.delete(*self.tree.get_children())
+        try:
+            statistics = self.workspace.statistics()
+        except Exception as e:
+            print(f"Ошибка загрузки счетов: {e}")
+            return
+
+        for name, stats in statistics['portfolios'].items():
+            self.tree.insert("", tk.END, iid=name, values=(
+                name,
+                len(self.workspace.open(name).portfolio_data),
+                f"{stats['total_current_value']:,.2f}",
+                f"{stats['total_profit']:+,.2f}",
+                f"{stats['total_profit_percent']:+.2f}%"
+            ))
+
+        self.total_label.config(text=f"Итого: стоимость {statistics['total_current_value']:,.2f} руб, "
+                                     f"прибыль {statistics['total_profit']:+,.2f} руб")
+
+    def selected_name(self):
+        """Имя выбранного счета или None"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Внимание", "Выберите счет", parent=self.window)
+            return None
+        return selection[0]
+
+    def create_portfolio(self):
+        """Создание счета с именем из поля ввода"""
+        name = self.name_var.get().strip()
+        if not name:
+            messagebox.showerror("Ошибка", "Введите имя счета", parent=self.window)
+            return
+        try:
+            self.workspace.create(name)
+        except (PortfolioError, OSError) as e:
+            messagebox.showerror("Ошибка", str(e), parent=self.window)
+            return
+        self.name_var.set("")
+        self.refresh()
+
+    def open_selected(self):
+        """Открытие окна выбранного счета"""
+        name = self.selected_name()
+        if name is None:
+            return
+        from .main_window import PortfolioWindow
+        PortfolioWindow(self.parent, self.data_handler, self.workspace, name)
+
+    def delete_selected(self):
+        """Удаление выбранного счета вместе с файлами"""
+        name = self.selected_name()
+        if name is None:
+            return
+        if not messagebox.askyesno("Подтверждение",
+                                   f"Удалить счет {name} вместе с историей операций?", parent=self.window):
+            return
+        try:
+            self.workspace.delete(name)
+        except (PortfolioError, OSError) as e:
+            messagebox.showerror("Ошибка", str(e), parent=self.window)
+        self.refresh()
+
+    def revalue_all(self):
+        """Переоценка всех счетов одним пакетным запросом котировок"""
+        if not self.workspace.all_tickers():
+            messagebox.showinfo("Информация", "Во всех счетах нет позиций", parent=self.window)
+            return
+
+        def commit_prices(quotes):
+            # Котировки применяются в потоке интерфейса, как и в окне портфеля
+            updated = self.workspace.apply_quotes(quotes)
+            self.revalue_button.config(state=tk.NORMAL)
+            self.refresh()
+            messagebox.showinfo("Обновление",
+                                f"Цены обновлены: {sum(updated.values())} позиций в {len(updated)} счетах",
+                                parent=self.window)
+
+        def fail_update(error):
+            self.revalue_button.config(state=tk.NORMAL)
+            messagebox.showerror("Ошибка", f"Не удалось обновить цены: {error}", parent=self.window)
+
+        self.revalue_button.config(state=tk.DISABLED)
+        self.job_runner.submit(lambda job: self.workspace.fetch_quotes(),
+                               on_done=commit_prices, on_error=fail_update)
+
+    def close(self):
+        """Закрытие окна"""
+        self.job_runner.cancel_all()
+        self.window.destroy()
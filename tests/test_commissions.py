@@ -0,0 +1,159 @@
+# tests/test_commissions.py
+import unittest
+
+from core import commissions
+from core.commissions import CommissionManager, CommissionSchedule, get_commission_manager
+
+BASE_SETTINGS = {
+    'broker_commission': 0.3,
+    'exchange_commission': 0.01,
+    'min_commission': 0.0,
+    'tax_rate': 13.0,
+    'other_costs': 0.0
+}
+TIERS = [{'turnover': 1_000_000, 'broker_commission': 0.1},
+         {'turnover': 100_000, 'broker_commission': 0.2}]
+
+
+class CommissionScheduleTest(unittest.TestCase):
+    """Ступени ставки брокера по обороту"""
+
+    def setUp(self):
+        self.schedule = CommissionSchedule({**BASE_SETTINGS, 'tiers': TIERS})
+
+    def test_tier_boundaries(self):
+        # Порог ступени включается в нее (bisect_right)
+        self.assertAlmostEqual(self.schedule.rate_for(0), 0.003)
+        self.assertAlmostEqual(self.schedule.rate_for(99_999.99), 0.003)
+        self.assertAlmostEqual(self.schedule.rate_for(100_000), 0.002)
+        self.assertAlmostEqual(self.schedule.rate_for(999_999.99), 0.002)
+        self.assertAlmostEqual(self.schedule.rate_for(1_000_000), 0.001)
+        self.assertAlmostEqual(self.schedule.rate_for(10_000_000), 0.001)
+
+    def test_turnover_selects_tier_for_small_trade(self):
+        self.assertAlmostEqual(self.schedule.total(10_000), 10_000 * (0.003 + 0.0001))
+        self.assertAlmostEqual(self.schedule.total(10_000, turnover=1_000_000), 10_000 * (0.001 + 0.0001))
+
+    def test_no_tiers_uses_base_rate(self):
+        schedule = CommissionSchedule(BASE_SETTINGS)
+        self.assertEqual(schedule.tier_thresholds, [])
+        self.assertAlmostEqual(schedule.rate_for(10_000_000), 0.003)
+
+
+class BatchCostsTest(unittest.TestCase):
+    """Векторный расчет batch_costs совпадает с поштучным total()"""
+
+    AMOUNTS = [0.0, 50.0, 999.99, 1_000.0, 10_000.0, 99_999.0, 100_000.0, 250_000.0, 5_000_000.0]
+
+    def assert_matches_total(self, schedule, amounts, turnovers=None):
+        costs = schedule.batch_costs(amounts, turnovers)
+        expected = [schedule.total(amount, None if turnovers is None else turnover)
+                    for amount, turnover in zip(amounts, turnovers or amounts)]
+        self.assertEqual(len(costs), len(expected))
+        for cost, value in zip(costs, expected):
+            self.assertAlmostEqual(float(cost), value, places=9)
+
+    def test_without_tiers(self):
+        schedule = CommissionSchedule({**BASE_SETTINGS, 'other_costs': 2.5})
+        self.assert_matches_total(schedule, self.AMOUNTS)
+
+    def test_min_commission(self):
+        # Минимальная комиссия срабатывает у малых сделок и не влияет на крупные
+        schedule = CommissionSchedule({**BASE_SETTINGS, 'min_commission': 3.0, 'tiers': TIERS})
+        self.assert_matches_total(schedule, self.AMOUNTS)
+        self.assertAlmostEqual(float(schedule.batch_costs([100.0])[0]), 3.0 + 100.0 * 0.0001)
+
+    def test_tiers_by_amount(self):
+        schedule = CommissionSchedule({**BASE_SETTINGS, 'tiers': TIERS})
+        self.assert_matches_total(schedule, self.AMOUNTS)
+
+    def test_tiers_by_turnover(self):
+        schedule = CommissionSchedule({**BASE_SETTINGS, 'min_commission': 1.0, 'tiers': TIERS})
+        turnovers = [0.0, 100_000.0, 99_999.99, 1_000_000.0, 5.0, 2_000_000.0, 0.0, 100_000.0, 1_000_000.0]
+        self.assert_matches_total(schedule, self.AMOUNTS, turnovers)
+
+
+class CommissionManagerTest(unittest.TestCase):
+    """Профили инструментов, условия тикеров и общий экземпляр"""
+
+    def setUp(self):
+        self.manager = CommissionManager()
+        self.manager.commission_data = {
+            **BASE_SETTINGS,
+            'tiers': TIERS,
+            'turnover_days': 30,
+            'profiles': {'stock': {}, 'etf': {'broker_commission': 0.05}, 'bond': {}},
+            'overrides': {
+                'SBER': {'broker_commission': 0.02},
+                'FXGD': {'profile': 'etf', 'min_commission': 1.0}
+            }
+        }
+        self.manager.compile_schedule()
+
+    def test_base_tiers_apply_to_stocks_only(self):
+        self.assertEqual(self.manager.get_schedule(instrument_type='stock').tier_thresholds, [100_000, 1_000_000])
+        self.assertEqual(self.manager.get_schedule(instrument_type='etf').tier_thresholds, [])
+        self.assertEqual(self.manager.get_schedule(instrument_type='bond').tier_thresholds, [])
+
+    def test_profile_own_tiers(self):
+        self.manager.commission_data['profiles']['bond'] = {
+            'tiers': [{'turnover': 50_000, 'broker_commission': 0.01}]}
+        self.manager.compile_schedule()
+        self.assertEqual(self.manager.get_schedule(instrument_type='bond').tier_thresholds, [50_000])
+
+    def test_profile_settings(self):
+        etf = self.manager.get_schedule('TMOS', 'etf')
+        self.assertAlmostEqual(etf.broker_rate, 0.0005)
+        self.assertAlmostEqual(etf.exchange_rate, 0.0001)
+
+    def test_ticker_overrides(self):
+        # Тикер наследует профиль своего типа (по умолчанию акции) и его ступени
+        sber = self.manager.get_schedule('sber')
+        self.assertAlmostEqual(sber.broker_rate, 0.0002)
+        self.assertEqual(sber.tier_thresholds, [100_000, 1_000_000])
+
+        # Профиль из условий тикера важнее типа инструмента сделки
+        fxgd = self.manager.get_schedule('FXGD', 'stock')
+        self.assertAlmostEqual(fxgd.broker_rate, 0.0005)
+        self.assertEqual(fxgd.min_commission, 1.0)
+        self.assertEqual(fxgd.tier_thresholds, [])
+
+    def test_unknown_ticker_uses_profile(self):
+        self.assertIs(self.manager.get_schedule('GAZP'), self.manager.profile_schedules['stock'])
+        self.assertIs(self.manager.get_schedule('TMOS', 'etf'), self.manager.profile_schedules['etf'])
+
+    def test_account_turnover_skipped_without_tiers(self):
+        class Store:
+            calls = 0
+
+            def turnover(self, days):
+                Store.calls += 1
+                return 500_000.0
+
+        store = Store()
+        etf = self.manager.get_schedule(instrument_type='etf')
+        self.assertIsNone(self.manager.account_turnover(etf, store, 1_000))
+        self.assertEqual(Store.calls, 0)
+
+        stock = self.manager.get_schedule(instrument_type='stock')
+        self.assertEqual(self.manager.account_turnover(stock, store, 1_000), 501_000.0)
+
+
+class SharedManagerTest(unittest.TestCase):
+    """Общий менеджер комиссий процесса"""
+
+    def setUp(self):
+        self.saved = commissions._shared_manager
+        commissions._shared_manager = None
+
+    def tearDown(self):
+        commissions._shared_manager = self.saved
+
+    def test_shared_instance(self):
+        manager = get_commission_manager()
+        self.assertIsInstance(manager, CommissionManager)
+        self.assertIs(get_commission_manager(), manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_import_manager.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.portfolio import Portfolio
+from stock_portfolio.import_manager import ImportManager
+
+
+class ImportManagerTest(unittest.TestCase):
+    """Импорт отчетов брокера: кодировки и повторный импорт"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.portfolio = Portfolio(data_dir=self.data_dir)
+        self.importer = ImportManager(self.portfolio, chunk_size=50)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def write_report(self, name, content):
+        path = os.path.join(self.data_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_cp1251_after_ascii_rows_is_read_once(self):
+        # Первые строки - чистый ASCII, кириллица (cp1251) только в конце файла
+        lines = ['date;ticker;operation;quantity;price;commission']
+        lines += [f'2024-01-{day % 28 + 1:02d};SBER;buy;1;250;0' for day in range(400)]
+        lines.append('2024-02-01;GAZP;покупка;10;160;0')
+        path = self.write_report('report.csv', '\r\n'.join(lines).encode('cp1251'))
+
+        transactions, errors = self.importer.read_transactions(path)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(transactions), 401)
+        self.assertEqual(transactions[-1]['ticker'], 'GAZP')
+        self.assertEqual(transactions[-1]['operation'], 'buy')
+
+    def test_utf8_report(self):
+        content = 'Дата;Тикер;Операция;Количество;Цена\n01.03.2024;LKOH;продажа;1;7000,5\n'
+        path = self.write_report('report.csv', content.encode('utf-8-sig'))
+
+        transactions, errors = self.importer.read_transactions(path)
+
+        self.assertEqual(errors, [])
+        self.assertEqual([(t['ticker'], t['operation'], t['price']) for t in transactions],
+                         [('LKOH', 'sell', 7000.5)])
+
+    def test_reimport_skips_recorded_transactions(self):
+        content = b'date,ticker,operation,quantity,price,commission\n2024-01-10,SBER,buy,10,250,1\n'
+        path = self.write_report('report.csv', content)
+
+        transactions, _ = self.importer.read_transactions(path)
+        self.assertEqual(self.importer.apply_transactions(transactions), (1, [], 0))
+
+        transactions, _ = self.importer.read_transactions(path)
+        self.assertEqual(self.importer.apply_transactions(transactions), (0, [], 1))
+        self.assertEqual(len(self.portfolio.transaction_manager.transaction_history), 1)
+        self.assertEqual(self.portfolio.find_stock('SBER')['quantity'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
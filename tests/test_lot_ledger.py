@@ -0,0 +1,100 @@
+# tests/test_lot_ledger.py
+import unittest
+from datetime import datetime
+
+from core.lot_ledger import LotLedger
+
+
+class LotLedgerTest(unittest.TestCase):
+    """Списание лотов FIFO, льгота за срок владения и налоговый отчет"""
+
+    def setUp(self):
+        self.ledger = LotLedger(tax_rate=0.13)
+
+    def test_fifo_across_partially_consumed_lots(self):
+        self.ledger.add_lot('SBER', datetime(2024, 1, 10), 10, 100, 10)
+        self.ledger.add_lot('SBER', datetime(2024, 2, 10), 10, 120, 0)
+
+        first = self.ledger.sell('SBER', datetime(2024, 3, 1), 4, 150)
+        second = self.ledger.sell('SBER', datetime(2024, 3, 2), 10, 150)
+
+        self.assertEqual([(f['quantity'], f['buy_price']) for f in first], [(4, 100)])
+        self.assertEqual([(f['quantity'], f['buy_price']) for f in second], [(6, 100), (4, 120)])
+        # Комиссия лота списывается пропорционально проданному количеству
+        self.assertAlmostEqual(first[0]['cost'], 4 * 100 + 4)
+        self.assertAlmostEqual(second[0]['cost'], 6 * 100 + 6)
+        self.assertEqual(self.ledger.open_quantity('SBER'), 6)
+        self.assertEqual(list(self.ledger.lots['SBER'])[0][1:], [6, 120, 0])
+
+    def test_preview_does_not_consume_lots(self):
+        self.ledger.add_lot('SBER', datetime(2024, 1, 10), 10, 100)
+
+        preview = self.ledger.preview_sale('SBER', datetime(2024, 3, 1), 5, 200)
+
+        self.assertAlmostEqual(preview['gain'], 500)
+        self.assertAlmostEqual(preview['tax'], 65)
+        self.assertEqual(self.ledger.open_quantity('SBER'), 10)
+
+    def test_unmatched_quantity_uses_fallback_price(self):
+        fragments = self.ledger.sell('GAZP', datetime(2024, 3, 1), 5, 200, fallback_price=150)
+
+        self.assertEqual(len(fragments), 1)
+        self.assertIsNone(fragments[0]['buy_date'])
+        self.assertAlmostEqual(fragments[0]['gain'], 250)
+
+    def test_long_term_exemption_weighted_by_proceeds(self):
+        # 4 и 3 полных года владения, выручка 2:1 -> Кц = (4*2 + 3*1) / 3
+        self.ledger.add_lot('SBER', datetime(2020, 1, 1), 1, 1_000_000)
+        self.ledger.add_lot('GAZP', datetime(2021, 1, 1), 1, 1_000_000)
+        self.ledger.sell('SBER', datetime(2024, 6, 1), 1, 21_000_000)
+        self.ledger.sell('GAZP', datetime(2024, 6, 1), 1, 11_000_000)
+
+        summary = self.ledger.year_summary(2024)
+        weighted_years = (4 * 21_000_000 + 3 * 11_000_000) / 32_000_000
+
+        self.assertAlmostEqual(summary['gain'], 30_000_000)
+        self.assertAlmostEqual(summary['exemption'], 3_000_000 * weighted_years)
+        self.assertAlmostEqual(summary['tax'], (30_000_000 - 3_000_000 * weighted_years) * 0.13)
+
+    def test_exemption_requires_three_full_years(self):
+        self.ledger.add_lot('SBER', datetime(2021, 6, 2), 1, 100)
+        fragments = self.ledger.sell('SBER', datetime(2024, 6, 1), 1, 200)
+
+        self.assertEqual(fragments[0]['holding_years'], 2)
+        self.assertFalse(fragments[0]['exempt_eligible'])
+        self.assertEqual(self.ledger.year_summary(2024)['exemption'], 0)
+
+    def test_tax_report_by_year(self):
+        self.ledger.add_lot('SBER', datetime(2023, 1, 10), 10, 100)
+        self.ledger.sell('SBER', datetime(2023, 5, 1), 5, 140)
+        self.ledger.sell('SBER', datetime(2024, 5, 1), 2, 80)
+        self.ledger.sell('SBER', datetime(2024, 7, 1), 3, 200)
+
+        report = self.ledger.tax_report()
+
+        self.assertEqual([row['year'] for row in report], [2023, 2024])
+        self.assertAlmostEqual(report[0]['gain'], 200)
+        self.assertAlmostEqual(report[0]['tax'], 26)
+        # Убыток года уменьшает прибыль того же года
+        self.assertAlmostEqual(report[1]['proceeds'], 760)
+        self.assertAlmostEqual(report[1]['cost'], 500)
+        self.assertAlmostEqual(report[1]['tax'], 260 * 0.13)
+
+    def test_from_transactions_applies_close(self):
+        history = [
+            {'date': '2024-01-10T10:00:00', 'ticker': 'SBER', 'operation': 'buy',
+             'quantity': 10, 'price': 100, 'commission': 1},
+            {'date': '2024-02-10T10:00:00', 'ticker': 'SBER', 'operation': 'close',
+             'quantity': 0, 'price': 0, 'commission': 0},
+            {'date': '2024-03-10T10:00:00', 'ticker': 'SBER', 'operation': 'buy',
+             'quantity': 2, 'price': 300, 'commission': 0},
+        ]
+
+        ledger = LotLedger.from_transactions(history)
+
+        self.assertEqual(ledger.open_quantity('SBER'), 2)
+        self.assertEqual(ledger.lots['SBER'][0][2], 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
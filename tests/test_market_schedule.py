@@ -0,0 +1,115 @@
+# tests/test_market_schedule.py
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from collections import deque
+from datetime import date, datetime
+
+from core.market_schedule import MOSCOW_TZ, AdaptiveScheduler, MarketCalendar
+
+
+def moscow(*args):
+    """Московское время"""
+    return MOSCOW_TZ.localize(datetime(*args))
+
+
+class MarketCalendarTest(unittest.TestCase):
+    """Торговые дни и часы, файл праздников market_holidays.json"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.data_dir, 'market_holidays.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def calendar(self, data=None, **options):
+        if data is not None:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        return MarketCalendar(self.path, **options)
+
+    def test_weekdays_and_hours(self):
+        calendar = self.calendar()
+        self.assertTrue(calendar.is_open(moscow(2025, 3, 12, 7, 0)))
+        self.assertTrue(calendar.is_open(moscow(2025, 3, 12, 19, 0)))
+        self.assertFalse(calendar.is_open(moscow(2025, 3, 12, 6, 59)))
+        self.assertFalse(calendar.is_open(moscow(2025, 3, 12, 19, 1)))
+        self.assertFalse(calendar.is_open(moscow(2025, 3, 15, 12, 0)))  # суббота
+
+    def test_file_holidays_and_workdays(self):
+        calendar = self.calendar({'holidays': ['2025-05-02'], 'workdays': ['2025-11-01']})
+        self.assertFalse(calendar.is_trading_day(date(2025, 5, 2)))  # пятница
+        self.assertTrue(calendar.is_trading_day(date(2025, 11, 1)))  # суббота
+
+    def test_default_holidays_are_opt_in(self):
+        new_year = date(2025, 1, 3)  # пятница
+        self.assertTrue(self.calendar().is_trading_day(new_year))
+        self.assertFalse(self.calendar(use_default_holidays=True).is_trading_day(new_year))
+        self.assertFalse(self.calendar({'use_default_holidays': True}).is_trading_day(new_year))
+
+    def test_workday_overrides_default_holiday(self):
+        calendar = self.calendar({'workdays': ['2025-01-03'], 'use_default_holidays': True})
+        self.assertTrue(calendar.is_trading_day(date(2025, 1, 3)))
+
+    def test_seconds_until_open(self):
+        calendar = self.calendar({'holidays': ['2025-03-17']})
+        self.assertEqual(calendar.seconds_until_open(moscow(2025, 3, 12, 12, 0)), 0)
+        self.assertEqual(calendar.seconds_until_open(moscow(2025, 3, 12, 6, 0)), 3600)
+        # Пятница вечером -> понедельник праздничный -> вторник 7:00
+        self.assertEqual(calendar.seconds_until_open(moscow(2025, 3, 14, 20, 0)), (3 * 24 + 11) * 3600)
+
+
+class AdaptiveSchedulerTest(unittest.TestCase):
+    """Период опроса: задержка после ошибок, закрытый рынок, волатильность"""
+
+    OPEN = moscow(2025, 3, 12, 12, 0)
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        calendar = MarketCalendar(os.path.join(self.data_dir, 'market_holidays.json'))
+        self.scheduler = AdaptiveScheduler(interval=5, min_interval=1, closed_interval=300,
+                                           max_backoff=60, calendar=calendar)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_backoff_grows_and_is_capped(self):
+        for failures, backoff in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+            self.scheduler.failures = failures
+            for _ in range(20):
+                delay = self.scheduler.next_delay(self.OPEN)
+                self.assertGreaterEqual(delay, backoff / 2)
+                self.assertLessEqual(delay, backoff)
+
+    def test_retry_after_and_reset(self):
+        self.scheduler.record_error(retry_after=120)
+        self.assertGreaterEqual(self.scheduler.next_delay(self.OPEN), 120)
+
+        self.scheduler.record_success()
+        self.assertEqual(self.scheduler.next_delay(self.OPEN), 5)
+
+    def test_closed_market(self):
+        self.assertEqual(self.scheduler.next_delay(moscow(2025, 3, 15, 12, 0)), 300)  # суббота
+        # Незадолго до открытия - пробуждение к началу торгов
+        self.assertEqual(self.scheduler.next_delay(moscow(2025, 3, 12, 6, 58)), 120)
+        self.assertEqual(self.scheduler.next_delay(moscow(2025, 3, 12, 6, 59, 58)), 5)
+
+    def test_volatility_shortens_interval(self):
+        self.assertEqual(self.scheduler.next_delay(self.OPEN), 5)
+
+        # Цена каждую минуту колеблется на +-1%
+        self.scheduler._prices['SBER'] = deque(
+            [(minute * 60.0, 100.0 if minute % 2 == 0 else 101.0) for minute in range(10)], maxlen=20)
+        volatility = self.scheduler.volatility()
+
+        self.assertGreater(volatility, self.scheduler.volatility_threshold)
+        delay = self.scheduler.next_delay(self.OPEN)
+        self.assertAlmostEqual(delay, max(1, 5 * 0.15 / volatility))
+        self.assertGreaterEqual(delay, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# tests/test_moex_client.py
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import moex_client
+from core.moex_client import RateLimitError, get_json, iss_url
+from iss_simulator import ISSSimulator
+
+MARKETDATA_PATH = 'engines/stock/markets/shares/boards/TQBR/securities.json'
+
+
+class SingleFlightTest(unittest.TestCase):
+    """Объединение одновременных одинаковых запросов get_json (ISS - симулятор)"""
+
+    def setUp(self):
+        self.base_url = moex_client.ISS_BASE_URL
+        self.simulator = None
+
+    def tearDown(self):
+        moex_client.set_base_url(self.base_url)
+        if self.simulator is not None:
+            self.simulator.stop()
+
+    def start_simulator(self, **options):
+        self.simulator = ISSSimulator(**options)
+        moex_client.set_base_url(self.simulator.start())
+
+    def call_concurrently(self, count, params, timeout=5):
+        """count одинаковых вызовов get_json из разных потоков; (результаты, ошибки)"""
+        barrier = threading.Barrier(count)
+        results, errors = [], []
+
+        def call():
+            barrier.wait()
+            try:
+                results.append(get_json(iss_url(MARKETDATA_PATH), params, timeout))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_identical_calls_share_one_request(self):
+        self.start_simulator(latency=300)
+
+        results, errors = self.call_concurrently(16, {'securities': 'SBER', 'iss.only': 'marketdata'})
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 16)
+        self.assertEqual(self.simulator.stats['requests'], 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(moex_client._flights, {})
+
+    def test_different_params_are_not_coalesced(self):
+        self.start_simulator()
+
+        get_json(iss_url(MARKETDATA_PATH), {'securities': 'SBER'})
+        get_json(iss_url(MARKETDATA_PATH), {'securities': 'GAZP'})
+
+        self.assertEqual(self.simulator.stats['requests'], 2)
+
+    def test_leader_error_reaches_followers(self):
+        self.start_simulator(latency=300, error_rate=1.0)
+
+        results, errors = self.call_concurrently(8, {'securities': 'SBER'})
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 8)
+        self.assertEqual(self.simulator.stats['requests'], 1)
+        self.assertTrue(all(error is errors[0] for error in errors))
+
+    def test_follower_timeout(self):
+        self.start_simulator(latency=1000)
+        params = {'securities': 'SBER'}
+        leader = threading.Thread(target=get_json, args=(iss_url(MARKETDATA_PATH), params, 5))
+        leader.start()
+        try:
+            deadline = time.monotonic() + 2
+            while not moex_client._flights and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            started = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                get_json(iss_url(MARKETDATA_PATH), params, timeout=0.2)
+            self.assertLess(time.monotonic() - started, 0.9)
+        finally:
+            leader.join()
+
+
+class RateLimitTest(unittest.TestCase):
+    """Ответ 429 превращается в RateLimitError с паузой из Retry-After"""
+
+    def setUp(self):
+        class Handler(BaseHTTPRequestHandler):
+            retry_after = '7'
+
+            def do_GET(self):
+                self.send_response(429)
+                if self.retry_after is not None:
+                    self.send_header('Retry-After', self.retry_after)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.handler = Handler
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/iss/{MARKETDATA_PATH}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry_after(self):
+        with self.assertRaises(RateLimitError) as context:
+            get_json(self.url, {'securities': 'SBER'})
+        self.assertEqual(context.exception.retry_after, 7.0)
+
+    def test_without_retry_after(self):
+        self.handler.retry_after = None
+        with self.assertRaises(RateLimitError) as context:
+            get_json(self.url)
+        self.assertIsNone(context.exception.retry_after)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_portfolio.py
+import shutil
+import tempfile
+import unittest
+
+from core import moex_client
+from core.portfolio import Portfolio
+from iss_simulator import ISSSimulator
+
+
+class PortfolioLotsTest(unittest.TestCase):
+    """Журнал лотов при замене и удалении позиций (котировки - от симулятора ISS)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = ISSSimulator()
+        cls.base_url = moex_client.ISS_BASE_URL
+        moex_client.set_base_url(cls.simulator.start())
+
+    @classmethod
+    def tearDownClass(cls):
+        moex_client.set_base_url(cls.base_url)
+        cls.simulator.stop()
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.portfolio = Portfolio(data_dir=self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def buy(self, ticker, quantity, price, merge=True):
+        """Покупка с сохранением позиций, как в окне портфеля"""
+        self.portfolio.buy(ticker, quantity, price, merge)
+        self.portfolio.save_portfolio_data()
+
+    def reloaded(self):
+        """Тот же портфель, заново прочитанный с диска"""
+        return Portfolio(data_dir=self.data_dir)
+
+    def test_replace_resets_lots(self):
+        self.buy('SBER', 10, 100)
+        self.buy('SBER', 5, 200, merge=False)
+
+        for portfolio in (self.portfolio, self.reloaded()):
+            self.assertEqual(portfolio.lot_ledger.open_quantity('SBER'), 5)
+            sale = portfolio.preview_sale('SBER', 5, 200)
+            self.assertEqual(sale['tax'], 0)
+
+    def test_removed_position_lots_are_dropped(self):
+        self.buy('SBER', 10, 100)
+        self.portfolio.remove_stocks(['SBER'])
+        self.buy('SBER', 1, 300)
+
+        for portfolio in (self.portfolio, self.reloaded()):
+            self.assertEqual(portfolio.lot_ledger.open_quantity('SBER'), 1)
+            self.assertEqual(portfolio.preview_sale('SBER', 1, 300)['tax'], 0)
+
+    def test_clear_drops_all_lots(self):
+        self.buy('SBER', 10, 100)
+        self.buy('GAZP', 3, 150)
+        self.portfolio.clear()
+
+        self.assertEqual(self.portfolio.lot_ledger.lots, {})
+        self.assertEqual(self.reloaded().lot_ledger.lots, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
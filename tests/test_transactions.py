@@ -0,0 +1,45 @@
+# tests/test_transactions.py
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from core.transactions import TransactionStore
+
+
+class TurnoverTest(unittest.TestCase):
+    """Скользящий оборот счета"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.store = TransactionStore(self.data_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def entry(self, days_ago, total):
+        return {'date': (datetime.now() - timedelta(days=days_ago)).isoformat(), 'ticker': 'SBER',
+                'operation': 'buy', 'quantity': 1, 'price': total, 'total': total, 'commission': 0}
+
+    def test_window_and_recorded_trades(self):
+        self.store.transaction_history = [self.entry(40, 1000), self.entry(10, 200), self.entry(1, 30)]
+
+        self.assertEqual(self.store.turnover(30), 230)
+        self.assertEqual(self.store.turnover(60), 1230)
+
+        self.store.record_transaction('GAZP', 'sell', 2, 50)
+        self.assertEqual(self.store.turnover(60), 1330)
+
+    def test_window_rebuilt_after_external_changes(self):
+        self.assertEqual(self.store.turnover(30), 0)
+
+        # Импорт дописывает историю напрямую
+        self.store.transaction_history.extend([self.entry(5, 100), self.entry(3, 100)])
+        self.assertEqual(self.store.turnover(30), 200)
+
+        self.store.clear()
+        self.assertEqual(self.store.turnover(30), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# tests/test_workspace.py
+import shutil
+import tempfile
+import unittest
+
+from core import moex_client, workspace
+from core.errors import PortfolioError
+from core.portfolio import Portfolio
+from core.workspace import Workspace, get_workspace
+from iss_simulator import ISSSimulator
+
+
+class WorkspaceTest(unittest.TestCase):
+    """Счета рабочей области и общий кэш котировок (ISS - симулятор)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = ISSSimulator()
+        cls.base_url = moex_client.ISS_BASE_URL
+        moex_client.set_base_url(cls.simulator.start())
+
+    @classmethod
+    def tearDownClass(cls):
+        moex_client.set_base_url(cls.base_url)
+        cls.simulator.stop()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.workspace = Workspace(self.root, quote_max_age=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def add_position(self, name, ticker):
+        portfolio = self.workspace.create(name)
+        portfolio.portfolio_data.append({'ticker': ticker, 'quantity': 1, 'buy_price': 100.0,
+                                         'commission': 0.0, 'total_cost': 100.0})
+        return portfolio
+
+    def test_portfolios_share_quote_cache(self):
+        broker = self.add_position('Брокер', 'SBER')
+        iis = self.add_position('ИИС', 'SBER')
+        self.assertIs(broker.quote_cache, self.workspace.quote_cache)
+
+        requests = self.simulator.stats['requests']
+        self.assertIn('SBER', broker.fetch_quotes())
+        self.assertIn('SBER', iis.fetch_quotes())
+        self.assertIn('SBER', self.workspace.fetch_quotes())
+        self.assertEqual(self.simulator.stats['requests'] - requests, 1)
+
+    def test_invalid_names(self):
+        for name in ('', 'a\n', 'a ', 'a.', '.a', '../a', 'a/b'):
+            with self.assertRaises(PortfolioError):
+                self.workspace.portfolio_dir(name)
+        self.workspace.portfolio_dir('Брокер 1.2-a')
+
+
+class SharedWorkspaceTest(unittest.TestCase):
+    """Общая рабочая область процесса"""
+
+    def setUp(self):
+        self.saved = workspace._shared_workspace
+        workspace._shared_workspace = None
+
+    def tearDown(self):
+        workspace._shared_workspace = self.saved
+
+    def test_portfolio_class(self):
+        class WindowPortfolio(Portfolio):
+            pass
+
+        shared = get_workspace()
+        self.assertIs(shared.portfolio_class, Portfolio)
+        self.assertIs(get_workspace(), shared)
+
+        windows = get_workspace(portfolio_class=WindowPortfolio)
+        self.assertIs(windows.portfolio_class, WindowPortfolio)
+        self.assertIs(get_workspace(), windows)
+
+
+if __name__ == '__main__':
+    unittest.main()
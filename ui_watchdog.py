@@ -0,0 +1,170 @@
+# ui_watchdog.py
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from core.instrumentation import get_metrics
+
+
+class UIWatchdog:
+    """
+    Сторож отзывчивости интерфейса.
+
+    Поток Tk каждые interval мс отмечает "пульс" через after(). Фоновый поток
+    следит за пульсом: если его нет дольше threshold мс, снимается стек главного
+    потока - место, где он завис. Когда пульс возобновляется, зависание
+    записывается в журнал вместе с полной длительностью и стеком.
+    Задержка каждого пульса попадает в метрику 'ui.main_loop_lag'.
+    """
+
+    def __init__(self, root, interval=100, threshold=500, log_path='ui_stalls.log', history=50):
+        """
+        Инициализация сторожа.
+
+        Args:
+            root: корневое окно Tk
+            interval: период пульса в миллисекундах
+            threshold: порог зависания в миллисекундах
+            log_path: файл журнала зависаний (None - только вывод в консоль)
+            history: количество последних зависаний, хранимых в памяти
+        """
+        self.root = root
+        self.interval = interval
+        self.threshold = threshold
+        self.log_path = log_path
+        self.stalls = deque(maxlen=history)
+        self.metrics = get_metrics()
+
+        self._main_thread_id = threading.main_thread().ident
+        self._lock = threading.Lock()
+        self._last_beat = time.perf_counter()
+        self._captured_stack = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._after_id = None
+
+    @property
+    def running(self):
+        """Запущен ли сторож"""
+        return self._thread is not None
+
+    def start(self):
+        """Запустить пульс и фоновый поток наблюдения"""
+        if self.running:
+            return
+        # Стек снимается у потока, в котором работает Tk
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop_event.clear()
+        self._after_id = self.root.after(self.interval, self._beat)
+        self._thread = threading.Thread(target=self._watch, name="UIWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановить сторож"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass  # окно уже уничтожено
+            self._after_id = None
+
+    def _beat(self):
+        """Пульс в потоке Tk: замер задержки и регистрация завершившегося зависания"""
+        now = time.perf_counter()
+        with self._lock:
+            lag = (now - self._last_beat) * 1000 - self.interval
+            stack = self._captured_stack
+            self._captured_stack = None
+            self._last_beat = now
+
+        self.metrics.observe('ui.main_loop_lag', max(lag, 0.0))
+        if lag >= self.threshold:
+            self._report(lag, stack)
+
+        if not self._stop_event.is_set():
+            self._after_id = self.root.after(self.interval, self._beat)
+
+    def _watch(self):
+        """Фоновый поток: снимок стека главного потока во время зависания"""
+        period = min(self.interval, self.threshold) / 2000
+        while not self._stop_event.wait(period):
+            with self._lock:
+                silence = (time.perf_counter() - self._last_beat) * 1000 - self.interval
+                if silence < self.threshold or self._captured_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame))
+            with self._lock:
+                self._captured_stack = stack
+
+    def _report(self, duration, stack):
+        """
+        Запись зависания в журнал.
+
+        Args:
+            duration: длительность зависания в миллисекундах
+            stack: стек главного потока во время зависания (None, если не успели снять)
+        """
+        stall = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'duration_ms': round(duration, 1),
+            'stack': stack or "стек не снят (зависание короче периода проверки)\n"
+        }
+        self.stalls.append(stall)
+        self.metrics.increment('ui.stalls')
+
+        message = (f"[{stall['time']}] Интерфейс не отвечал {stall['duration_ms']:.0f} мс. "
+                   f"Стек главного потока:\n{stall['stack']}")
+        print(f"Ошибка отзывчивости интерфейса: не отвечал {stall['duration_ms']:.0f} мс")
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(message + "\n")
+            except OSError as e:
+                print(f"Ошибка записи журнала зависаний: {e}")
+
+
+_watchdog = None
+
+
+def start_watchdog(root, **kwargs):
+    """
+    Запуск общего сторожа интерфейса. Порог можно задать переменной
+    окружения MOEX_STALL_MS, значение 0 отключает сторож.
+
+    Args:
+        root: корневое окно Tk
+        kwargs: параметры UIWatchdog
+
+    Returns:
+        UIWatchdog: запущенный сторож или None, если он отключен
+    """
+    global _watchdog
+    threshold = os.environ.get('MOEX_STALL_MS')
+    if threshold is not None:
+        try:
+            kwargs['threshold'] = int(threshold)
+        except ValueError:
+            print(f"Ошибка: некорректное значение MOEX_STALL_MS: {threshold}")
+        if kwargs.get('threshold') == 0:
+            return None
+    if _watchdog is None:
+        _watchdog = UIWatchdog(root, **kwargs)
+        _watchdog.start()
+    return _watchdog
+
+
+def get_watchdog():
+    """Общий сторож интерфейса (None, если не запущен)"""
+    return _watchdog